@@ -0,0 +1,192 @@
+"""
+Сквозная задержка на записанных фразах без микрофона и звуковой карты:
+файл → AudioCapture (FileSource) → Recognizer (Vosk, оффлайн) → process_text →
+Executor.handle → TTS-заглушка (ответ только забирается из tts_queue).
+
+Навыки не выполняются (DryRunSkills записывает вызванные action), поэтому
+бенчмарк безопасно запускается на headless CI.
+
+Для каждой стадии печатает p50/p95/p99 в мс:
+- asr     — от конца речи в файле до распознанного текста (endpoint + декодирование);
+- process — process_text: сопоставление, Executor.handle, ответ в очередь TTS;
+- total   — от конца речи до готового ответа;
+а также RTF (процессорное время распознавания / длительность аудио) и точность
+по разметке: text — распознанный текст совпал, command — вызван ожидаемый action.
+
+Разметка — JSONL рядом с записями (labels.jsonl), по строке на файл:
+    {"file": "open_browser_ru.wav", "text": "открой браузер", "lang": "ru", "action": "system.browser.open_browser"}
+Файлы без разметки участвуют только в замерах задержки.
+
+Запуск из корня репозитория:
+    python -m benchmarks.e2e_latency --corpus data/media/audios --speed 0
+    python -m benchmarks.e2e_latency --corpus recordings/ --speed 1 --json e2e.json
+    python -m benchmarks.e2e_latency --corpus recordings/ --grammar on   # против --grammar off
+"""
+import argparse
+import json
+import queue
+import statistics
+import time
+from pathlib import Path
+
+import main as app
+from src.core.audio_capture import AudioCapture, FileSource, read_audio
+from src.core.config import get_settings
+from src.core.executor import Executor
+from src.core.normalizer import TextNormalizer
+from src.core.recognizer import Recognizer
+from benchmarks.synthetic import percentile
+
+
+class DryRunSkills:
+    """SkillManager без выполнения навыков: вызовы только записываются."""
+
+    def __init__(self, context: dict = None):
+        self.context = context or {}
+        self.calls = []
+
+    def execute(self, action: str, text: str = ""):
+        self.calls.append(action)
+        return ""
+
+    def reload(self):
+        pass
+
+
+def load_labels(corpus: Path, labels_path=None) -> dict:
+    path = Path(labels_path) if labels_path else corpus / "labels.jsonl"
+    if not path.exists():
+        return {}
+    labels = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                labels[item["file"]] = item
+    return labels
+
+
+def same_text(a: str, b: str) -> bool:
+    return " ".join(a.lower().split()) == " ".join(b.lower().split())
+
+
+def drain_tts():
+    """TTS-заглушка: забирает ответы из очереди, ничего не озвучивая."""
+    replies = []
+    while True:
+        try:
+            replies.append(app.tts_queue.get_nowait()[0])
+            app.tts_queue.task_done()
+        except queue.Empty:
+            return replies
+
+
+def run_clip(path: Path, source: FileSource, capture: AudioCapture, recognizer: Recognizer):
+    """Проигрывает файл и ждёт первую распознанную фразу. (text, lang, t_text, cpu_s)."""
+    done = source.play(capture, path)
+    text, lang, cpu = "", recognizer.default_lang, 0.0
+    while True:
+        c = time.thread_time()
+        text, lang = recognizer.listen_text()
+        cpu += time.thread_time() - c
+        t_text = time.monotonic()
+        if text or done.is_set():
+            break
+    done.wait()
+    return text, lang, t_text, cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default="data/media/audios", help="каталог или файл с записями (WAV/FLAC)")
+    parser.add_argument("--labels", help="JSONL-разметка (по умолчанию <corpus>/labels.jsonl)")
+    parser.add_argument("--speed", type=float, default=0, help="1 — реальное время, 0 — без пауз")
+    parser.add_argument("--gap", type=float, default=1.0, help="секунды тишины после каждого файла")
+    parser.add_argument("--lang", help="язык распознавания (по умолчанию assistant.default_language)")
+    parser.add_argument("--grammar", choices=("on", "off"), help="грамматика Vosk из commands.yaml (по умолчанию vosk.grammar)")
+    parser.add_argument("--json", help="сохранить результаты по фразам в файл")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    # только оффлайн: монитор сети не должен переключать распознавание на Google;
+    # записи без wake-word — полное распознавание сразу
+    config = dict(settings.config or {}, auto_switch_mode=False, wake_gate={"enabled": False})
+    if args.grammar:
+        config["vosk"] = dict(config.get("vosk", {}) or {}, grammar=args.grammar == "on")
+    dataset = settings.dataset or {}
+    corpus = Path(args.corpus)
+    files = FileSource.expand(corpus)
+    labels = load_labels(corpus if corpus.is_dir() else corpus.parent, args.labels)
+
+    source = FileSource(speed=args.speed, gap_s=args.gap)
+    capture = AudioCapture.from_config(config)
+    capture.source = source
+    recognizer = Recognizer(config, capture=capture, dataset=dataset)
+    recognizer.set_mode("offline")
+    if args.lang:
+        recognizer.set_language(args.lang)
+    # конец файла = тишина в потоке: не ждём idle_timeout_s живого микрофона
+    recognizer.listen_timeout = args.gap + 0.5
+
+    normalizer = TextNormalizer.from_config(config)
+    skills = DryRunSkills({"config": config, "dataset": dataset, "normalizer": normalizer})
+    executor = Executor(dataset, skills, config=config, normalizer=normalizer, index=settings.command_index)
+
+    rows = []
+    audio_s = cpu_s = 0.0
+    print(f"{'file':<32} {'asr ms':>8} {'proc ms':>8} {'total ms':>9}  text")
+    for path in files:
+        label = labels.get(path.name, {})
+        duration = len(read_audio(path, capture.sample_rate)) / capture.sample_rate
+        text, lang, t_text, cpu = run_clip(path, source, capture, recognizer)
+        audio_s += duration + args.gap
+        cpu_s += cpu
+
+        asr_ms = (t_text - source.speech_end) * 1000 if text else None
+        process_ms = None
+        reply = ""
+        skills.calls.clear()
+        if text:
+            active_state = {"active": True, "last": time.time(), "timeout": float("inf"),
+                            "lang": label.get("lang", lang)}
+            t = time.perf_counter()
+            app.process_text(executor, dataset, skills, text, label.get("lang", lang), active_state)
+            process_ms = (time.perf_counter() - t) * 1000
+            reply = " ".join(drain_tts())
+
+        row = {
+            "file": path.name, "duration_s": round(duration, 2), "text": text, "lang": lang, "reply": reply,
+            "actions": list(skills.calls),
+            "asr_ms": round(asr_ms, 1) if asr_ms is not None else None,
+            "process_ms": round(process_ms, 2) if process_ms is not None else None,
+            "total_ms": round(asr_ms + process_ms, 1) if process_ms is not None else None,
+            "text_ok": same_text(text, label["text"]) if "text" in label else None,
+            "command_ok": label["action"] in skills.calls if "action" in label else None,
+        }
+        rows.append(row)
+        print(f"{path.name[:32]:<32} {asr_ms or 0:>8.0f} {process_ms or 0:>8.2f} {row['total_ms'] or 0:>9.0f}  {text}")
+
+    recognizer.stop()
+    capture.stop()
+
+    print()
+    for stage in ("asr_ms", "process_ms", "total_ms"):
+        values = [r[stage] for r in rows if r[stage] is not None]
+        if values:
+            print(f"{stage[:-3]:<8} p50 {statistics.median(values):>8.1f}  p95 {percentile(values, 95):>8.1f}  "
+                  f"p99 {percentile(values, 99):>8.1f} мс  (n={len(values)})")
+    print(f"RTF      {cpu_s / audio_s if audio_s else 0:.3f}  ({cpu_s:.1f} с CPU на {audio_s:.1f} с аудио)")
+    for key, name in (("text_ok", "text"), ("command_ok", "command")):
+        checked = [r[key] for r in rows if r[key] is not None]
+        if checked:
+            print(f"{name:<8} {sum(checked) / len(checked):.1%}  ({sum(checked)}/{len(checked)})")
+        else:
+            print(f"{name:<8} n/a  (нет разметки)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+CPU распознавания, пока ассистент не активен: полное распознавание каждой
+фразы против первой ступени (wake_gate — только поиск wake-word).
+
+Записи (обычная речь без wake-word, фоновый шум) проигрываются по кругу в
+реальном времени --seconds секунд; поток распознавания крутит listen_text(),
+как recognizer_worker в main.py. Для каждого режима печатает CPU потока
+распознавания (% одного ядра, Recognizer.stage_stats()), число фраз,
+дошедших до полного распознавания, и для wake_gate — долю блоков, которые
+вообще попали в Vosk.
+
+CPU процесса-декодера (vosk.out_of_process) сюда не входит — бенчмарк
+запускается с декодированием в основном процессе.
+
+Нужны модели Vosk в data/models. Запуск из корня репозитория:
+    python -m benchmarks.idle_cpu --corpus data/media/audios --seconds 60
+"""
+import argparse
+import threading
+
+from src.core.audio_capture import AudioCapture, FileSource
+from src.core.config import get_settings
+from src.core.recognizer import Recognizer
+
+MODES = {"full": False, "wake_gate": True}
+
+
+def run_mode(base_config: dict, dataset: dict, files, wake_gate: bool, seconds: float, gap: float):
+    config = dict(base_config, auto_switch_mode=False)
+    config["wake_gate"] = dict(config.get("wake_gate", {}) or {}, enabled=wake_gate)
+    config["vosk"] = dict(config.get("vosk", {}) or {}, out_of_process=False, auto_language=False)
+    capture = AudioCapture.from_config(config)
+    capture.source = FileSource(files, speed=1.0, gap_s=gap, loop=True)
+    recognizer = Recognizer(config, capture=capture, dataset=dataset)
+    recognizer.set_mode("offline")
+
+    stop = threading.Event()
+    texts = []
+
+    def listen():
+        while not stop.is_set():
+            text, _ = recognizer.listen_text()
+            if text:
+                texts.append(text)
+
+    thread = threading.Thread(target=listen, daemon=True)
+    thread.start()
+    stop.wait(seconds)
+    stop.set()
+    stages = recognizer.stage_stats()
+    spotter = recognizer.spotter.stats() if recognizer.spotter is not None else None
+    recognizer.stop()
+    capture.stop()
+    thread.join(timeout=recognizer.listen_timeout + 1)
+
+    wall = sum(s["wall_s"] for s in stages.values())
+    cpu = sum(s["cpu_s"] for s in stages.values())
+    return 100 * cpu / wall if wall else 0.0, len(texts), spotter
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default="data/media/audios", help="каталог или файл с записями (WAV/FLAC)")
+    parser.add_argument("--seconds", type=float, default=60, help="длительность прогона каждого режима")
+    parser.add_argument("--gap", type=float, default=1.0, help="секунды тишины после каждого файла")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    config = settings.config or {}
+    files = FileSource.expand(args.corpus)
+
+    print(f"{'mode':<10} {'cpu %':>7} {'phrases':>8} {'decoded blocks':>15}")
+    results = {}
+    for name, wake_gate in MODES.items():
+        cpu, phrases, spotter = run_mode(config, settings.dataset or {}, files, wake_gate, args.seconds, args.gap)
+        results[name] = cpu
+        decoded = f"{spotter['decoded_ratio']:.1%}" if spotter else "100%"
+        print(f"{name:<10} {cpu:>7.1f} {phrases:>8} {decoded:>15}")
+    if results["full"]:
+        print(f"\nэкономия CPU в ожидании: {1 - results['wake_gate'] / results['full']:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Сравнение backend'ов SmartMatcher на большом синтетическом наборе команд
+(запуск приложений и звонки контактам на ru/en/uz).
+
+Для каждого размера набора и backend'а печатает:
+- build   — время создания матчера;
+- p50/p95 — задержку find_matches на фразу (кэш выключен);
+- agree   — совпадение с эталоном (полный проход rapidfuzz без индексов и быстрых путей);
+- correct — доля фраз, распознанных как задуманная команда.
+
+Запуск из корня репозитория:
+    python -m benchmarks.matcher_backends --sizes 5000 20000 50000 --queries 300
+"""
+import argparse
+import random
+import statistics
+import time
+
+from src.core.matcher import SmartMatcher
+from benchmarks.synthetic import mutate, percentile
+
+APPS = ["telegram", "chrome", "firefox", "spotify", "vlc", "steam", "discord", "zoom", "word", "excel",
+        "notepad", "calculator", "paint", "skype", "obs", "blender", "gimp", "slack", "outlook", "teams"]
+NAMES = ["alex", "maria", "ivan", "olga", "dmitry", "anna", "sergey", "elena", "rustam", "dilnoza",
+         "aziz", "kamola", "john", "kate", "peter", "nina", "timur", "lola", "oleg", "sara"]
+LAUNCH = {"ru": ["открой {}", "запусти {}"], "en": ["open {}", "launch {}"], "uz": ["{}ni och", "{}ni ishga tushir"]}
+CALL = {"ru": ["позвони {}", "набери {}"], "en": ["call {}", "dial {}"], "uz": ["{}ga qo'ng'iroq qil", "{}ga telefon qil"]}
+
+EXHAUSTIVE = {"candidate_index": False, "fast_path": False, "partition_by_language": False, "cache_size": 0}
+BACKENDS = {
+    "rapidfuzz": {"cache_size": 0},
+    "tfidf": {"backend": "tfidf", "cache_size": 0},
+}
+
+
+def make_dataset(n_patterns: int, seed: int = 0):
+    """Набор из n_patterns паттернов: по команде на каждое «приложение» и «контакт»."""
+    rnd = random.Random(seed)
+    commands, targets = [], []
+    i = 0
+    while len(targets) < n_patterns:
+        kind = LAUNCH if i % 2 else CALL
+        base = (APPS if i % 2 else NAMES)[i // 2 % 20]
+        # уникальное имя: база + суффикс из слогов
+        name = base + "".join(rnd.choice("aeiou") + rnd.choice("bdklmnprst") for _ in range(2)) + str(i)
+        pats = [t.format(name) for lang in ("ru", "en", "uz") for t in kind[lang]]
+        commands.append({"patterns": pats, "action": f"bench.{'launch' if i % 2 else 'call'}.{i}", "response": "ok"})
+        targets.extend((p, f"bench.{'launch' if i % 2 else 'call'}.{i}") for p in pats)
+        i += 1
+    return {"skills": {"bench": {"commands": commands}}}, targets[:n_patterns]
+
+
+def make_queries(targets, n: int, seed: int = 1):
+    rnd = random.Random(seed)
+    queries = []
+    for pattern, action in rnd.sample(targets, min(n, len(targets))):
+        queries.append((mutate(pattern, rnd) if rnd.random() < 0.7 else pattern, action))
+    return queries
+
+
+def run(matcher: SmartMatcher, queries):
+    results, times = [], []
+    for text, _ in queries:
+        t = time.perf_counter()
+        matches = matcher.find_matches(text)
+        times.append((time.perf_counter() - t) * 1000)
+        results.append(matches[0]["action"] if matches else None)
+    return results, times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5000, 20000])
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--top-k", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'patterns':>8} {'backend':<10} {'build s':>8} {'p50 ms':>8} {'p95 ms':>8} {'agree':>6} {'correct':>7}")
+    for size in args.sizes:
+        dataset, targets = make_dataset(size)
+        queries = make_queries(targets, args.queries)
+        reference, _ = run(SmartMatcher(dataset, config={"matcher": EXHAUSTIVE}), queries)
+        for name, cfg in BACKENDS.items():
+            cfg = dict(cfg, tfidf_top_k=args.top_k)
+            t = time.perf_counter()
+            matcher = SmartMatcher(dataset, config={"matcher": cfg})
+            build = time.perf_counter() - t
+            results, times = run(matcher, queries)
+            agree = sum(a == b for a, b in zip(results, reference)) / len(queries)
+            correct = sum(r == q[1] for r, q in zip(results, queries)) / len(queries)
+            print(f"{size:>8} {name:<10} {build:>8.2f} {statistics.median(times):>8.2f} "
+                  f"{percentile(times, 95):>8.2f} {agree:>6.1%} {correct:>7.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Масштабирование SmartMatcher на синтетических датасетах (benchmarks/synthetic.py).
+
+Для каждого размера датасета и конфигурации матчера печатает:
+- build s   — время создания SmartMatcher (нормализация, индексы);
+- mem MB    — пик выделенной при сборке памяти (tracemalloc);
+- p50/p95/p99 — задержка find_matches в мс для одиночных и составных фраз (кэш выключен);
+- agree     — доля фраз, где результат (action/key всех частей) совпадает с baseline;
+- correct   — доля фраз, распознанных как задуманные команды.
+
+baseline — матчер без оптимизаций: полный проход rapidfuzz по всем паттернам,
+без индекса кандидатов, быстрых путей, разделов по языкам и пакетного режима.
+
+Запуск из корня репозитория:
+    python -m benchmarks.matcher_scaling --sizes 100 1000 10000 100000 --queries 200
+    python -m benchmarks.matcher_scaling --configs default tfidf batch --json results.json
+"""
+import argparse
+import gc
+import json
+import statistics
+import time
+import tracemalloc
+
+import yaml
+
+from src.core.config import DEFAULT_CONFIG_PATH
+from src.core.matcher import SmartMatcher
+from benchmarks.synthetic import make_dataset, make_utterances, percentile
+
+BASELINE = {"candidate_index": False, "fast_path": False, "partition_by_language": False,
+            "batch": False, "backend": "rapidfuzz"}
+CONFIGS = {
+    "baseline": BASELINE,
+    "default": {},
+    "tfidf": {"backend": "tfidf"},
+    "batch": {"batch": True},
+}
+
+
+def load_config(name: str) -> dict:
+    """config.yaml репозитория + переопределения секции matcher; кэш совпадений всегда выключен."""
+    with open(DEFAULT_CONFIG_PATH, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f) or {}
+    config["debug"] = False
+    matcher_cfg = dict(config.get("matcher", {}) or {})
+    matcher_cfg.update(CONFIGS[name])
+    matcher_cfg["cache_size"] = 0
+    config["matcher"] = matcher_cfg
+    return config
+
+
+def build(dataset: dict, config: dict, memory: bool):
+    gc.collect()
+    if memory:
+        tracemalloc.start()
+    t = time.perf_counter()
+    matcher = SmartMatcher(dataset, threshold=config.get("matcher_threshold", 70), config=config)
+    elapsed = time.perf_counter() - t
+    peak = 0.0
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+    return matcher, elapsed, peak
+
+
+def run(matcher: SmartMatcher, utterances):
+    results, times = [], []
+    for text, _ in utterances:
+        t = time.perf_counter()
+        matches = matcher.find_matches(text)
+        times.append((time.perf_counter() - t) * 1000)
+        results.append([m["action"] or m["key"] for m in matches])
+    return results, times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--configs", nargs="+", default=["default", "tfidf"], choices=sorted(CONFIGS))
+    parser.add_argument("--no-memory", action="store_true", help="не измерять память (tracemalloc замедляет сборку)")
+    parser.add_argument("--json", help="сохранить результаты в файл")
+    args = parser.parse_args()
+
+    rows = []
+    print(f"{'patterns':>8} {'config':<9} {'build s':>8} {'mem MB':>7} {'kind':<6} "
+          f"{'p50':>7} {'p95':>7} {'p99':>7} {'agree':>6} {'correct':>7}")
+    for size in args.sizes:
+        dataset = make_dataset(size)
+        workloads = {
+            "single": make_utterances(dataset, args.queries, parts=1),
+            "multi": make_utterances(dataset, args.queries, parts=3, seed=2),
+        }
+        reference = {}
+        for name in ["baseline"] + [c for c in args.configs if c != "baseline"]:
+            matcher, build_s, mem = build(dataset, load_config(name), not args.no_memory)
+            for kind, utterances in workloads.items():
+                results, times = run(matcher, utterances)
+                if name == "baseline":
+                    reference[kind] = results
+                agree = sum(a == b for a, b in zip(results, reference[kind])) / len(utterances)
+                correct = sum(r == u[1] for r, u in zip(results, utterances)) / len(utterances)
+                row = {
+                    "patterns": len(matcher.patterns), "config": name, "kind": kind,
+                    "build_s": round(build_s, 3), "memory_mb": round(mem, 1),
+                    "p50_ms": round(statistics.median(times), 3), "p95_ms": round(percentile(times, 95), 3),
+                    "p99_ms": round(percentile(times, 99), 3), "agree": round(agree, 4), "correct": round(correct, 4),
+                }
+                rows.append(row)
+                print(f"{row['patterns']:>8} {name:<9} {build_s:>8.2f} {mem:>7.1f} {kind:<6} "
+                      f"{row['p50_ms']:>7.2f} {row['p95_ms']:>7.2f} {row['p99_ms']:>7.2f} "
+                      f"{agree:>6.1%} {correct:>7.1%}")
+            del matcher
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Генератор синтетических датасетов в формате commands.yaml для бенчмарков SmartMatcher.
+
+make_dataset(n) строит skills / meta / smalltalk с паттернами на ru (кириллица),
+en и uz (латиница с o'/g' и суффиксами), как в data/commands.yaml:
+- skills    — категории по 50 команд, у команды по паттерну на каждый язык;
+- meta      — ~1% паттернов, ключи meta_<i>;
+- smalltalk — ~5% паттернов, разговорные фразы.
+Каждый паттерн уникален за счёт «имени» сущности (приложение, контакт, файл).
+
+make_utterances(...) возвращает фразы для find_matches: точные паттерны, ослышки
+(замена/удаление/вставка символа), фразы с wake-word и стоп-словами и составные
+команды через разделители «и» / «and» / «va».
+"""
+import random
+
+LANGS = ("ru", "en", "uz")
+
+VERBS = {
+    "ru": ["открой", "закрой", "запусти", "останови", "покажи", "найди", "удали", "создай", "включи", "выключи"],
+    "en": ["open", "close", "launch", "stop", "show", "find", "delete", "create", "turn on", "turn off"],
+    "uz": ["och", "yop", "ishga tushir", "to'xtat", "ko'rsat", "top", "o'chirib tashla", "yarat", "yoq", "o'chir"],
+}
+OBJECTS = {
+    "ru": ["приложение", "файл", "папку", "контакт", "заметку", "плейлист", "окно", "проект", "документ", "канал"],
+    "en": ["app", "file", "folder", "contact", "note", "playlist", "window", "project", "document", "channel"],
+    "uz": ["ilovani", "faylni", "papkani", "kontaktni", "eslatmani", "pleylistni", "oynani", "loyihani",
+           "hujjatni", "kanalni"],
+}
+SMALLTALK = {
+    "ru": ["как дела", "ты молодец", "спасибо большое", "расскажи шутку", "доброе утро", "что нового"],
+    "en": ["how are you", "good job", "thank you so much", "tell me a joke", "good morning", "what's new"],
+    "uz": ["qalaysan", "barakalla", "katta rahmat", "hazil ayt", "xayrli tong", "nima yangiliklar"],
+}
+META = {
+    "ru": ["обнови", "перезагрузи", "сбрось", "сохрани"],
+    "en": ["reload", "restart", "reset", "save"],
+    "uz": ["yangila", "qayta yukla", "tozala", "saqla"],
+}
+SEPARATORS = {"ru": "и", "en": "and", "uz": "va"}
+WAKE = {"ru": "джарвис", "en": "jarvis", "uz": "jarvis"}
+POLITE = {"ru": "пожалуйста", "en": "please", "uz": "iltimos"}
+
+_CYR = dict(zip("abdeiklmnoprstuvz", "абдеиклмнопрстувз"))
+
+
+def entity_name(i: int, lang: str) -> str:
+    """Уникальное «имя» из слогов по номеру (кириллицей для ru)."""
+    syllables = ["ka", "lo", "mi", "ra", "to", "ne", "su", "di", "ba", "ve", "zo", "pe"]
+    name, n = "", i
+    while True:
+        name += syllables[n % len(syllables)]
+        n //= len(syllables)
+        if not n:
+            break
+    if lang == "ru":
+        name = "".join(_CYR.get(c, c) for c in name)
+    return name
+
+
+def make_dataset(n_patterns: int, seed: int = 0) -> dict:
+    """Датасет примерно из n_patterns паттернов (skills / meta / smalltalk, ru / en / uz)."""
+    rnd = random.Random(seed)
+    n_meta = max(1, n_patterns // 100)
+    n_small = max(1, n_patterns // 20)
+    n_skill_cmds = max(1, (n_patterns - n_meta - n_small) // len(LANGS))
+
+    skills = {}
+    for i in range(n_skill_cmds):
+        v, o = rnd.randrange(10), rnd.randrange(10)
+        pats = [f"{VERBS[lang][v]} {OBJECTS[lang][o]} {entity_name(i, lang)}" for lang in LANGS]
+        category = skills.setdefault(f"skill_{i // 50}", {"description": f"Synthetic {i // 50}", "commands": []})
+        category["commands"].append({
+            "patterns": pats,
+            "action": f"bench.cmd_{i}.run",
+            "response": {lang: f"{lang} {i}" for lang in LANGS},
+        })
+
+    meta = {}
+    for i in range(max(1, n_meta // len(LANGS))):
+        k = rnd.randrange(4)
+        meta[f"meta_{i}"] = {
+            "patterns": [f"{META[lang][k]} {entity_name(i, lang)} {entity_name(i + 7, lang)}" for lang in LANGS],
+            "response": {lang: f"meta {i}" for lang in LANGS},
+        }
+
+    commands = []
+    for i in range(max(1, n_small // len(LANGS))):
+        k = rnd.randrange(len(SMALLTALK["ru"]))
+        commands.append({
+            "patterns": [f"{SMALLTALK[lang][k]} {entity_name(i + 3, lang)}" for lang in LANGS],
+            "response": {lang: f"smalltalk {i}" for lang in LANGS},
+        })
+
+    return {"skills": skills, "meta": meta, "smalltalk": {"description": "Synthetic smalltalk", "commands": commands}}
+
+
+def dataset_patterns(dataset: dict):
+    """[(pattern, lang, action_or_key)] — для выбора фраз."""
+    out = []
+    for category, data in dataset.get("skills", {}).items():
+        for cmd in data["commands"]:
+            out.extend((p, lang, cmd["action"]) for p, lang in zip(cmd["patterns"], LANGS))
+    for key, m in dataset.get("meta", {}).items():
+        out.extend((p, lang, key) for p, lang in zip(m["patterns"], LANGS))
+    for idx, cmd in enumerate(dataset.get("smalltalk", {}).get("commands", [])):
+        out.extend((p, lang, f"smalltalk_{idx}") for p, lang in zip(cmd["patterns"], LANGS))
+    return out
+
+
+def mutate(text: str, rnd: random.Random) -> str:
+    """Ослышка: замена/удаление/вставка символа в случайном слове."""
+    words = text.split()
+    w = rnd.randrange(len(words))
+    word = list(words[w])
+    # распознаватель не смешивает алфавиты внутри слова
+    cyrillic = any("а" <= c <= "я" for c in word)
+    pos = rnd.randrange(len(word))
+    op = rnd.random()
+    if op < 0.4:
+        word[pos] = rnd.choice("аеилнорст" if cyrillic else "aeilnorst")
+    elif op < 0.7 and len(word) > 3:
+        del word[pos]
+    else:
+        word.insert(pos, rnd.choice("аеоиу" if cyrillic else "aeoiu"))
+    words[w] = "".join(word)
+    return " ".join(words)
+
+
+def _phrase(pattern: str, lang: str, rnd: random.Random) -> str:
+    r = rnd.random()
+    if r < 0.4:
+        return mutate(pattern, rnd)
+    if r < 0.6:
+        return f"{WAKE[lang]} {POLITE[lang]} {pattern}"
+    return pattern
+
+
+def make_utterances(dataset: dict, n: int, parts: int = 1, seed: int = 1):
+    """
+    n фраз для find_matches: [(text, [ожидаемые action/key])].
+    parts > 1 — составные команды одного языка через разделитель.
+    """
+    rnd = random.Random(seed)
+    by_lang = {}
+    for p, lang, target in dataset_patterns(dataset):
+        by_lang.setdefault(lang, []).append((p, target))
+    out = []
+    for _ in range(n):
+        lang = rnd.choice(LANGS)
+        picked = [rnd.choice(by_lang[lang]) for _ in range(parts)]
+        text = f" {SEPARATORS[lang]} ".join(_phrase(p, lang, rnd) for p, _ in picked)
+        out.append((text, [t for _, t in picked]))
+    return out
+
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
@@ -0,0 +1,130 @@
+"""
+Время до первого звука (TTFA) и общая длительность озвучки длинных ответов:
+весь текст одним синтезом, затем воспроизведение (как speak() без
+silero.streaming) против потоковой озвучки по предложениям
+(HybridTTS.play_chunks: синтез куска N+1, пока звучит кусок N).
+
+Кэш речи отключён — меряется сам синтез. По умолчанию звук уходит в
+--device null: поток, который «проигрывает» PCM в реальном времени без
+звуковой карты (headless CI); --device sd — настоящий sd.OutputStream.
+
+Для каждого текста печатает TTFA и общую длительность обоих режимов,
+число кусков и underrun (синтез не успел за воспроизведением).
+
+Нужна модель Silero (torch). Запуск из корня репозитория:
+    python -m benchmarks.tts_streaming
+    python -m benchmarks.tts_streaming --text notes.txt --lang ru --device sd
+"""
+import argparse
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from src.core.config import get_settings
+from src.core.tts import HybridTTS, sd
+
+TEXTS = {
+    "ru": [
+        "Напоминаю: завтра в десять утра встреча с командой. Возьмите ноутбук и отчёт за квартал. "
+        "После встречи нужно позвонить в банк, уточнить статус перевода и записаться к врачу на пятницу.",
+        "Сегодня в городе облачно, днём до восемнадцати градусов, вечером возможен небольшой дождь. "
+        "Ветер северо-западный, пять метров в секунду. Завтра потеплеет до двадцати двух градусов, "
+        "осадков не ожидается, а в выходные снова придут дожди и похолодание.",
+    ],
+    "en": [
+        "Here are your notes. Buy milk and bread on the way home. Call the plumber about the kitchen sink. "
+        "Finish the presentation by Thursday, and send the draft to the team for review before the meeting.",
+    ],
+    "uz": [
+        "Eslatma: ertaga soat o'nda jamoa bilan uchrashuv bor. Noutbuk va choraklik hisobotni oling. "
+        "Uchrashuvdan keyin bankka qo'ng'iroq qilib, o'tkazma holatini aniqlash kerak.",
+    ],
+}
+
+
+class NullOutputStream:
+    """Интерфейс sd.OutputStream: callback вызывается блоками в темпе реального времени."""
+
+    def __init__(self, samplerate: int, channels: int = 1, dtype: str = "int16", blocksize: int = 0, callback=None):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.dtype = dtype
+        self.blocksize = blocksize or samplerate // 50
+        self.callback = callback
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        self.close()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        block_s = self.blocksize / self.samplerate
+        deadline = time.perf_counter()
+        out = np.zeros((self.blocksize, self.channels), dtype=self.dtype)
+        while not self._stop.is_set():
+            self.callback(out, self.blocksize, None, None)
+            deadline += block_s
+            time.sleep(max(0.0, deadline - time.perf_counter()))
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def close(self):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lang", default=None, help="язык синтеза (по умолчанию assistant.default_language)")
+    parser.add_argument("--text", default=None, help="файл с текстами, по одному на абзац (пустая строка)")
+    parser.add_argument("--device", choices=("null", "sd"), default="null", help="куда выводить звук")
+    args = parser.parse_args()
+
+    config = dict(get_settings().config or {})
+    config["tts_cache"] = dict(config.get("tts_cache", {}) or {}, enabled=False)
+    tts = HybridTTS(config)
+    lang = args.lang or tts.current_lang
+    if lang != tts.current_lang:
+        tts.set_language(lang)
+    if not tts.silero_ready:
+        raise SystemExit("Silero недоступен — бенчмарк меряет только его")
+    if args.device == "sd" and sd is None:
+        raise SystemExit("sounddevice недоступен — используйте --device null")
+    output = sd.OutputStream if args.device == "sd" else NullOutputStream
+
+    texts = TEXTS.get(lang, TEXTS["ru"])
+    if args.text:
+        texts = [" ".join(p.split()) for p in Path(args.text).read_text(encoding="utf-8").split("\n\n") if p.strip()]
+
+    # прогон вхолостую: первая фраза платит за инициализацию модели
+    tts.render("Проверка." if lang == "ru" else "Test.", lang)
+
+    print(f"{'chars':>6} {'chunks':>6} {'whole ttfa':>11} {'stream ttfa':>12} "
+          f"{'whole total':>12} {'stream total':>13} {'underruns':>10}")
+    gains = []
+    for text in texts:
+        whole = tts.play_chunks([text], lang, output=output)
+        stream = tts.play_chunks(tts.stream_chunks(text), lang, output=output)
+        gains.append(whole["ttfa_ms"] / stream["ttfa_ms"] if stream["ttfa_ms"] else 0.0)
+        print(f"{len(text):>6} {stream['chunks']:>6} {whole['ttfa_ms']:>9.0f}ms {stream['ttfa_ms']:>10.0f}ms "
+              f"{whole['total_s']:>11.2f}s {stream['total_s']:>12.2f}s "
+              f"{stream['underruns']:>4} ({stream['underrun_ms']:.0f}ms)")
+    if gains:
+        print(f"\nTTFA быстрее в среднем в {sum(gains) / len(gains):.1f} раза")
+
+
+if __name__ == "__main__":
+    main()
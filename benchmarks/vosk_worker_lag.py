@@ -0,0 +1,101 @@
+"""
+Отставание оффлайн-распознавания: Vosk в основном процессе против процесса-декодера
+(vosk.out_of_process) под нагрузкой CPU-тяжёлого навыка.
+
+Записи проигрываются в реальном времени (FileSource), параллельно работают
+--load потоков на чистом Python (держат GIL, как навык, который что-то
+считает или парсит). Для каждого режима печатает:
+- asr p50/p95 — от конца речи в файле до распознанного текста, мс;
+- lag p50/p95/max — сколько захваченного аудио ещё не дошло до декодера
+  (Recognizer.decoder_lag_ms(), замер каждые 50 мс);
+- recognized — сколько файлов дали непустой текст.
+
+Нужны модели Vosk в data/models. Запуск из корня репозитория:
+    python -m benchmarks.vosk_worker_lag --corpus recordings/ --load 2
+    python -m benchmarks.vosk_worker_lag --corpus data/media/audios --load 0 4
+"""
+import argparse
+import statistics
+import threading
+import time
+
+from src.core.audio_capture import AudioCapture, FileSource
+from src.core.config import get_settings
+from src.core.recognizer import Recognizer
+from benchmarks.e2e_latency import run_clip
+from benchmarks.synthetic import percentile
+
+MODES = {"in_process": False, "out_of_process": True}
+
+
+def cpu_heavy_skill(stop: threading.Event):
+    """Навык, который только считает на Python и не отпускает GIL."""
+    while not stop.is_set():
+        sum(i * i for i in range(20000))
+
+
+def sample_lag(recognizer: Recognizer, stop: threading.Event, out: list):
+    while not stop.is_set():
+        out.append(recognizer.decoder_lag_ms())
+        time.sleep(0.05)
+
+
+def run_mode(base_config: dict, out_of_process: bool, files, load: int, speed: float, gap: float):
+    # записи без wake-word — полное распознавание сразу
+    config = dict(base_config, auto_switch_mode=False, wake_gate={"enabled": False})
+    config["vosk"] = dict(config.get("vosk", {}) or {}, out_of_process=out_of_process, auto_language=False)
+    source = FileSource(speed=speed, gap_s=gap)
+    capture = AudioCapture.from_config(config)
+    capture.source = source
+    recognizer = Recognizer(config, capture=capture)
+    recognizer.set_mode("offline")
+    recognizer.listen_timeout = gap + 0.5
+    if recognizer.vosk_worker is not None:
+        recognizer.vosk_worker.wait_ready()
+
+    stop = threading.Event()
+    lags = []
+    threads = [threading.Thread(target=cpu_heavy_skill, args=(stop,), daemon=True) for _ in range(load)]
+    threads.append(threading.Thread(target=sample_lag, args=(recognizer, stop, lags), daemon=True))
+    for t in threads:
+        t.start()
+
+    asr, recognized = [], 0
+    for path in files:
+        text, _, t_text, _ = run_clip(path, source, capture, recognizer)
+        if text:
+            recognized += 1
+            asr.append((t_text - source.speech_end) * 1000)
+
+    stop.set()
+    for t in threads:
+        t.join()
+    recognizer.stop()
+    capture.stop()
+    return asr, lags, recognized
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default="data/media/audios", help="каталог или файл с записями (WAV/FLAC)")
+    parser.add_argument("--load", type=int, nargs="+", default=[0, 2], help="число CPU-тяжёлых потоков")
+    parser.add_argument("--speed", type=float, default=1.0, help="1 — реальное время, как с микрофона")
+    parser.add_argument("--gap", type=float, default=1.0, help="секунды тишины после каждого файла")
+    args = parser.parse_args()
+
+    config = get_settings().config or {}
+    files = FileSource.expand(args.corpus)
+
+    print(f"{'load':>4} {'mode':<15} {'asr p50':>8} {'asr p95':>8} {'lag p50':>8} {'lag p95':>8} "
+          f"{'lag max':>8} {'recognized':>10}")
+    for load in args.load:
+        for name, out_of_process in MODES.items():
+            asr, lags, recognized = run_mode(config, out_of_process, files, load, args.speed, args.gap)
+            asr_p50 = statistics.median(asr) if asr else 0.0
+            lag_p50 = statistics.median(lags) if lags else 0.0
+            print(f"{load:>4} {name:<15} {asr_p50:>8.0f} {percentile(asr, 95):>8.0f} {lag_p50:>8.0f} "
+                  f"{percentile(lags, 95):>8.0f} {max(lags, default=0):>8.0f} {recognized:>6}/{len(files)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,23 +4,25 @@ Optimized main.py for Jarvis-like assistant.
 Features:
 - Threaded TTS and recognizer workers
 - speaking Event to avoid recognizing own speech
-- wake-word detection with regex-word boundaries
+- wake-word detection with one precompiled TextNormalizer
 - active-mode with timeout that refreshes on commands
 - safe skill/context passing
 - graceful shutdown and reload commands
 """
 
 import time
-import re
 import threading
 import queue
 from typing import Optional
 
+from src.core.audio_capture import AudioCapture
 from src.core.recognizer import Recognizer
 from src.core.tts import HybridTTS
 from src.core.skill_manager import SkillManager
-from src.core.executor import Executor
+from src.core.executor import Executor, NOT_UNDERSTOOD
+from src.core.normalizer import TextNormalizer
 from src.core.config import get_settings
+from src.core.speech_warmup import SpeechWarmup, collect_phrases
 from src.utils import logger
 
 
@@ -38,13 +40,25 @@ DEFAULT_ACTIVE_TIMEOUT = 20.0         # seconds assistant stays active after wak
 RECOGNIZER_BACKOFF = 0.12             # sleep between recognizer loop iterations
 MISUNDERSTAND_LIMIT = 3               # сколько подряд пустых распознаваний -> prompt
 
+# Встроенные фразы (их вместе с ответами из commands.yaml заранее синтезирует SpeechWarmup)
+LISTENING_PROMPT = "Слушаю вас."
+STILL_LISTENING_PROMPT = "Да, я слушаю."
+REPEAT_PROMPT = "Не понял, повторите."
+EXECUTION_ERROR = {
+    "ru": "Произошла ошибка при выполнении команды.",
+    "en": "An error occurred executing the command.",
+    "uz": "Buyruqni bajarishda xato yuz berdi."
+}
+STATIC_PROMPTS = (LISTENING_PROMPT, STILL_LISTENING_PROMPT, REPEAT_PROMPT, EXECUTION_ERROR, NOT_UNDERSTOOD)
+
 # -----------------------
 # TTS worker
 # -----------------------
-def tts_worker(tts: HybridTTS):
+def tts_worker(tts: HybridTTS, recognizer: Optional[Recognizer] = None):
     """
     Дочерний поток для последовательного озвучивания.
-    Помечает SPEAKING во время воспроизведения, чтобы распознаватель игнорировал свои же звуки.
+    Помечает SPEAKING во время воспроизведения, чтобы распознаватель игнорировал свои же звуки;
+    recognizer на это время не декодирует аудио, а после ответа сразу переходит к живому потоку.
     """
     logger.debug("TTS worker started")
     while not SHUTDOWN.is_set():
@@ -59,6 +73,8 @@ def tts_worker(tts: HybridTTS):
                 continue
             # set speaking flag so recognizer can skip audio while we output
             SPEAKING.set()
+            if recognizer is not None:
+                recognizer.pause_listening()
             logger.info(f"[TTS] Speaking ({lang}): {text}")
             try:
                 # HybridTTS.speak is blocking (plays and waits)
@@ -68,6 +84,8 @@ def tts_worker(tts: HybridTTS):
             finally:
                 # small safety sleep to let audio device drain
                 time.sleep(0.12)
+                if recognizer is not None:
+                    recognizer.resume_listening()
                 SPEAKING.clear()
         finally:
             tts_queue.task_done()
@@ -142,31 +160,6 @@ def recognizer_worker(recognizer: Recognizer, silence_threshold: float = 3.0):
 # -----------------------
 # Helpers
 # -----------------------
-def build_wake_words(config: dict) -> set:
-    wake_words = set()
-    wake_cfg = config.get("wake_words", {}) or {}
-    if isinstance(wake_cfg, dict):
-        for lang_words in wake_cfg.values():
-            if isinstance(lang_words, (list, tuple)):
-                for w in lang_words:
-                    wake_words.add(w.lower().strip())
-    # backward compat
-    single = config.get("wake_word")
-    if single:
-        wake_words.add(str(single).lower().strip())
-    return wake_words
-
-
-def remove_wake_word(text: str, wake_word: Optional[str]) -> str:
-    if not text:
-        return ""
-    if not wake_word:
-        return text.strip().lower()
-    # use word boundaries to avoid accidental partial matches
-    cleaned = re.sub(rf"\b{re.escape(wake_word)}\b", "", text, flags=re.IGNORECASE)
-    return cleaned.strip().lower()
-
-
 def is_reload_command(text: str, meta: dict, key: str) -> bool:
     if not (text and meta):
         return False
@@ -177,17 +170,34 @@ def is_reload_command(text: str, meta: dict, key: str) -> bool:
 # -----------------------
 # Text processing core
 # -----------------------
+def deactivate_if_expired(active_state: dict, recognizer: Optional[Recognizer] = None) -> bool:
+    """
+    Истёк active_timeout -> ассистент неактивен, распознаватель возвращается к поиску wake-word.
+    Вызывается и на каждую фразу, и из главного цикла, пока фраз нет.
+    """
+    if not active_state["active"] or time.time() - active_state["last"] <= active_state["timeout"]:
+        return False
+    logger.info("😴 Active timeout expired. Deactivating.")
+    active_state["active"] = False
+    if recognizer is not None:
+        recognizer.sleep()
+    return True
+
+
 def process_text(executor: Executor, dataset: dict, skills: SkillManager,
-                 text: str, lang: Optional[str], wake_words: set, active_state: dict):
+                 text: str, lang: Optional[str], active_state: dict, recognizer: Optional[Recognizer] = None):
     """
     Главная логика: wake-word -> activation -> commands -> execution
     active_state = { "active": bool, "last": float, "timeout": float }
+    recognizer — чтобы после active_timeout вернуть его к поиску wake-word и пересобрать грамматику.
     """
     if not text:
         # empty text used as a 'prompt' for user to repeat
         logger.debug("Empty prompt received (user silent)")
         return
 
+    # один нормализатор на всю фразу (при перезагрузке executor подменяет его целиком)
+    normalizer = executor.normalizer
     normalized = text.lower().strip()
     lang = (lang or active_state.get("lang") or "ru").lower()
     logger.info(f"🧠 Распознано ({lang}): {normalized}")
@@ -195,9 +205,9 @@ def process_text(executor: Executor, dataset: dict, skills: SkillManager,
     # If not active — check wake words
     if not active_state["active"]:
         # find whole-word wake
-        triggered = next((w for w in wake_words if re.search(rf"\b{re.escape(w)}\b", normalized)), None)
+        triggered = normalizer.find_wake_word(normalized)
         if triggered:
-            cleaned = remove_wake_word(normalized, triggered)
+            cleaned = normalizer.strip_wake_words(normalized)
             # go active and update timer
             active_state["active"] = True
             active_state["last"] = time.time()
@@ -209,27 +219,24 @@ def process_text(executor: Executor, dataset: dict, skills: SkillManager,
                 _execute_and_respond(executor, skills, dataset, cleaned, lang)
             else:
                 # acknowledgement
-                tts_queue.put(("Слушаю вас.", lang))
+                tts_queue.put((LISTENING_PROMPT, lang))
         else:
             logger.debug("No wake word detected and assistant inactive -> ignoring")
         return
 
     # if active: check timeout
-    if time.time() - active_state["last"] > active_state["timeout"]:
-        logger.info("😴 Active timeout expired. Deactivating.")
-        active_state["active"] = False
+    if deactivate_if_expired(active_state, recognizer):
         return
 
     # refresh last active time on any recognized text
     active_state["last"] = time.time()
 
     # remove wake word if present in ongoing conversation
-    triggered = next((w for w in wake_words if re.search(rf"\b{re.escape(w)}\b", normalized)), None)
-    cleaned_text = remove_wake_word(normalized, triggered) if triggered else normalized
+    cleaned_text = normalizer.strip_wake_words(normalized)
 
     if not cleaned_text:
         # nothing after wake word
-        tts_queue.put(("Да, я слушаю.", lang))
+        tts_queue.put((STILL_LISTENING_PROMPT, lang))
         return
 
     meta = dataset.get("meta", {}) or {}
@@ -237,9 +244,20 @@ def process_text(executor: Executor, dataset: dict, skills: SkillManager,
     # special meta commands (reload dataset, restart skills)
     if is_reload_command(cleaned_text, meta, "reload_dataset"):
         logger.info("🔁 Reload dataset command received")
-        settings = get_settings()
+        # индекс не компилируется заново: матчер применит к себе только изменённые команды
+        settings = get_settings(compile_index=False)
         dataset = settings.dataset
-        executor.update_dataset(dataset)
+        # нормализатор собирается заново из свежего config.yaml; если он изменился — матчер пересобирается
+        executor.update_dataset(dataset, normalizer=TextNormalizer.from_config(settings.config),
+                                index=settings.command_index)
+        skills.context["normalizer"] = executor.normalizer
+        # грамматика Vosk собирается из тех же паттернов
+        if recognizer is not None:
+            recognizer.set_grammar(dataset)
+        # новые ответы прогреваются в кэш речи заново
+        warmup = skills.context.get("speech_warmup")
+        if warmup is not None:
+            warmup.start(collect_phrases(dataset, STATIC_PROMPTS))
         skills.reload()
         resp = meta.get("reload_dataset", {}).get("response", {}).get(lang, "Датасет обновлён.")
         tts_queue.put((resp, lang))
@@ -266,11 +284,7 @@ def _execute_and_respond(executor: Executor, skills: SkillManager, dataset: dict
         response = executor.handle(text, lang=lang)
     except Exception as e:
         logger.exception(f"Executor error: {e}")
-        response = {
-            "ru": "Произошла ошибка при выполнении команды.",
-            "en": "An error occurred executing the command.",
-            "uz": "Buyruqni bajarishda xato yuz berdi."
-        }.get(lang, "Ошибка.")
+        response = EXECUTION_ERROR.get(lang, "Ошибка.")
 
     # response can be a dict (meta) or string
     if isinstance(response, dict):
@@ -281,7 +295,7 @@ def _execute_and_respond(executor: Executor, skills: SkillManager, dataset: dict
     if out:
         tts_queue.put((out, lang))
     else:
-        tts_queue.put(("Не понял, повторите.", lang))
+        tts_queue.put((REPEAT_PROMPT, lang))
 
 
 # -----------------------
@@ -292,24 +306,32 @@ def main():
     config = settings.config or {}
     dataset = settings.dataset or {}
 
-    # init components
-    recognizer = Recognizer(config)
+    # init components: один поток микрофона на все аудио-потребители
+    capture = AudioCapture.from_config(config)
+    recognizer = Recognizer(config, capture=capture, dataset=dataset)
     tts = HybridTTS(config)
+    # прогрев кэша речи ждёт, пока озвучка занята или в очереди есть ответ
+    warmup = SpeechWarmup.from_config(config, tts, busy=lambda: SPEAKING.is_set() or not tts_queue.empty())
+
+    # one precompiled text normalizer shared by main loop, matcher and skills
+    normalizer = TextNormalizer.from_config(config)
 
     # context that will be passed into SkillManager (so skills can access config/dataset/tts/etc.)
-    context = {"config": config, "dataset": dataset, "workers": WORKERS, "tts": tts}
+    context = {"config": config, "dataset": dataset, "workers": WORKERS, "tts": tts, "normalizer": normalizer,
+               "recognizer": recognizer, "speech_warmup": warmup}
     skills = SkillManager(context=context)
-    executor = Executor(dataset, skills, config=config)
+    executor = Executor(dataset, skills, config=config, normalizer=normalizer, index=settings.command_index)
 
-    wake_words = build_wake_words(config)
-    logger.info(f"🎧 Wake words: {', '.join(sorted(wake_words)) or 'NONE'}")
+    logger.info(f"🎧 Wake words: {', '.join(sorted(normalizer.wake_words)) or 'NONE'}")
 
     # start workers
-    t_worker = threading.Thread(target=tts_worker, args=(tts,), daemon=True, name="TTS-Worker")
+    t_worker = threading.Thread(target=tts_worker, args=(tts, recognizer), daemon=True, name="TTS-Worker")
     r_worker = threading.Thread(target=recognizer_worker, args=(recognizer,), daemon=True, name="Recognizer-Worker")
     t_worker.start()
     r_worker.start()
     WORKERS.extend([t_worker, r_worker])
+    if warmup is not None:
+        warmup.start(collect_phrases(dataset, STATIC_PROMPTS))
 
     # active state
     active_state = {"active": False, "last": 0.0, "timeout": config.get("assistant", {}).get("active_timeout", DEFAULT_ACTIVE_TIMEOUT), "lang": config.get("assistant", {}).get("default_language", "ru")}
@@ -321,11 +343,13 @@ def main():
             try:
                 text, lang = recognizer_queue.get(timeout=0.2)
             except queue.Empty:
+                # тишина: active_timeout истекает и без новых фраз — распознаватель уходит в ожидание wake-word
+                deactivate_if_expired(active_state, recognizer)
                 continue
 
             # process_text does internal checks for active state, wake words etc.
             try:
-                process_text(executor, dataset, skills, text, lang, wake_words, active_state)
+                process_text(executor, dataset, skills, text, lang, active_state, recognizer)
             except Exception as e:
                 logger.exception(f"[PROCESS ERROR] {e}")
             finally:
@@ -337,6 +361,8 @@ def main():
     finally:
         # Graceful shutdown
         SHUTDOWN.set()
+        if warmup is not None:
+            warmup.stop()
         logger.info("Waiting for queues to drain...")
         try:
             tts_queue.join()
@@ -348,6 +374,7 @@ def main():
             recognizer.stop()
         except Exception:
             pass
+        capture.stop()
 
         for w in WORKERS:
             if w.is_alive():
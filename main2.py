@@ -1,6 +1,7 @@
 import threading
 import time
 import logging
+from src.core.audio_capture import AudioCapture
 from src.core.porcupine_listener import PorcupineListener
 from src.core.recognizer import Recognizer
 from src.core.tts import HybridTTS
@@ -16,7 +17,9 @@ class JarvisAssistant:
         self.config = settings.config
         self.dataset = settings.dataset
 
-        self.recognizer = Recognizer(self.config)
+        # один поток микрофона: wake word и распознавание читают его через подписки
+        self.capture = AudioCapture.from_config(self.config)
+        self.recognizer = Recognizer(self.config, capture=self.capture, dataset=self.dataset)
         self.tts = HybridTTS(self.config)
         self.skills = SkillManager(context={
             "config": self.config, 
@@ -24,7 +27,7 @@ class JarvisAssistant:
             "tts": self.tts
         })
         self.executor = Executor(self.dataset, self.skills, config=self.config)
-        self.porcupine = PorcupineListener(keyword="jarvis", sensitivity=0.7)
+        self.porcupine = PorcupineListener(keyword="jarvis", sensitivity=0.7, capture=self.capture)
 
         self.active = False
         self.last_heard = 0
@@ -86,6 +89,8 @@ class JarvisAssistant:
         except KeyboardInterrupt:
             logger.info("🛑 Завершение работы Jarvis.")
             self.porcupine.stop()
+            self.recognizer.stop()
+            self.capture.stop()
 
 if __name__ == "__main__":
     logging.basicConfig(
@@ -0,0 +1,69 @@
+"""
+Автомат Ахо–Корасик над словами (без внешних библиотек).
+
+Находит за один линейный проход по фразе все паттерны, которые входят в неё
+дословно как последовательность целых слов: «открой браузер» найдётся в
+«быстро открой браузер», но не в «переоткрой браузеры».
+"""
+from collections import deque
+
+
+class TokenAutomaton:
+    """Автомат по последовательностям токенов: add() для каждого паттерна, затем build()."""
+
+    def __init__(self):
+        self._goto = [{}]     # узел -> {токен: следующий узел}
+        self._fail = [0]      # суффиксные ссылки
+        self._out = [()]      # id паттернов, оканчивающихся в узле
+        self._depth = [0]     # длина пути (в токенах)
+        self._link = [-1]     # ближайший по суффиксным ссылкам узел с выходом
+        self.size = 0
+
+    def add(self, tokens, pattern_id: int):
+        node = 0
+        for t in tokens:
+            nxt = self._goto[node].get(t)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][t] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+                self._depth.append(self._depth[node] + 1)
+                self._link.append(-1)
+            node = nxt
+        if node:
+            self._out[node] += (pattern_id,)
+            self.size += 1
+
+    def build(self):
+        """Суффиксные и выходные ссылки обходом в ширину."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for token, child in self._goto[node].items():
+                queue.append(child)
+                f = self._fail[node]
+                while f and token not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(token, 0)
+                self._fail[child] = target if target != child else 0
+                fc = self._fail[child]
+                self._link[child] = fc if self._out[fc] else self._link[fc]
+        return self
+
+    def search(self, tokens):
+        """Все вхождения: [(end, length, pattern_id)], end — индекс токена после вхождения."""
+        hits = []
+        goto, fail, out, depth, link = self._goto, self._fail, self._out, self._depth, self._link
+        node = 0
+        for pos, t in enumerate(tokens, 1):
+            while node and t not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(t, 0)
+            n = node if out[node] else link[node]
+            while n > 0:
+                for pid in out[n]:
+                    hits.append((pos, depth[n], pid))
+                n = link[n]
+        return hits
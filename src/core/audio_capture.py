@@ -0,0 +1,438 @@
+"""
+Единый захват микрофона с раздачей блоков всем потребителям.
+
+AudioCapture — единственный владелец sd.RawInputStream. Блоки PCM int16
+пишутся прямо из callback в заранее выделенное кольцо (np.int16, history_s
+секунд) и получают порядковый номер; подписчики (Vosk, онлайн-VAD, wake-word,
+запись) читают кольцо через Subscription со своим курсором, поэтому блоки не
+дублируются и не теряются между потребителями, а медленный подписчик не
+задерживает остальных. read() возвращает memoryview на слот кольца без копии —
+он действителен, пока слот не перезаписан (history_s секунд).
+
+Переполнение (самый медленный подписчик отстал на всё кольцо) — overflow:
+- drop_oldest — новый блок перезаписывает самый старый, отставший подписчик
+  перескакивает вперёд и считает потерю (dropped);
+- drop_newest — новый блок отбрасывается, подписчик дочитывает старые.
+
+Метрики (stats()): overruns (перезаписанные непрочитанными или отброшенные
+блоки), buffered_s (максимальное отставание), по подписчику — отставание
+(блоки / мс / с), максимум отставания, доставленные и пропущенные блоки.
+
+Вместо микрофона источником может быть FileSource (audio.source: file) —
+WAV/FLAC-файлы проигрываются в тот же конвейер в реальном времени или
+ускоренно; так распознавание тестируется и замеряется без звуковой карты.
+"""
+import threading
+import time
+import wave
+from pathlib import Path
+
+import numpy as np
+
+from src.utils import logger
+
+# --- Опциональные импорты ---
+try:
+    import sounddevice as sd
+except (ImportError, OSError):  # нет PortAudio (headless CI) — доступен только FileSource
+    sd = None
+
+try:
+    import soundfile as sf
+except (ImportError, OSError):
+    sf = None
+
+
+class Subscription:
+    """Курсор подписчика в истории блоков AudioCapture."""
+
+    def __init__(self, capture: "AudioCapture", name: str, cursor: int):
+        self.capture = capture
+        self.name = name
+        self.cursor = cursor
+        self.delivered = 0
+        self.dropped = 0
+        self.max_lag = 0
+        self.closed = False
+
+    def read(self, timeout: float = None):
+        """
+        Следующий блок (memoryview байтов PCM int16, без копии) или None, если за
+        timeout новых блоков нет / подписка закрыта. Данные, которые нужны дольше
+        одного чтения, копируйте (bytes(block) / np.array).
+        """
+        cap = self.capture
+        with cap._cond:
+            if not cap._cond.wait_for(lambda: self.closed or self.cursor < cap._seq, timeout):
+                return None
+            if self.closed:
+                return None
+            lag = cap._seq - self.cursor
+            if lag > self.max_lag:
+                self.max_lag = lag
+            oldest = cap._seq - cap.slots
+            if self.cursor < oldest:
+                # подписчик отстал больше, чем хранит кольцо — догоняем, считая потерю
+                self.dropped += oldest - self.cursor
+                logger.warning(f"⚠️ [AUDIO] '{self.name}' отстал: пропущено {oldest - self.cursor} блоков")
+                self.cursor = oldest
+            slot = self.cursor % cap.slots
+            block = memoryview(cap._ring[slot, :cap._lengths[slot]]).cast("B")
+            self.cursor += 1
+            self.delivered += 1
+            return block
+
+    def skip_to_live(self) -> int:
+        """Пропускает накопленные блоки (например, после озвучки). Возвращает их число."""
+        with self.capture._cond:
+            skipped = self.capture._seq - self.cursor
+            self.cursor = self.capture._seq
+            return skipped
+
+    def rewind(self, blocks: int) -> int:
+        """Отступает на blocks блоков назад (в пределах кольца). Возвращает, на сколько удалось."""
+        with self.capture._cond:
+            oldest = max(0, self.capture._seq - self.capture.slots)
+            target = max(oldest, self.cursor - max(0, blocks))
+            moved = self.cursor - target
+            self.cursor = target
+            return moved
+
+    @property
+    def lag(self) -> int:
+        """Сколько опубликованных блоков ещё не прочитано."""
+        return self.capture._seq - self.cursor
+
+    @property
+    def lag_ms(self) -> float:
+        return self.lag * self.capture.block_ms
+
+    def close(self):
+        """Закрывает только эту подписку: новую с тем же именем не трогает. Повторный вызов — no-op."""
+        self.capture.unsubscribe(self.name, self)
+
+    def stats(self) -> dict:
+        return {
+            "lag_blocks": self.lag,
+            "lag_ms": self.lag_ms,
+            "buffered_s": self.lag_ms / 1000,
+            "max_lag_blocks": self.max_lag,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+
+class AudioCapture:
+    """
+    Один поток микрофона на весь процесс. subscribe(name) — новый курсор
+    с текущего момента; кольцо хранит последние history_s секунд.
+    """
+
+    OVERFLOW_POLICIES = ("drop_oldest", "drop_newest")
+
+    def __init__(self, sample_rate: int = 16000, block_ms: int = 100, channels: int = 1,
+                 history_s: float = 10.0, overflow: str = "drop_oldest", device=None, source=None):
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"overflow: ожидается {' / '.join(self.OVERFLOW_POLICIES)}, получено {overflow!r}")
+        self.sample_rate = sample_rate
+        self.block_ms = block_ms
+        self.block_size = sample_rate * block_ms // 1000
+        self.channels = channels
+        self.device = device
+        self.overflow = overflow
+        self.source = source
+        self._started = False
+        # кольцо выделяется один раз: callback только копирует блок в слот
+        self.slots = max(1, int(history_s * 1000 / block_ms))
+        self._ring = np.zeros((self.slots, self.block_size * channels), dtype=np.int16)
+        self._lengths = np.zeros(self.slots, dtype=np.int64)
+        self._seq = 0
+        self.overruns = 0
+        self._cond = threading.Condition()
+        self._subs = {}
+        self.stream = None
+        self.status_errors = 0
+
+    @classmethod
+    def from_config(cls, config: dict):
+        audio = (config or {}).get("audio", {}) or {}
+        return cls(
+            sample_rate=audio.get("sample_rate", 16000),
+            block_ms=audio.get("block_ms", 100),
+            history_s=audio.get("history_s", 10.0),
+            overflow=audio.get("overflow", "drop_oldest"),
+            device=audio.get("device"),
+            source=FileSource.from_config(audio) if audio.get("source", "mic") == "file" else None,
+        )
+
+    # --- поток ---
+    def start(self):
+        if self._started:
+            return
+        self._started = True
+        if self.source is not None:
+            self.source.start(self)
+            return
+        if sd is None:
+            self._started = False
+            raise RuntimeError("sounddevice/PortAudio недоступен — укажите audio.source: file")
+        self.stream = sd.RawInputStream(
+            samplerate=self.sample_rate,
+            blocksize=self.block_size,
+            dtype="int16",
+            channels=self.channels,
+            device=self.device,
+            callback=self._callback,
+        )
+        self.stream.start()
+        logger.info("🎤 Микрофон активен (общий поток захвата)")
+
+    def _callback(self, indata, frames, time_, status):
+        if status:
+            self.status_errors += 1
+            logger.info(f"[AUDIO WARNING] {status}")
+        self.publish(indata)
+
+    def publish(self, block):
+        """
+        Копирует блок PCM int16 (bytes, буфер callback или np.int16) в кольцо
+        и будит подписчиков. Блок длиннее слота раскладывается на несколько.
+        """
+        data = np.frombuffer(block, dtype=np.int16) if not isinstance(block, np.ndarray) else block.reshape(-1)
+        width = self._ring.shape[1]
+        with self._cond:
+            for start in range(0, len(data), width):
+                chunk = data[start:start + width]
+                if self._subs and self._seq - min(sub.cursor for sub in self._subs.values()) >= self.slots:
+                    # самый медленный подписчик не успел прочитать самый старый слот
+                    self.overruns += 1
+                    if self.overflow == "drop_newest":
+                        continue
+                slot = self._seq % self.slots
+                self._ring[slot, :len(chunk)] = chunk
+                self._lengths[slot] = len(chunk)
+                self._seq += 1
+            self._cond.notify_all()
+
+    def stop(self):
+        self._started = False
+        if self.source is not None:
+            self.source.stop()
+        if self.stream is not None:
+            try:
+                self.stream.stop()
+                self.stream.close()
+            except Exception as e:
+                logger.warning(f"⚠️ Ошибка при остановке микрофона: {e}")
+            self.stream = None
+        with self._cond:
+            for sub in self._subs.values():
+                sub.closed = True
+            self._cond.notify_all()
+        logger.info(f"🎤 Захват остановлен: {self.stats()}")
+
+    # --- подписчики ---
+    def subscribe(self, name: str) -> Subscription:
+        """Новый подписчик, читающий с текущего блока. Повторная подписка с тем же именем заменяет старую."""
+        with self._cond:
+            old = self._subs.get(name)
+            if old is not None:
+                old.closed = True
+            sub = Subscription(self, name, self._seq)
+            self._subs[name] = sub
+            self._cond.notify_all()
+        return sub
+
+    def unsubscribe(self, name: str, sub: Subscription = None):
+        """Снимает подписчика name; с sub — только если name всё ещё принадлежит этому sub."""
+        with self._cond:
+            current = self._subs.get(name)
+            if sub is not None:
+                # устаревший хэндл: подписку уже заменили — закрываем только его
+                sub.closed = True
+                if current is not sub:
+                    self._cond.notify_all()
+                    return
+            if current is not None:
+                del self._subs[name]
+                current.closed = True
+                self._cond.notify_all()
+
+    @property
+    def buffered_s(self) -> float:
+        """Сколько секунд аудио ждёт самого медленного подписчика."""
+        with self._cond:
+            lag = max((sub.lag for sub in self._subs.values()), default=0)
+        return min(lag, self.slots) * self.block_ms / 1000
+
+    def stats(self) -> dict:
+        """Счётчики переполнения и отставание по каждому подписчику."""
+        buffered_s = self.buffered_s
+        with self._cond:
+            return {
+                "overruns": self.overruns,
+                "buffered_s": buffered_s,
+                "subscribers": {name: sub.stats() for name, sub in self._subs.items()},
+            }
+
+
+AUDIO_EXTENSIONS = (".wav", ".flac", ".ogg")
+
+
+def read_audio(path, sample_rate: int = 16000) -> np.ndarray:
+    """Файл → моно PCM int16 с частотой sample_rate (без soundfile читается только WAV)."""
+    if sf is not None:
+        data, rate = sf.read(str(path), dtype="int16", always_2d=True)
+    else:
+        with wave.open(str(path), "rb") as wf:
+            if wf.getsampwidth() != 2:
+                raise ValueError(f"{path}: без soundfile поддерживается только 16-битный WAV")
+            rate = wf.getframerate()
+            data = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16).reshape(-1, wf.getnchannels())
+    pcm = data.mean(axis=1) if data.shape[1] > 1 else data[:, 0]
+    if rate != sample_rate:
+        from math import gcd
+        from scipy.signal import resample_poly
+
+        g = gcd(sample_rate, rate)
+        pcm = resample_poly(pcm.astype(np.float32), sample_rate // g, rate // g)
+    return np.clip(pcm, -32768, 32767).astype(np.int16)
+
+
+class FileSource:
+    """
+    Источник AudioCapture из файлов вместо микрофона.
+
+    speed — 1.0 реальное время, 4.0 — в 4 раза быстрее, 0 — без пауз.
+    После каждого файла добавляется gap_s тишины, чтобы VAD / Vosk закрыли
+    фразу. Источник не теряет аудио: если подписчики отстали на половину
+    кольца, публикация ждёт.
+    """
+
+    def __init__(self, paths=(), speed: float = 1.0, gap_s: float = 1.0, loop: bool = False):
+        self.paths = self.expand(paths)
+        self.speed = speed
+        self.gap_s = gap_s
+        self.loop = loop
+        self.finished = threading.Event()
+        self.speech_end = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_config(cls, audio: dict):
+        return cls(
+            paths=audio.get("files", []) or [],
+            speed=audio.get("speed", 1.0),
+            gap_s=audio.get("gap_s", 1.0),
+            loop=audio.get("loop", False),
+        )
+
+    @staticmethod
+    def expand(paths) -> list:
+        """Файлы и каталоги → отсортированный список аудиофайлов."""
+        files = []
+        for p in [paths] if isinstance(paths, (str, Path)) else paths:
+            p = Path(p)
+            if p.is_dir():
+                files.extend(sorted(f for f in p.iterdir() if f.suffix.lower() in AUDIO_EXTENSIONS))
+            else:
+                files.append(p)
+        return files
+
+    def start(self, capture: AudioCapture):
+        """Проигрывает все paths в фоне (audio.source: file)."""
+        self._stop.clear()
+        self.finished.clear()
+
+        def run():
+            while not self._stop.is_set():
+                for path in self.paths:
+                    if self._stop.is_set():
+                        break
+                    self.publish_file(capture, path)
+                if not self.loop:
+                    break
+            self.finished.set()
+            logger.info("🎞️ Файловый источник: воспроизведение завершено")
+
+        self._thread = threading.Thread(target=run, daemon=True, name="Audio-FileSource")
+        self._thread.start()
+        logger.info(f"🎞️ Файловый источник: {len(self.paths)} файлов, скорость {self.speed or 'max'}")
+
+    def play(self, capture: AudioCapture, path) -> threading.Event:
+        """Проигрывает один файл в фоне; событие устанавливается после хвоста тишины."""
+        done = threading.Event()
+
+        def run():
+            self.publish_file(capture, path)
+            done.set()
+
+        threading.Thread(target=run, daemon=True, name="Audio-FilePlay").start()
+        return done
+
+    def publish_file(self, capture: AudioCapture, path) -> float:
+        """
+        Публикует файл и хвост тишины в темпе speed. Момент публикации
+        последнего блока файла (monotonic) — в speech_end, от него считается задержка.
+        """
+        pcm = read_audio(path, capture.sample_rate)
+        self._publish(capture, pcm)
+        self.speech_end = time.monotonic()
+        self._publish(capture, np.zeros(int(self.gap_s * capture.sample_rate), dtype=np.int16))
+        return self.speech_end
+
+    def _publish(self, capture: AudioCapture, pcm: np.ndarray):
+        step = capture.block_size
+        block_s = capture.block_ms / 1000
+        half = capture.slots * block_s / 2
+        start = time.monotonic()
+        for k, pos in enumerate(range(0, len(pcm), step)):
+            if self._stop.is_set():
+                return
+            while capture.buffered_s > half and not self._stop.is_set():
+                time.sleep(0.002)
+            capture.publish(pcm[pos:pos + step])
+            if self.speed > 0:
+                delay = start + (k + 1) * block_s / self.speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+
+class Recorder:
+    """Подписчик, записывающий поток микрофона в WAV (отладка, сбор фраз для тестов)."""
+
+    def __init__(self, capture: AudioCapture, path):
+        self.capture = capture
+        self.path = str(path)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        sub = self.capture.subscribe("recorder")
+        self._thread = threading.Thread(target=self._run, args=(sub,), daemon=True, name="Audio-Recorder")
+        self._thread.start()
+
+    def _run(self, sub: Subscription):
+        with wave.open(self.path, "wb") as wf:
+            wf.setnchannels(self.capture.channels)
+            wf.setsampwidth(2)
+            wf.setframerate(self.capture.sample_rate)
+            while not self._stop.is_set():
+                block = sub.read(timeout=0.5)
+                if block is not None:
+                    wf.writeframes(block)
+        sub.close()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
@@ -0,0 +1,355 @@
+"""
+Скомпилированный индекс команд (commands.yaml -> бинарный артефакт).
+
+Артефакт хранит нормализованные паттерны, таблицы action/response, сам датасет
+и индексы токенов/триграмм. Он лежит в cache_dir в папке, имя которой —
+хэш содержимого YAML и настроек нормализатора, поэтому устаревший артефакт
+просто не находится и пересобирается.
+
+Структура папки артефакта:
+    meta.pkl              — версия, ключ, датасет, паттерны, словари токенов/триграмм
+    token_offsets.npy     — CSR-смещения списков паттернов для токенов
+    token_ids.npy         — id паттернов для токенов
+    trigram_offsets.npy   — то же для триграмм
+    trigram_ids.npy
+
+Массивы .npy открываются через memory-map (np.load(mmap_mode="r")).
+
+Ручная компиляция:
+    python -m src.core.command_index [путь/к/commands.yaml]
+"""
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from pathlib import Path
+
+import numpy as np
+
+from src.utils import logger
+from .normalizer import TextNormalizer
+from .langid import LANGS, detect_language
+
+INDEX_VERSION = 2
+
+
+def trigrams(token: str):
+    """Символьные триграммы слова с граничными пробелами (для ослышанных слов)."""
+    padded = f" {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def index_key(yaml_bytes: bytes, normalizer: TextNormalizer) -> str:
+    """Ключ артефакта: хэш содержимого YAML + настройки нормализатора + версия формата."""
+    h = hashlib.sha256()
+    h.update(f"v{INDEX_VERSION}\0".encode())
+    h.update(normalizer.signature().encode("utf-8"))
+    h.update(b"\0")
+    h.update(yaml_bytes)
+    return h.hexdigest()[:32]
+
+
+class Postings:
+    """
+    Неизменяемый инвертированный индекс в CSR-виде: term -> список id паттернов.
+    Массивы могут быть memory-mapped прямо из артефакта.
+    """
+
+    def __init__(self, vocab: dict, offsets: np.ndarray, ids: np.ndarray):
+        self.vocab = vocab
+        self.offsets = offsets
+        self.ids = ids
+
+    @classmethod
+    def from_dict(cls, index: dict):
+        vocab = {}
+        offsets = np.zeros(len(index) + 1, dtype=np.int32)
+        chunks = []
+        for row, (term, ids) in enumerate(index.items()):
+            vocab[term] = row
+            offsets[row + 1] = offsets[row] + len(ids)
+            chunks.append(ids)
+        flat = np.fromiter((i for c in chunks for i in c), dtype=np.int32, count=int(offsets[-1]))
+        return cls(vocab, offsets, flat)
+
+    def get(self, term, default=()):
+        row = self.vocab.get(term)
+        if row is None:
+            return default
+        return self.ids[self.offsets[row]:self.offsets[row + 1]].tolist()
+
+    def to_dict(self) -> dict:
+        return {term: self.get(term) for term in self.vocab}
+
+    def __contains__(self, term):
+        return term in self.vocab
+
+    def __len__(self):
+        return len(self.vocab)
+
+
+class PostingsDelta:
+    """
+    Postings + id паттернов, добавленных после сборки (инкрементальное обновление датасета).
+    Удалённые id не вычёркиваются — их отфильтровывает SmartMatcher.
+    """
+
+    def __init__(self, base: Postings):
+        self.base = base
+        self.added = {}
+
+    def add(self, term, pattern_id: int):
+        self.added.setdefault(term, []).append(pattern_id)
+
+    def get(self, term, default=()):
+        extra = self.added.get(term)
+        if not extra:
+            return self.base.get(term, default)
+        return self.base.get(term, []) + extra
+
+    def __contains__(self, term):
+        return term in self.added or term in self.base
+
+    def __len__(self):
+        return len(self.base) + sum(1 for t in self.added if t not in self.base)
+
+
+def iter_commands(dataset: dict):
+    """
+    Команды датасета в порядке таблицы паттернов: (section, key, cmd).
+    key — категория навыка, ключ meta или smalltalk_<idx>.
+    """
+    # === Skills ===
+    skills = dataset.get("skills", {}) or {}
+    for category, data in skills.items():
+        for cmd in data.get("commands", []):
+            yield "skills", category, cmd
+
+    # === Meta ===
+    meta = dataset.get("meta", {}) or {}
+    for key, m in meta.items():
+        yield "meta", key, m
+
+    # === Smalltalk ===
+    smalltalk = dataset.get("smalltalk", {}) or {}
+    for idx, cmd in enumerate(smalltalk.get("commands", [])):
+        yield "smalltalk", f"smalltalk_{idx}", cmd
+
+
+def command_patterns(section: str, key: str, cmd: dict, normalize):
+    """
+    Строки таблицы паттернов одной команды:
+    (orig, normalized, category, key, action, response, lang)
+    lang — язык паттерна (ключ ru/en/uz в датасете или письменность), None — общий.
+    """
+    action = cmd.get("action") if section == "skills" else None
+    return [(p, normalize(p), section, key, action, cmd.get("response", ""), lang or detect_language(p))
+            for p, lang in _raw_patterns(cmd)]
+
+
+def _raw_patterns(cmd: dict):
+    """[(pattern, lang)] команды; lang известен только для паттернов, разложенных по языкам."""
+    pats = cmd.get("patterns", [])
+    if isinstance(pats, str):
+        return [(pats, None)]
+    if isinstance(pats, dict):
+        all_pats = []
+        for lang, v in pats.items():
+            lang = lang if lang in LANGS else None
+            for p in (v if isinstance(v, list) else [v]):
+                all_pats.append((p, lang))
+        return all_pats
+    return [(p, None) for p in pats or []]
+
+
+def pattern_count(cmd: dict) -> int:
+    """Сколько строк команда занимает в таблице паттернов."""
+    return len(_raw_patterns(cmd))
+
+
+def build_patterns(dataset: dict, normalize):
+    """Собирает плоскую таблицу паттернов из датасета (см. command_patterns)."""
+    patterns = []
+    for section, key, cmd in iter_commands(dataset):
+        patterns.extend(command_patterns(section, key, cmd, normalize))
+    return patterns
+
+
+def command_fingerprint(section: str, key: str, cmd: dict) -> tuple:
+    """Отпечаток команды для сравнения версий датасета (включает позицию smalltalk)."""
+    return section, key, json.dumps(cmd, sort_keys=True, ensure_ascii=False, default=str)
+
+
+@dataclass
+class DatasetDiff:
+    """
+    Разница двух версий датасета на уровне команд.
+    opcodes — как у difflib.SequenceMatcher: (tag, i1, i2, j1, j2) по старому и новому списку команд.
+    """
+    dataset: dict
+    commands: list
+    fingerprints: list
+    opcodes: list
+
+    @property
+    def added(self) -> int:
+        return sum(j2 - j1 for tag, i1, i2, j1, j2 in self.opcodes if tag == "insert")
+
+    @property
+    def removed(self) -> int:
+        return sum(i2 - i1 for tag, i1, i2, j1, j2 in self.opcodes if tag == "delete")
+
+    @property
+    def changed(self) -> int:
+        return sum(max(i2 - i1, j2 - j1) for tag, i1, i2, j1, j2 in self.opcodes if tag == "replace")
+
+    def __bool__(self):
+        return any(op[0] != "equal" for op in self.opcodes)
+
+    def __str__(self):
+        return f"+{self.added} -{self.removed} ~{self.changed} commands"
+
+
+def diff_datasets(old_fingerprints: list, new_dataset: dict) -> DatasetDiff:
+    """Сравнивает отпечатки команд текущей версии с новым датасетом (без нормализации паттернов)."""
+    new_dataset = new_dataset or {}
+    commands = list(iter_commands(new_dataset))
+    fingerprints = [command_fingerprint(*c) for c in commands]
+    opcodes = SequenceMatcher(None, old_fingerprints, fingerprints, autojunk=False).get_opcodes()
+    return DatasetDiff(new_dataset, commands, fingerprints, opcodes)
+
+
+def build_postings(patterns):
+    """Строит индексы токенов и триграмм по нормализованным паттернам."""
+    token_index = {}
+    trigram_index = {}
+    for idx, entry in enumerate(patterns):
+        tokens = set(entry[1].split())
+        grams = set()
+        for t in tokens:
+            token_index.setdefault(t, []).append(idx)
+            grams.update(trigrams(t))
+        for g in grams:
+            trigram_index.setdefault(g, []).append(idx)
+    return Postings.from_dict(token_index), Postings.from_dict(trigram_index)
+
+
+class CommandIndex:
+    """Таблица паттернов и индексы SmartMatcher, которые можно сохранить и загрузить."""
+
+    def __init__(self, dataset: dict, patterns: list, token_index: Postings, trigram_index: Postings,
+                 signature: str = "", key: str = None):
+        self.dataset = dataset
+        self.patterns = patterns
+        self.token_index = token_index
+        self.trigram_index = trigram_index
+        # настройки нормализатора, с которыми построены normalized-паттерны
+        self.signature = signature
+        self.key = key
+
+    @classmethod
+    def build(cls, dataset: dict, normalizer: TextNormalizer, key: str = None):
+        dataset = dataset or {}
+        patterns = build_patterns(dataset, normalizer.normalize)
+        token_index, trigram_index = build_postings(patterns)
+        return cls(dataset, patterns, token_index, trigram_index, normalizer.signature(), key)
+
+    # --- артефакт ---
+    def save(self, path: Path):
+        """Атомарно записывает артефакт в папку path (через временную папку рядом)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(prefix=".tmp-", dir=path.parent))
+        try:
+            meta = {
+                "version": INDEX_VERSION,
+                "key": self.key,
+                "signature": self.signature,
+                "dataset": self.dataset,
+                "patterns": self.patterns,
+                "token_vocab": self.token_index.vocab,
+                "trigram_vocab": self.trigram_index.vocab,
+            }
+            with open(tmp / "meta.pkl", "wb") as f:
+                pickle.dump(meta, f, protocol=pickle.HIGHEST_PROTOCOL)
+            np.save(tmp / "token_offsets.npy", self.token_index.offsets)
+            np.save(tmp / "token_ids.npy", self.token_index.ids)
+            np.save(tmp / "trigram_offsets.npy", self.trigram_index.offsets)
+            np.save(tmp / "trigram_ids.npy", self.trigram_index.ids)
+            os.replace(tmp, path)
+        except Exception:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+    @classmethod
+    def load(cls, path: Path, mmap: bool = True):
+        path = Path(path)
+        with open(path / "meta.pkl", "rb") as f:
+            meta = pickle.load(f)
+        if meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"index version {meta.get('version')} != {INDEX_VERSION}")
+        mode = "r" if mmap else None
+        token_index = Postings(meta["token_vocab"],
+                               np.load(path / "token_offsets.npy", mmap_mode=mode),
+                               np.load(path / "token_ids.npy", mmap_mode=mode))
+        trigram_index = Postings(meta["trigram_vocab"],
+                                 np.load(path / "trigram_offsets.npy", mmap_mode=mode),
+                                 np.load(path / "trigram_ids.npy", mmap_mode=mode))
+        return cls(meta["dataset"], meta["patterns"], token_index, trigram_index,
+                   meta.get("signature", ""), meta.get("key"))
+
+
+def load_or_compile(dataset_path: Path, normalizer: TextNormalizer, cache_dir: Path, loader, compile: bool = True):
+    """
+    Возвращает CommandIndex для dataset_path: свежий артефакт из cache_dir,
+    либо (если его нет или он устарел) парсит YAML через loader(path),
+    компилирует индекс и сохраняет новый артефакт, удаляя старые.
+    С compile=False вместо компиляции возвращает None.
+    """
+    dataset_path = Path(dataset_path)
+    cache_dir = Path(cache_dir)
+    yaml_bytes = dataset_path.read_bytes()
+    key = index_key(yaml_bytes, normalizer)
+    artifact = cache_dir / f"commands-{key}"
+
+    if artifact.exists():
+        try:
+            t = time.perf_counter()
+            index = CommandIndex.load(artifact)
+            logger.debug(f"📦 Command index loaded from {artifact.name} ({(time.perf_counter() - t) * 1000:.1f} ms)")
+            return index
+        except Exception as e:
+            logger.warning(f"⚠️ Command index {artifact.name} is broken ({e}), rebuilding")
+            shutil.rmtree(artifact, ignore_errors=True)
+
+    if not compile:
+        return None
+    t = time.perf_counter()
+    dataset = loader(dataset_path) or {}
+    index = CommandIndex.build(dataset, normalizer, key=key)
+    try:
+        index.save(artifact)
+        for old in cache_dir.glob("commands-*"):
+            if old != artifact:
+                shutil.rmtree(old, ignore_errors=True)
+    except OSError as e:
+        logger.warning(f"⚠️ Could not write command index to {cache_dir}: {e}")
+    logger.info(f"📦 Command index compiled: {len(index.patterns)} patterns ({(time.perf_counter() - t) * 1000:.1f} ms)")
+    return index
+
+
+if __name__ == "__main__":
+    import sys
+    from .config import Settings, DATASET_PATH
+
+    path = Path(sys.argv[1]) if len(sys.argv) > 1 else DATASET_PATH
+    settings = Settings(dataset_path=path)
+    index = settings.command_index
+    if index is None:
+        sys.exit(f"{path}: индекс не собран (нет датасета или matcher.index_cache: false)")
+    print(f"{path} -> {settings.index_dir / f'commands-{index.key}'} ({len(index.patterns)} patterns)")
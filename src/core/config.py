@@ -3,11 +3,16 @@ import yaml
 from pathlib import Path
 from dataclasses import dataclass, field
 
+from src.utils import logger
+from .normalizer import TextNormalizer
+from .command_index import CommandIndex, load_or_compile
+
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 DATA_PATH = BASE_DIR / "data"
 DEFAULT_CONFIG_PATH = DATA_PATH / "config.yaml"
 DATASET_PATH = DATA_PATH / "commands.yaml"
 MODELS_DIR = DATA_PATH / "models"
+CACHE_DIR = DATA_PATH / "cache"
 
 @dataclass
 class Settings:
@@ -15,14 +20,38 @@ class Settings:
     dataset_path: Path = DATASET_PATH
     config: dict = field(default_factory=dict)
     dataset: dict = field(default_factory=dict)
+    command_index: CommandIndex = field(default=None, repr=False)
+    # False — не компилировать индекс заново, если артефакта нет (при перезагрузке матчер обновляется сам)
+    compile_index: bool = True
 
     def __post_init__(self):
         self.reload()
 
     def reload(self):
         self.config = self._safe_load(self.config_path) or {}
+        self.command_index = None
+        # если commands.yaml не менялся — датасет и паттерны берутся из скомпилированного индекса
+        # не через get(): он заменяет default-ом и явный false
+        index_cache = (self.config.get("matcher") or {}).get("index_cache", True)
+        if self.dataset_path.exists() and index_cache:
+            try:
+                normalizer = TextNormalizer.from_config(self.config)
+                self.command_index = load_or_compile(self.dataset_path, normalizer, self.index_dir, self._safe_load,
+                                                     compile=self.compile_index)
+                if self.command_index is not None:
+                    self.dataset = self.command_index.dataset
+                    return
+            except Exception as e:
+                logger.warning(f"⚠️ Command index unavailable ({e}), parsing {self.dataset_path.name}")
         self.dataset = self._safe_load(self.dataset_path) or {}
 
+    @property
+    def index_dir(self) -> Path:
+        cache_dir = Path(self.get("paths", "cache_dir", default=str(CACHE_DIR)))
+        if not cache_dir.is_absolute():
+            cache_dir = BASE_DIR / cache_dir
+        return cache_dir / "index"
+
     def _safe_load(self, path: Path):
         if not path.exists():
             return {}
@@ -39,8 +68,8 @@ class Settings:
         return data or default
 
 
-def get_settings():
-    return Settings()
+def get_settings(**kwargs):
+    return Settings(**kwargs)
 
 # import yaml
 # from pathlib import Path
@@ -0,0 +1,144 @@
+"""
+Фоновая проверка интернета для переключения online / offline.
+
+ConnectivityMonitor в отдельном потоке периодически делает лёгкий HTTP-запрос
+(по умолчанию generate_204) и сообщает on_change(online) при смене состояния.
+Старт и цикл распознавания не ждут проверку.
+
+- пока сеть есть — проверка раз в interval_s;
+- без сети — экспоненциальная пауза backoff_min_s → backoff_max_s, чтобы
+  быстро заметить возвращение связи и не долбить сеть, если её долго нет;
+- report_failure() — распознаватель сам увидел ошибку сети: состояние
+  сразу offline, следующая проверка — через backoff_min_s.
+
+stats(): состояние, число проверок и ошибок, смены состояния, задержка
+последней проверки и средняя.
+"""
+import threading
+import time
+
+import requests
+
+from src.utils import logger
+
+
+class ConnectivityMonitor:
+    def __init__(self, url: str = "https://www.google.com/generate_204", timeout_s: float = 2.0,
+                 interval_s: float = 30.0, backoff_min_s: float = 2.0, backoff_max_s: float = 60.0,
+                 on_change=None):
+        self.url = url
+        self.timeout_s = timeout_s
+        self.interval_s = interval_s
+        self.backoff_min_s = backoff_min_s
+        self.backoff_max_s = backoff_max_s
+        self.on_change = on_change
+
+        self.online = None          # None — ещё не проверяли
+        self.probes = 0
+        self.failures = 0
+        self.switches = 0
+        self.last_latency_ms = None
+        self._latency_total = 0.0
+        self._failed_in_row = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_config(cls, config: dict, on_change=None):
+        net = (config or {}).get("connectivity", {}) or {}
+        return cls(
+            url=net.get("url", "https://www.google.com/generate_204"),
+            timeout_s=net.get("timeout_s", 2.0),
+            interval_s=net.get("interval_s", 30.0),
+            backoff_min_s=net.get("backoff_min_s", 2.0),
+            backoff_max_s=net.get("backoff_max_s", 60.0),
+            on_change=on_change,
+        )
+
+    # --- проверка ---
+    def probe(self) -> bool:
+        """Одна синхронная проверка; обновляет состояние и вызывает on_change при смене."""
+        t = time.perf_counter()
+        try:
+            requests.head(self.url, timeout=self.timeout_s, allow_redirects=False)
+            online = True
+        except requests.RequestException:
+            online = False
+        latency = (time.perf_counter() - t) * 1000
+        with self._lock:
+            self.probes += 1
+            self.last_latency_ms = latency
+            self._latency_total += latency
+            if online:
+                self._failed_in_row = 0
+            else:
+                self.failures += 1
+                self._failed_in_row += 1
+        logger.debug(f"🌐 Проверка сети: {'есть' if online else 'нет'} ({latency:.0f} мс)")
+        self._set(online)
+        return online
+
+    def report_failure(self):
+        """Сеть отказала по факту (ошибка запроса распознавания) — offline, перепроверка через backoff_min_s."""
+        with self._lock:
+            self._failed_in_row = 1
+        self._set(False)
+        self._wake.set()
+
+    def _set(self, online: bool):
+        with self._lock:
+            if online == self.online:
+                return
+            changed = self.online is not None
+            self.online = online
+            if changed:
+                self.switches += 1
+        if changed:
+            logger.info(f"🌐 Связь {'восстановлена' if online else 'пропала'}")
+        if self.on_change:
+            self.on_change(online)
+
+    def next_delay(self) -> float:
+        if self.online:
+            return self.interval_s
+        with self._lock:
+            failed = self._failed_in_row
+        return min(self.backoff_max_s, self.backoff_min_s * 2 ** max(0, failed - 1))
+
+    # --- фоновый поток ---
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="Connectivity-Monitor")
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.probe()
+            while True:
+                woke = self._wake.wait(self.next_delay())
+                self._wake.clear()
+                if not woke or self._stop.is_set():
+                    break
+                # report_failure: пауза отсчитывается заново, уже по offline-бэкоффу
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.timeout_s + 1)
+            self._thread = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "online": self.online,
+                "probes": self.probes,
+                "failures": self.failures,
+                "switches": self.switches,
+                "last_latency_ms": round(self.last_latency_ms, 1) if self.last_latency_ms is not None else None,
+                "avg_latency_ms": round(self._latency_total / self.probes, 1) if self.probes else None,
+            }
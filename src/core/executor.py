@@ -1,28 +1,59 @@
 from src.skills.AI.gemini_chat import GeminiSkill
 from .matcher import SmartMatcher
+from .normalizer import TextNormalizer
+from .command_index import CommandIndex
+
+# ответ, когда ни одна команда не подошла (его же заранее озвучивает SpeechWarmup)
+NOT_UNDERSTOOD = {
+    "ru": "Извини, я не понял, что ты сказал.",
+    "en": "Sorry, I did not understand.",
+    "uz": "Kechirasiz, men tushunmadim."
+}
 
 
 class Executor:
-    def __init__(self, dataset: dict, skill_manager, config: dict = None):
+    def __init__(self, dataset: dict, skill_manager, config: dict = None, normalizer: TextNormalizer = None,
+                 index: CommandIndex = None):
         self.config = config or {}
         self.dataset = dataset or {}
         self.skill_manager = skill_manager
-        self._init_matcher()
+        self._init_matcher(normalizer or TextNormalizer.from_config(self.config), index)
 
-    def _init_matcher(self):
+    def _init_matcher(self, normalizer: TextNormalizer, index: CommandIndex = None):
+        # матчер вместе со своим нормализатором подменяется одним присваиванием
         self.matcher = SmartMatcher(
             self.dataset,
             threshold=self.config.get("matcher_threshold", 70),
             debug=self.config.get("debug", False),
-            config=self.config
+            config=self.config,
+            normalizer=normalizer,
+            index=index,
         )
 
-    def update_dataset(self, new_dataset: dict):
+    @property
+    def normalizer(self) -> TextNormalizer:
+        return self.matcher.normalizer
+
+    def update_dataset(self, new_dataset: dict, normalizer: TextNormalizer = None, index: CommandIndex = None):
         self.dataset = new_dataset or {}
-        self._init_matcher()
+        normalizer = normalizer or self.normalizer
+        old = self.matcher
+        if normalizer.signature() == old.normalizer.signature():
+            # паттерны нормализуются так же — матчер обновляется на месте, только изменённые команды
+            old.normalizer = normalizer
+            diff = old.update_dataset(self.dataset)
+            if self.config.get("debug", False):
+                print(f"[DEBUG executor] dataset updated in place: {diff}")
+            return
+        self._init_matcher(normalizer, index)
+        # старые результаты больше не актуальны — освобождаем память сразу
+        if self.config.get("debug", False):
+            print("[DEBUG executor] match cache before reload:", old.cache_stats())
+            print("[DEBUG executor] match paths before reload:", old.path_stats())
+        old.clear_cache()
 
     def handle(self, text: str, lang: str = "ru") -> str:
-        matches = self.matcher.find_matches(text)
+        matches = self.matcher.find_matches(text, lang=lang)
 
         if not matches:
             # AI
@@ -35,11 +66,7 @@ class Executor:
                 )
                 return ai.ask(text, lang)
             
-            return {
-                "ru": "Извини, я не понял, что ты сказал.",
-                "en": "Sorry, I did not understand.",
-                "uz": "Kechirasiz, men tushunmadim."
-            }.get(lang, "Извини, я не понял.")
+            return NOT_UNDERSTOOD.get(lang, "Извини, я не понял.")
 
         responses = []
         for match in matches:
@@ -0,0 +1,132 @@
+"""
+Грамматика Vosk из commands.yaml (vosk.grammar: true).
+
+Малые модели Vosk умеют декодировать по списку фраз (JSON, который принимает
+KaldiRecognizer) — вместо открытого словаря ищется лучшая из известных фраз,
+это быстрее и даёт матчеру точные паттерны вместо «похожих» слов.
+
+- CommandGrammar собирает фразы по языкам: паттерны всех команд датасета
+  (skills, meta, smalltalk), wake-words из config.yaml и "[unk]" — выход для
+  всего остального;
+- команды со свободным текстом (поиск, перевод: vosk.grammar_free_text) —
+  их паттерны тоже в грамматике, но фраза с ними, как и фраза с [unk],
+  распознаётся заново открытым словарём;
+- GrammarRecognizer ведёт себя как KaldiRecognizer (AcceptWaveform / Result),
+  держит аудио текущей фразы и при необходимости прогоняет его через
+  открытый распознаватель той же модели.
+
+Грамматика пересобирается при перезагрузке датасета (Recognizer.set_grammar).
+"""
+import json
+import re
+
+from .command_index import command_patterns, iter_commands
+from .langid import LANGS, detect_language
+
+UNK = "[unk]"
+
+_APOSTROPHES_RE = re.compile(r"[ʻ‘’`]")
+_NON_WORD_RE = re.compile(r"[^\w\s']|_", flags=re.UNICODE)
+
+
+def clean_phrase(text: str) -> str:
+    """Фраза в виде слов словаря Vosk: нижний регистр, без пунктуации, апостроф — ASCII."""
+    text = _APOSTROPHES_RE.sub("'", str(text).lower())
+    return " ".join(_NON_WORD_RE.sub(" ", text).split())
+
+
+class CommandGrammar:
+    def __init__(self, phrases: dict, free_text: dict):
+        self.phrases = phrases          # {lang: [фраза, ...]}
+        self.free_text = free_text      # {lang: [паттерн команды со свободным текстом, ...]}
+
+    @classmethod
+    def from_dataset(cls, dataset: dict, config: dict = None, free_text_actions=()):
+        config = config or {}
+        free_text_actions = set(free_text_actions or ())
+        phrases = {lang: set() for lang in LANGS}
+        free_text = {lang: set() for lang in LANGS}
+
+        def add(text, lang, free=False):
+            phrase = clean_phrase(text)
+            if not phrase:
+                return
+            for target in ([lang] if lang in phrases else LANGS):
+                phrases[target].add(phrase)
+                if free:
+                    free_text[target].add(phrase)
+
+        for section, key, cmd in iter_commands(dataset or {}):
+            free = cmd.get("action") in free_text_actions
+            for orig, _, _, _, _, _, lang in command_patterns(section, key, cmd, str):
+                add(orig, lang, free)
+
+        wake_words = config.get("wake_words", {}) or {}
+        if isinstance(wake_words, dict):
+            for lang, words in wake_words.items():
+                for word in (words if isinstance(words, (list, tuple)) else [words]):
+                    add(word, lang if lang in LANGS else detect_language(str(word)))
+        else:
+            for word in wake_words:
+                add(word, detect_language(str(word)))
+        if config.get("wake_word"):
+            add(config["wake_word"], detect_language(str(config["wake_word"])))
+
+        return cls({lang: sorted(p) + [UNK] for lang, p in phrases.items() if p},
+                   {lang: sorted(p) for lang, p in free_text.items() if p})
+
+    def for_language(self, lang: str):
+        """(фразы, свободный текст) для языка или None — грамматики для него нет."""
+        if lang not in self.phrases:
+            return None
+        return self.phrases[lang], self.free_text.get(lang, [])
+
+    def stats(self) -> dict:
+        return {lang: len(p) for lang, p in self.phrases.items()}
+
+
+class GrammarRecognizer:
+    """
+    Распознаватель одной модели по грамматике команд с откатом на открытый словарь.
+    Интерфейс — как у KaldiRecognizer (AcceptWaveform / Result / FinalResult / Reset).
+    """
+
+    def __init__(self, model, sample_rate: int, phrases, free_text=()):
+        from vosk import KaldiRecognizer
+
+        self.grammar = KaldiRecognizer(model, sample_rate, json.dumps(list(phrases), ensure_ascii=False))
+        self.open = KaldiRecognizer(model, sample_rate)
+        # паттерны свободного текста ищутся как целые слова внутри фразы
+        self._free_re = re.compile(
+            r"(?:^| )(?:" + "|".join(re.escape(p) for p in sorted(free_text, key=len, reverse=True)) + r")(?: |$)"
+        ) if free_text else None
+        self._utterance = []
+        self.fallbacks = 0
+
+    def needs_open(self, text: str) -> bool:
+        return UNK in text.split() or (self._free_re is not None and self._free_re.search(text) is not None)
+
+    def AcceptWaveform(self, data) -> bool:
+        self._utterance.append(bytes(data))
+        return self.grammar.AcceptWaveform(data)
+
+    def Result(self) -> str:
+        return self._resolve(self.grammar.Result())
+
+    def FinalResult(self) -> str:
+        return self._resolve(self.grammar.FinalResult())
+
+    def Reset(self):
+        self._utterance.clear()
+        self.grammar.Reset()
+        self.open.Reset()
+
+    def _resolve(self, result: str) -> str:
+        text = json.loads(result).get("text", "").strip()
+        utterance, self._utterance = self._utterance, []
+        if not text or not self.needs_open(text):
+            return result
+        # незнакомые слова или команда со свободным текстом — та же фраза открытым словарём
+        self.fallbacks += 1
+        self.open.AcceptWaveform(b"".join(utterance))
+        return self.open.FinalResult()
@@ -0,0 +1,86 @@
+"""
+Быстрое определение языка фразы по письменности (без внешних библиотек).
+Используется SmartMatcher для разбиения паттернов по языкам и маршрутизации фраз.
+
+- кириллица            -> ru (uz, если есть узбекские буквы ў қ ғ ҳ)
+- латиница             -> en или uz по маркерам (o'/g', q без u, суффиксы, частые слова)
+- нет букв / неясно    -> None
+Письменность определяется по большинству букв («chrome открой» — кириллица).
+"""
+import re
+
+LANGS = ("ru", "en", "uz")
+# какие языки возможны для письменности
+SCRIPT_LANGS = {"cyrillic": ("ru", "uz"), "latin": ("en", "uz")}
+
+_CYRILLIC_RE = re.compile(r"[а-яё]")
+_UZ_CYRILLIC_RE = re.compile(r"[ўқғҳ]")
+_LATIN_RE = re.compile(r"[a-z]")
+_UZ_APOSTROPHE_RE = re.compile(r"[og][ʻ‘'`’]")
+_UZ_Q_RE = re.compile(r"q(?!u)")
+_WORD_RE = re.compile(r"[a-zʻ‘'`’]+")
+
+_UZ_SUFFIXES = ("ni", "ga", "da", "dan", "lar", "ning", "imiz", "ingiz", "mi", "chi")
+_UZ_WORDS = frozenset({
+    "va", "yana", "keyin", "iltimos", "och", "yoq", "nima", "qanday", "bugun", "bugungi",
+    "soat", "vaqt", "sana", "til", "yangi", "rahmat", "hozir", "men", "sen", "siz",
+    "qil", "ber", "ayt", "bil", "top", "izla", "chala", "ijro", "et", "yangila", "haqida",
+    "ma'lumot", "holati", "darajasi", "havo", "nechi", "nechchi", "qidir", "ko'rsat",
+})
+_EN_WORDS = frozenset({
+    "the", "a", "an", "is", "it", "it's", "my", "me", "what", "what's", "show", "open", "start",
+    "stop", "play", "tell", "turn", "off", "on", "please", "time", "date", "day", "today's",
+    "music", "weather", "system", "info", "information", "search", "find", "computer", "browser",
+    "language", "change", "switch", "set", "how", "are", "you", "thank", "good", "job", "well",
+    "done", "skills", "reload", "restart", "update", "dataset", "commands", "quote", "movie",
+    "from", "in", "internet", "online", "check", "battery", "level", "status", "some", "now",
+    "current", "launch", "run", "power", "down", "shut", "shutdown", "look", "up", "for",
+    "about", "google", "chrome", "pc", "specs", "terminate", "playing", "fool", "stupid",
+})
+
+
+def script_of(text: str):
+    """'cyrillic', 'latin' или None — по большинству букв (при равенстве — кириллица)."""
+    if not text:
+        return None
+    t = text.lower()
+    cyr = len(_CYRILLIC_RE.findall(t)) + len(_UZ_CYRILLIC_RE.findall(t))
+    lat = len(_LATIN_RE.findall(t))
+    if not cyr and not lat:
+        return None
+    return "cyrillic" if cyr >= lat else "latin"
+
+
+def is_mixed_script(text: str) -> bool:
+    """В тексте есть и кириллица, и латиница (например, «открой chrome»)."""
+    t = (text or "").lower()
+    return bool((_CYRILLIC_RE.search(t) or _UZ_CYRILLIC_RE.search(t)) and _LATIN_RE.search(t))
+
+
+def guess_latin_language(text: str):
+    """Различает английский и узбекский (латиница). None — если маркеров поровну."""
+    t = text.lower()
+    uz = 2 * len(_UZ_APOSTROPHE_RE.findall(t))
+    en = 0
+    for w in _WORD_RE.findall(t):
+        if w in _EN_WORDS:
+            en += 1
+        elif w in _UZ_WORDS:
+            uz += 1
+        elif _UZ_Q_RE.search(w) or (len(w) > 3 and w.endswith(_UZ_SUFFIXES)):
+            uz += 1
+    if uz > en:
+        return "uz"
+    if en > uz:
+        return "en"
+    return None
+
+
+def detect_language(text: str):
+    """Язык фразы по письменности: 'ru' / 'en' / 'uz' или None."""
+    script = script_of(text)
+    if script == "cyrillic":
+        return "uz" if _UZ_CYRILLIC_RE.search(text.lower()) else "ru"
+    if script == "latin":
+        return guess_latin_language(text)
+    return None
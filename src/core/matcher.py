@@ -1,6 +1,17 @@
 from rapidfuzz import process, fuzz
-from functools import lru_cache
-import re
+from bisect import bisect_left, insort
+from collections import Counter
+import numpy as np
+
+from src.utils.cache import LRUCache
+from .normalizer import TextNormalizer
+from .command_index import (CommandIndex, DatasetDiff, PostingsDelta, command_fingerprint, command_patterns,
+                            diff_datasets, iter_commands, pattern_count, trigrams)
+from .aho import TokenAutomaton
+from .tfidf import TfidfIndex
+from .langid import LANGS, SCRIPT_LANGS, detect_language, is_mixed_script, script_of
+
+_MISS = object()
 
 class SmartMatcher:
     """
@@ -11,106 +22,487 @@ class SmartMatcher:
     - smalltalk
     """
 
-    def __init__(self, dataset: dict, threshold: int = 70, debug: bool = False, config: dict = None):
+    def __init__(self, dataset: dict, threshold: int = 70, debug: bool = False, config: dict = None,
+                 normalizer: TextNormalizer = None, index: CommandIndex = None):
         self.dataset = dataset or {}
         self.threshold = threshold
         self.debug = debug
         self.config = config or {}
-        # Собираем wake-words из конфигурации (если есть)
-        self.wake_words = set()
-        try:
-            ww = self.config.get("wake_words", {}) or {}
-            if isinstance(ww, dict):
-                for v in ww.values():
-                    if isinstance(v, (list, tuple)):
-                        self.wake_words.update([w.lower() for w in v])
-                    elif isinstance(v, str):
-                        self.wake_words.add(v.lower())
-            elif isinstance(ww, (list, tuple)):
-                self.wake_words.update([w.lower() for w in ww])
-            single = self.config.get("wake_word")
-            if single:
-                self.wake_words.add(single.lower())
-        except Exception:
-            pass
-
-        # паттерны будут содержать: (orig, normalized, category, key, action, response)
-        self.patterns = self._build_patterns()
+        # общий нормализатор текста (wake-words, стоп-слова, разделители) из конфигурации
+        self.normalizer = normalizer or TextNormalizer.from_config(self.config)
+        self.wake_words = self.normalizer.wake_words
+
+        # настройки предварительного отбора кандидатов (инвертированный индекс)
+        matcher_cfg = self.config.get("matcher", {}) or {}
+        self.use_index = matcher_cfg.get("candidate_index", True)
+        self.min_trigram_overlap = matcher_cfg.get("min_trigram_overlap", 1)
+        self.max_candidate_ratio = matcher_cfg.get("max_candidate_ratio", 0.5)
+        # пакетный режим: все части фразы сравниваются со всеми паттернами одной матрицей cdist
+        self.batch = matcher_cfg.get("batch", False)
+        self.workers = matcher_cfg.get("workers", 1)
+        # кэш результатов по нормализованной фразе — свой у каждого матчера
+        self.cache = LRUCache(matcher_cfg.get("cache_size", 2048))
+        # разделы паттернов по языкам (ru/en/uz + общий)
+        self.partitioned = matcher_cfg.get("partition_by_language", True)
+        # результат раздела принимается, только если он уверенный; слабее — решает полный проход
+        # (иначе ослышка вроде "searoch" с lang=uz находит в разделе другую команду выше порога)
+        self.partition_min_score = max(self.threshold, matcher_cfg.get("partition_min_score", 90))
+        # быстрые пути до fuzzy: точное совпадение и паттерн внутри фразы (Ахо–Корасик)
+        self.fast_path = matcher_cfg.get("fast_path", True)
+        self.substring_min_coverage = matcher_cfg.get("substring_min_coverage", 0.5)
+        # backend отбора кандидатов: "rapidfuzz" (индекс токенов/триграмм + полный проход при промахе)
+        # или "tfidf" (top-k по TF-IDF триграмм, без полного прохода — для десятков тысяч паттернов)
+        self.backend = matcher_cfg.get("backend", "rapidfuzz")
+        self.tfidf_top_k = matcher_cfg.get("tfidf_top_k", 50)
+        if self.backend == "tfidf" and self.batch:
+            self.log("Batch mode is not used with the tfidf backend")
+            self.batch = False
+        # сколько фраз решено каждым путём: cache / exact / substring / fuzzy
+        self.path_counts = Counter()
+
+        # скомпилированный индекс (из Settings) годится, только если собран тем же нормализатором
+        if index is not None and index.signature != self.normalizer.signature():
+            self.log("Command index was built with other normalizer settings -> rebuilding")
+            index = None
+
+        self._load(index)
+
+    # доля удалённых паттернов, после которой инкрементальные обновления сменяются полной пересборкой
+    COMPACT_RATIO = 0.25
+
+    def _load(self, index: CommandIndex = None):
+        """(Пере)собирает таблицу паттернов и все индексы с нуля."""
+        # паттерны будут содержать: (orig, normalized, category, key, action, response, lang)
+        self.patterns = self._build_patterns(index)
+        self.choices = [p[1] for p in self.patterns]
+        # порядок паттернов в датасете: rank[id] (после обновлений — не обязательно целый),
+        # order — живые id по rank, dead — удалённые id (надгробия)
+        self.rank = list(range(len(self.patterns)))
+        self.order = list(range(len(self.patterns)))
+        self.dead = set()
+        self._pristine = True
+        self._commands = None
+        self.partitions = self._build_partitions()
+        self._pools = {}
+        self._build_fast_path()
+        self.tfidf = TfidfIndex(self.trigram_index, len(self.patterns)) if self.backend == "tfidf" else None
 
     def log(self, *args):
         if self.debug:
             print("[DEBUG matcher]", *args)
 
-    def _build_patterns(self):
-        patterns = []
-
-        # === Skills ===
-        skills = self.dataset.get("skills", {}) or {}
-        for category, data in skills.items():
-            for idx, cmd in enumerate(data.get("commands", [])):
-                pats = cmd.get("patterns", [])
-                if isinstance(pats, str):
-                    pats = [pats]
-                for p in pats:
-                    norm = self._normalize(p)
-                    patterns.append((p, norm, "skills", category, cmd.get("action"), cmd.get("response", "")))
-
-        # === Meta ===
-        meta = self.dataset.get("meta", {}) or {}
-        for key, m in meta.items():
-            for p in m.get("patterns", []):
-                norm = self._normalize(p)
-                patterns.append((p, norm, "meta", key, None, m.get("response", "")))
-
-        # === Smalltalk ===
-        smalltalk = self.dataset.get("smalltalk", {}) or {}
-        commands = smalltalk.get("commands", [])
-        for idx, cmd in enumerate(commands):
-            pats = cmd.get("patterns", [])
-            if isinstance(pats, dict):
-                all_pats = []
-                for v in pats.values():
-                    if isinstance(v, list):
-                        all_pats.extend(v)
-                    else:
-                        all_pats.append(v)
+    def _build_patterns(self, index: CommandIndex = None):
+        # индексы: токен -> id паттернов, триграмма -> id паттернов
+        self.index = index or CommandIndex.build(self.dataset, self.normalizer)
+        self.token_index = self.index.token_index
+        self.trigram_index = self.index.trigram_index
+        patterns = self.index.patterns
+        self.log(f"Loaded {len(patterns)} patterns total, "
+                 f"{len(self.token_index)} tokens, {len(self.trigram_index)} trigrams indexed"
+                 f"{' (compiled index)' if index is not None else ''}.")
+        return patterns
+
+    def _build_partitions(self):
+        """
+        Разделы паттернов по языкам: {"ru": [ids], "en": [...], "uz": [...], None: [общие]}.
+        Паттерн с неясным языком, но известной письменностью попадает в разделы
+        всех языков этой письменности; без букв — в общий раздел.
+        """
+        partitions = {}
+        for idx, entry in enumerate(self.patterns):
+            for lang in self._pattern_langs(entry):
+                partitions.setdefault(lang, []).append(idx)
+        return partitions
+
+    @staticmethod
+    def _pattern_langs(entry):
+        lang = entry[6] if len(entry) > 6 else None
+        if lang:
+            return (lang,)
+        return SCRIPT_LANGS.get(script_of(entry[0]), (None,))
+
+    def _build_fast_path(self):
+        """Хэш-таблица normalized -> id паттернов и автомат Ахо–Корасик по словам паттернов."""
+        self.exact = {}
+        self.automaton = TokenAutomaton()
+        # паттерны, добавленные обновлениями датасета, — в отдельном небольшом автомате
+        self.delta_automaton = None
+        self._delta_ids = []
+        if not self.fast_path:
+            return
+        for idx, normalized in enumerate(self.choices):
+            if not normalized:
+                continue
+            self.exact.setdefault(normalized, []).append(idx)
+            self.automaton.add(normalized.split(), idx)
+        self.automaton.build()
+        self.log(f"Fast path: {len(self.exact)} exact phrases, {self.automaton.size} patterns in automaton.")
+
+    def _fast_match(self, normalized: str, route=None):
+        """
+        Точное совпадение или самый длинный паттерн, входящий во фразу целыми словами
+        и покрывающий не меньше substring_min_coverage её длины.
+        Возвращает (path, (match, score, idx)) или None — тогда нужен fuzzy-проход.
+        Из нескольких одинаковых паттернов выбирается первый из раздела языка фразы.
+        """
+        if not self.fast_path or not self.exact:
+            return None
+        in_route = self._pool(route)[1] if route else None
+
+        ids = self.exact.get(normalized)
+        if ids:
+            idx = next((i for i in ids if i in in_route), ids[0]) if in_route else ids[0]
+            return "exact", (self.choices[idx], 100.0, idx)
+
+        tokens = normalized.split()
+        hits = self.automaton.search(tokens)
+        if self.dead:
+            hits = [h for h in hits if h[2] not in self.dead]
+        if self.delta_automaton is not None:
+            hits.extend(self.delta_automaton.search(tokens))
+        if not hits:
+            return None
+        # длиннее (в словах, затем в символах), из своего раздела, раньше в датасете
+        rank = self.rank
+        _, length, idx = max(hits, key=lambda h: (h[1], len(self.choices[h[2]]),
+                                                  bool(in_route) and h[2] in in_route, -rank[h[2]]))
+        if len(self.choices[idx]) < len(normalized) * self.substring_min_coverage:
+            return None
+        return "substring", (self.choices[idx], 100.0, idx)
+
+    def _route(self, text: str, lang: str = None):
+        """
+        Языки, в разделах которых сначала ищется нормализованная фраза, или None (искать везде).
+        Язык определяется по письменности и маркерам фразы; переданный lang
+        решает, когда письменность неоднозначна (en/uz латиницей). Фразы со
+        смешанной письменностью ищутся сразу по всем разделам.
+        """
+        if not self.partitioned or len(self.partitions) < 2 or is_mixed_script(text):
+            return None
+        detected = detect_language(text)
+        if detected:
+            return (detected,)
+        script = script_of(text)
+        if lang in LANGS and (script is None or lang in SCRIPT_LANGS[script]):
+            return (lang,)
+        return SCRIPT_LANGS.get(script)
+
+    def _pool(self, route):
+        """
+        id паттернов разделов route и общего раздела (кэшируется по route):
+        (id в порядке датасета, множество id, choices-словарь, choices-список, id массивом).
+        route=None — все живые паттерны.
+        """
+        pool = self._pools.get(route)
+        if pool is None:
+            if route is None:
+                ids = list(self.order)
             else:
-                all_pats = pats or []
-            for p in all_pats:
-                norm = self._normalize(p)
-                patterns.append((p, norm, "smalltalk", f"smalltalk_{idx}", None, cmd.get("response", "")))
+                ids = set(self.partitions.get(None, ()))
+                for lang in route:
+                    ids.update(self.partitions.get(lang, ()))
+                ids = sorted(ids, key=self.rank.__getitem__)
+            pool = (ids, frozenset(ids), {i: self.choices[i] for i in ids}, [self.choices[i] for i in ids],
+                    np.asarray(ids, dtype=np.int64))
+            self._pools[route] = pool
+        return pool
+
+    def _all(self):
+        """Пул всех паттернов или None, если таблица не менялась (id = позиции в self.choices)."""
+        return None if self._pristine else self._pool(None)
+
+    def _candidates(self, normalized: str, pool=None):
+        """
+        Возвращает отсортированный список id паттернов-кандидатов для фразы
+        (внутри pool, если он задан) или None, если нужно сканировать все паттерны.
+        """
+        if not self.order:
+            return None
+        pool = pool or self._all()
+        if self.tfidf is not None:
+            ids = self.tfidf.top_k(normalized, self.tfidf_top_k, None if pool is None else pool[4])
+            return sorted(ids, key=self.rank.__getitem__)
+        if not self.use_index:
+            return None
 
-        self.log(f"Loaded {len(patterns)} patterns total.")
-        return patterns
+        tokens = set(normalized.split())
+        # слишком короткие фразы плохо отбираются по триграммам — полный проход
+        if all(len(t) < 3 for t in tokens):
+            return None
+
+        ids = set()
+        overlap = Counter()
+        for t in tokens:
+            ids.update(self.token_index.get(t, ()))
+            for g in trigrams(t):
+                overlap.update(self.trigram_index.get(g, ()))
+        ids.update(i for i, n in overlap.items() if n >= self.min_trigram_overlap)
+
+        total = len(self.patterns)
+        if pool is not None:
+            ids &= pool[1]
+            total = len(pool[0])
+        if not ids or len(ids) > total * self.max_candidate_ratio:
+            return None
+        return sorted(ids, key=self.rank.__getitem__)
+
+    def _score(self, normalized: str, choices):
+        """
+        Два прохода (token_set_ratio и partial_ratio) по choices (список или {id: паттерн}).
+        Возвращает пары (best_a, best_b) в формате (match, score, idx).
+        """
+        # 1) основной проход — token_set_ratio
+        best_a = process.extractOne(normalized, choices, scorer=fuzz.token_set_ratio)
+        # 2) частичный проход — partial_ratio (лучше для длинных/фрагментированных фраз)
+        best_b = process.extractOne(normalized, choices, scorer=fuzz.partial_ratio)
+        return best_a, best_b
+
+    @staticmethod
+    def _top(best_a, best_b):
+        return max((b[1] for b in (best_a, best_b) if b), default=0)
+
+    def _score_in(self, normalized: str, pool=None):
+        """
+        Сначала — только кандидаты из индекса; если среди них нет уверенного
+        совпадения, повторяем полный проход (по разделу pool или по всем паттернам),
+        чтобы результат не отличался. С backend "tfidf" полного прохода нет:
+        rapidfuzz переоценивает только top-k кандидатов.
+        """
+        pool = pool or self._all()
+        full = self.choices if pool is None else pool[2]
+        ids = self._candidates(normalized, pool)
+        if ids is None:
+            return self._score(normalized, full)
+        best_a, best_b = self._score(normalized, {i: self.choices[i] for i in ids})
+        if self._top(best_a, best_b) < self.threshold and self.tfidf is None:
+            self.log(f"Index miss for '{normalized}' ({len(ids)} candidates) -> full scan")
+            best_a, best_b = self._score(normalized, full)
+        return best_a, best_b
 
     def _normalize(self, text: str) -> str:
-        if not text:
-            return ""
-
-        # нормализация базовая
-        text = re.sub(r"[^\w\s']", " ", str(text), flags=re.UNICODE).lower()
-
-        # удаляем wake-words в разных позициях
-        if self.wake_words:
-            for w in sorted(self.wake_words, key=len, reverse=True):
-                # удаляем как отдельное слово
-                text = re.sub(rf"\b{re.escape(w)}\b", " ", text)
-
-        # расширенные стоп-слова на трёх языках
-        stopwords = {
-            "ru": ["пожалуйста", "пжлст", "скажи", "скажи мне", "потом", "и", "ещё", "еще", "пожалуйстa", "но", "так", "вообще", "иногда", "хорошо", "давай", "да"],
-            "en": ["please", "and", "then", "say", "tell", "now", "hey", "ok", "please"],
-            "uz": ["iltimos", "keyin", "va", "ayt", "и", "yana"]
-        }
-        sw = set()
-        for v in stopwords.values():
-            sw.update(v)
-
-        tokens = [t for t in text.split() if t and t not in sw]
-        return " ".join(tokens).strip()
-
-    @lru_cache(maxsize=2048)
-    def _best_for_phrase(self, phrase: str):
+        return self.normalizer.normalize(text)
+
+    def cache_stats(self) -> dict:
+        """Статистика кэша совпадений: hits, misses, evictions, size."""
+        return self.cache.stats()
+
+    def path_stats(self) -> dict:
+        """Сколько фраз решено каждым путём (cache / exact / substring / fuzzy) и их доли."""
+        total = sum(self.path_counts.values())
+        stats = {path: self.path_counts.get(path, 0) for path in ("cache", "exact", "substring", "fuzzy")}
+        stats["total"] = total
+        for path in ("cache", "exact", "substring", "fuzzy"):
+            stats[f"{path}_rate"] = round(stats[path] / total, 3) if total else 0.0
+        return stats
+
+    def clear_cache(self):
+        self.cache.clear()
+
+    # --- инкрементальное обновление датасета ---
+    def _command_table(self):
+        """
+        Отпечатки команд датасета и id их паттернов. Строится при первом обновлении,
+        пока id паттернов совпадают с их порядком в датасете.
+        """
+        if self._commands is None:
+            fingerprints, groups, pos = [], [], 0
+            for section, key, cmd in iter_commands(self.dataset):
+                n = pattern_count(cmd)
+                fingerprints.append(command_fingerprint(section, key, cmd))
+                groups.append(list(range(pos, pos + n)))
+                pos += n
+            self._commands = (fingerprints, groups)
+        return self._commands
+
+    def update_dataset(self, new_dataset: dict, diff: DatasetDiff = None) -> DatasetDiff:
+        """
+        Применяет изменения датасета на месте: нормализуются и индексируются только
+        добавленные и изменённые команды, удалённые помечаются надгробиями (dead).
+        Порядок паттернов (а значит, и выбор при равных score) — как у матчера,
+        собранного с нуля по new_dataset; кэш совпадений чистится выборочно.
+        """
+        fingerprints, groups = self._command_table()
+        if diff is None:
+            diff = diff_datasets(fingerprints, new_dataset)
+        self.dataset = diff.dataset
+        if not diff:
+            return diff
+
+        if self._pristine:
+            # таблица и индексы могут принадлежать общему CommandIndex из Settings — не меняем их
+            self.patterns = list(self.patterns)
+            self.token_index = PostingsDelta(self.token_index)
+            self.trigram_index = PostingsDelta(self.trigram_index)
+            self._pristine = False
+
+        removed, added, new_groups = [], [], []
+        renumber = False
+        for tag, i1, i2, j1, j2 in diff.opcodes:
+            if tag == "equal":
+                new_groups.extend(groups[i1:i2])
+                continue
+            for ids in groups[i1:i2]:
+                removed.extend(ids)
+            start = len(new_groups)
+            run = []
+            for j in range(j1, j2):
+                ids = self._append_patterns(command_patterns(*diff.commands[j], self.normalizer.normalize))
+                new_groups.append(ids)
+                run.extend(ids)
+            if run:
+                # новые паттерны встают между соседними командами нового датасета
+                lo = self._edge_rank(new_groups, start - 1, -1)
+                hi = self._edge_rank(groups, i2, 1)
+                renumber |= not self._spread_ranks(run, lo, hi)
+                added.extend(run)
+
+        for i in removed:
+            self._unindex(i)
+        if renumber:
+            # дробные ранги исчерпались — перенумеровываем (относительный порядок не меняется)
+            for pos, i in enumerate(i for ids in new_groups for i in ids):
+                self.rank[i] = pos
+        for i in added:
+            self._index_pattern(i)
+        self._rebuild_delta_automaton()
+        self._pools = {}
+        if self.tfidf is not None:
+            self.tfidf.reweight(len(self.patterns), self.dead, self.trigram_index.added, self._grams)
+        self._commands = (diff.fingerprints, new_groups)
+
+        if len(self.dead) > self.COMPACT_RATIO * max(1, len(self.order)):
+            self.log(f"{len(self.dead)} removed patterns -> full rebuild")
+            self._load(None)
+            self.cache.clear()
+        elif self.tfidf is not None:
+            # новый паттерн может вытеснить кандидата из top-k — выборочная очистка неприменима
+            self.cache.clear()
+        else:
+            self._invalidate_cache(removed, added)
+        self.log(f"Dataset updated: {diff} ({len(added)} patterns added, {len(removed)} removed)")
+        return diff
+
+    def _append_patterns(self, entries):
+        ids = list(range(len(self.patterns), len(self.patterns) + len(entries)))
+        self.patterns.extend(entries)
+        self.choices.extend(e[1] for e in entries)
+        self.rank.extend(0 for _ in entries)
+        return ids
+
+    def _edge_rank(self, groups, i, step):
+        """Ранг ближайшего паттерна от команды i в направлении step (None — края нет)."""
+        while 0 <= i < len(groups):
+            if groups[i]:
+                return self.rank[groups[i][0 if step > 0 else -1]]
+            i += step
+        return None
+
+    def _spread_ranks(self, ids, lo, hi) -> bool:
+        """Равномерно раздаёт ids ранги между lo и hi. False — если промежуток слишком мал."""
+        k = len(ids)
+        if lo is None and hi is None:
+            lo, hi = -1, k
+        elif lo is None:
+            lo = hi - k - 1
+        elif hi is None:
+            hi = lo + k + 1
+        step = (hi - lo) / (k + 1)
+        for n, i in enumerate(ids, 1):
+            self.rank[i] = lo + step * n
+        return step > 1e-6
+
+    def _remove_sorted(self, ids: list, i: int):
+        pos = bisect_left(ids, self.rank[i], key=self.rank.__getitem__)
+        if pos < len(ids) and ids[pos] == i:
+            del ids[pos]
+        else:
+            ids.remove(i)
+
+    def _unindex(self, i: int):
+        """Надгробие: паттерн остаётся в таблице и индексах токенов, но больше нигде не участвует."""
+        self.dead.add(i)
+        self._remove_sorted(self.order, i)
+        entry = self.patterns[i]
+        for lang in self._pattern_langs(entry):
+            ids = self.partitions.get(lang)
+            self._remove_sorted(ids, i)
+            if not ids:
+                del self.partitions[lang]
+        ids = self.exact.get(entry[1])
+        if ids:
+            self._remove_sorted(ids, i)
+            if not ids:
+                del self.exact[entry[1]]
+
+    def _index_pattern(self, i: int):
+        key = self.rank.__getitem__
+        insort(self.order, i, key=key)
+        entry = self.patterns[i]
+        for lang in self._pattern_langs(entry):
+            insort(self.partitions.setdefault(lang, []), i, key=key)
+        grams = set()
+        for t in set(entry[1].split()):
+            self.token_index.add(t, i)
+            grams.update(trigrams(t))
+        for g in grams:
+            self.trigram_index.add(g, i)
+        if self.fast_path and entry[1]:
+            insort(self.exact.setdefault(entry[1], []), i, key=key)
+            self._delta_ids.append(i)
+
+    def _grams(self, i: int):
+        grams = set()
+        for t in self.choices[i].split():
+            grams.update(trigrams(t))
+        return grams
+
+    def _rebuild_delta_automaton(self):
+        self._delta_ids = [i for i in self._delta_ids if i not in self.dead]
+        if not self._delta_ids:
+            self.delta_automaton = None
+            return
+        automaton = TokenAutomaton()
+        for i in self._delta_ids:
+            automaton.add(self.choices[i].split(), i)
+        self.delta_automaton = automaton.build()
+
+    def _invalidate_cache(self, removed, added):
+        """
+        Удаляет из кэша только те результаты, которые могли измениться:
+        - принятое совпадение — если его паттерн удалён или новый паттерн набирает >= threshold;
+        - отсутствие совпадения / fallback — если новый или удалённый паттерн набирает
+          хотя бы минимальный fallback-порог.
+        """
+        keys = self.cache.keys()
+        if not keys:
+            return
+        texts = [k[1] if isinstance(k, tuple) else k for k in keys]
+
+        def top(ids):
+            if not ids:
+                return np.zeros(len(texts))
+            choices = [self.choices[i] for i in ids]
+            a = process.cdist(texts, choices, scorer=fuzz.token_set_ratio, dtype=np.float64, workers=self.workers)
+            b = process.cdist(texts, choices, scorer=fuzz.partial_ratio, dtype=np.float64, workers=self.workers)
+            return np.maximum(a.max(axis=1), b.max(axis=1))
+
+        top_added = top(added)
+        top_changed = np.maximum(top_added, top(removed))
+        removed_refs = {(self.patterns[i][0], self.patterns[i][2], self.patterns[i][3]) for i in removed}
+        floor = min(max(30, self.threshold - 30), max(45, int(self.threshold * 0.7)))
+        dropped = 0
+        for key, ta, tc in zip(keys, top_added, top_changed):
+            best = self.cache.peek(key)
+            if best is None or best["score"] < self.threshold:
+                stale = tc >= floor
+            else:
+                stale = ta >= self.threshold or (best["pattern"], best["category"], best["key"]) in removed_refs
+            if stale:
+                self.cache.pop(key)
+                dropped += 1
+        self.log(f"Dataset diff invalidated {dropped}/{len(keys)} cached matches")
+
+    def _best_for_phrase(self, phrase: str, lang: str = None):
         if not phrase:
             return None
 
@@ -118,16 +510,41 @@ class SmartMatcher:
         if not normalized:
             return None
 
-        # choices — нормализованные паттерны
-        choices = [p[1] for p in self.patterns]
-        if not choices:
+        route = self._route(normalized, lang)
+        key = (route, normalized) if route else normalized
+        cached = self.cache.get(key, _MISS)
+        if cached is not _MISS:
+            self.path_counts["cache"] += 1
+            return cached
+        fast = self._fast_match(normalized, route)
+        if fast is not None:
+            path, hit = fast
+            self.path_counts[path] += 1
+            best = self._decide(phrase, hit, None)
+        else:
+            self.path_counts["fuzzy"] += 1
+            best = self._match_normalized(phrase, normalized, route)
+        self.cache.put(key, best)
+        return best
+
+    def _match_normalized(self, phrase: str, normalized: str, route=None):
+        if not self.order:
             return None
 
-        # 1) основной проход — token_set_ratio
-        best_a = process.extractOne(normalized, choices, scorer=fuzz.token_set_ratio)
-        # 2) частичный проход — partial_ratio (лучше для длинных/фрагментированных фраз)
-        best_b = process.extractOne(normalized, choices, scorer=fuzz.partial_ratio)
+        # сначала — раздел языка фразы (+ общий); если там нет уверенного совпадения — все языки
+        if route is not None:
+            pool = self._pool(route)
+            if pool[0]:
+                best_a, best_b = self._score_in(normalized, pool)
+                if self._top(best_a, best_b) >= self.partition_min_score:
+                    return self._decide(phrase, best_a, best_b)
+            self.log(f"No confident match for '{normalized}' in {'/'.join(route)} partition -> all languages")
+
+        best_a, best_b = self._score_in(normalized)
+        return self._decide(phrase, best_a, best_b)
 
+    def _decide(self, phrase: str, best_a, best_b):
+        """Выбирает итоговое совпадение (или fallback) по лучшим результатам двух проходов."""
         candidates = [b for b in (best_a, best_b) if b]
         if not candidates:
             return None
@@ -179,20 +596,115 @@ class SmartMatcher:
         return None
 
     def split_phrases(self, text: str):
-        if not text:
-            return []
-        t = text.lower()
-        # common separators in RU/EN/UZ to split multiple commands
-        for sep in [" и ", " а потом ", " затем ", " потом ", " потом же ", " затем же ", " then ", " and ", " keyin ", "yana", "va"]:
-            t = t.replace(sep, " | ")
-        return [p.strip() for p in t.split("|") if p.strip()]
-
-    def find_matches(self, text: str):
+        return self.normalizer.split_phrases(text)
+
+    def _batched_matches(self, parts, lang: str = None):
+        """
+        Пакетный режим: все части фразы сравниваются со всеми паттернами
+        одним вызовом process.cdist на каждый scorer (с workers потоками),
+        лучшие и fallback-кандидаты выбираются из матрицы оценок.
+        """
+        keys = []
+        results = {}
+        queries = []
+        for p in parts:
+            n = self._normalize(p)
+            if not n:
+                keys.append(None)
+                continue
+            route = self._route(n, lang)
+            key = (route, n) if route else n
+            keys.append(key)
+            if key in results:
+                continue
+            cached = self.cache.get(key, _MISS)
+            if cached is not _MISS:
+                self.path_counts["cache"] += 1
+                results[key] = cached
+                continue
+            fast = self._fast_match(n, route)
+            if fast is not None:
+                path, hit = fast
+                self.path_counts[path] += 1
+                results[key] = self._decide(p, hit, None)
+                self.cache.put(key, results[key])
+            else:
+                self.path_counts["fuzzy"] += 1
+                results[key] = None
+                queries.append((p, n, route, key))
+
+        if queries and self.order:
+            self._score_batch(queries, results)
+
+        matches = []
+        for key in keys:
+            best = results.get(key) if key is not None else None
+            if best:
+                matches.append(best)
+        return matches
+
+    def _cdist_best(self, texts, pool=None):
+        """Матрицы cdist для texts по всем паттернам (или по разделу pool) -> [(best_a, best_b)]."""
+        pool = pool or self._all()
+        choices = self.choices if pool is None else pool[3]
+        # dtype=float64 — те же значения score, что и у extractOne
+        scores_a = process.cdist(texts, choices, scorer=fuzz.token_set_ratio,
+                                 dtype=np.float64, workers=self.workers)
+        scores_b = process.cdist(texts, choices, scorer=fuzz.partial_ratio,
+                                 dtype=np.float64, workers=self.workers)
+        # argmax берёт первый максимум — как и extractOne
+        idx_a = scores_a.argmax(axis=1)
+        idx_b = scores_b.argmax(axis=1)
+
+        out = []
+        for row in range(len(texts)):
+            ia, ib = int(idx_a[row]), int(idx_b[row])
+            ga = ia if pool is None else pool[0][ia]
+            gb = ib if pool is None else pool[0][ib]
+            out.append(((choices[ia], float(scores_a[row, ia]), ga),
+                        (choices[ib], float(scores_b[row, ib]), gb)))
+        return out
+
+    def _score_batch(self, queries, results: dict):
+        def store(query, best_a, best_b):
+            phrase, _, _, key = query
+            best = self._decide(phrase, best_a, best_b)
+            results[key] = best
+            self.cache.put(key, best)
+
+        # одна матрица на каждый языковой раздел; то, что там не нашлось, — одной общей матрицей
+        groups = {}
+        for q in queries:
+            groups.setdefault(q[2], []).append(q)
+        widen = groups.pop(None, [])
+        for route, group in groups.items():
+            pool = self._pool(route)
+            if not pool[0]:
+                widen.extend(group)
+                continue
+            for q, (best_a, best_b) in zip(group, self._cdist_best([q[1] for q in group], pool)):
+                if self._top(best_a, best_b) >= self.partition_min_score:
+                    store(q, best_a, best_b)
+                else:
+                    widen.append(q)
+
+        if widen:
+            for q, (best_a, best_b) in zip(widen, self._cdist_best([q[1] for q in widen])):
+                store(q, best_a, best_b)
+
+    def find_matches(self, text: str, lang: str = None):
+        """
+        Ищет команды во фразе. lang — язык распознавания (ru/en/uz);
+        если не задан или не совпадает с письменностью — определяется по тексту.
+        """
         matches = []
         if not text:
             return matches
-        for part in self.split_phrases(text):
-            best = self._best_for_phrase(part)
+        parts = self.split_phrases(text)
+        if self.batch:
+            return self._batched_matches(parts, lang)
+        for part in parts:
+            best = self._best_for_phrase(part, lang)
             if best:
                 matches.append(best)
         return matches
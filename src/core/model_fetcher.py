@@ -0,0 +1,405 @@
+"""
+Загрузчик моделей (Vosk, Silero) с докачкой, проверкой и атомарной установкой.
+
+- скачивание идёт в .<имя>.part рядом с целью; ETag / Last-Modified ответа
+  сохраняются в .<имя>.part.json. При повторе недостающее докачивается
+  запросом Range с If-Range: если файл на сервере изменился, сервер не умеет
+  Range или валидатора нет — скачивается заново (старая часть не склеивается
+  с новой версией). 416 считается «всё скачано», только если размер файла
+  на сервере совпадает с уже скачанным;
+- SHA-256 считается на лету (докачанный файл — с уже скачанной части);
+  при несовпадении .part удаляется;
+- zip-архив распаковывается по мере скачивания в каталог .<имя>.extracting
+  (при докачке сначала прогоняется уже скачанная часть), CRC каждого файла
+  проверяется; архив, который потоком не разобрать (zip64, stored-записи с
+  дескриптором и т. п.), распаковывается zipfile после скачивания;
+- готовая модель появляется одним os.replace: прерванная или битая загрузка
+  никогда не оставляет в data/models наполовину записанную модель; после
+  сетевой ошибки .part остаётся для докачки, после любой другой (хэш,
+  формат архива) — удаляется, чтобы следующий запуск не споткнулся о него же;
+- fetch_all() качает несколько моделей параллельно.
+
+HTTP — через requests.Session (можно передать свою, например к локальному
+тестовому серверу).
+"""
+import hashlib
+import json
+import os
+import shutil
+import struct
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import Optional
+
+import requests
+
+from src.utils import logger
+
+try:
+    from tqdm import tqdm
+except ImportError:
+    tqdm = None
+
+
+@dataclass
+class ModelSpec:
+    """Что скачать и куда. extract — zip распаковывается в каталог dest."""
+    url: str
+    dest: Path
+    sha256: Optional[str] = None
+    extract: bool = False
+
+    def __post_init__(self):
+        self.dest = Path(self.dest)
+
+
+class ChecksumError(ValueError):
+    pass
+
+
+class UnsupportedZip(ValueError):
+    """Архив корректный, но потоком не разбирается — распаковка zipfile после скачивания."""
+
+
+class StreamingUnzip:
+    """
+    Распаковка zip по мере поступления байт (по локальным заголовкам, без
+    центрального каталога). Поддерживаются stored и deflate, дескрипторы данных
+    после deflate-записей; zip64 и шифрование — нет.
+    Единственный общий корневой каталог архива (vosk-model-*/) срезается.
+    """
+
+    LOCAL = b"PK\x03\x04"
+    DESCRIPTOR = b"PK\x07\x08"
+
+    def __init__(self, target: Path):
+        self.target = Path(target)
+        self._buf = b""
+        self._entry = None
+        self._done = False
+        self._root = None
+        self.files = 0
+        self.unsupported = None
+
+    def feed(self, chunk: bytes):
+        if self.unsupported:
+            return
+        self._buf += chunk
+        try:
+            while self._step():
+                pass
+        except UnsupportedZip as e:
+            self.unsupported = str(e)
+            self._buf = b""
+            if self._entry is not None and self._entry["out"] is not None:
+                self._entry["out"].close()
+            self._entry = None
+
+    def extract_file(self, path: Path):
+        """Распаковка уже скачанного архива через zipfile (CRC проверяет zipfile при чтении)."""
+        with zipfile.ZipFile(path) as zf:
+            for info in zf.infolist():
+                target = self._safe_path(info.filename)
+                if info.is_dir():
+                    target.mkdir(parents=True, exist_ok=True)
+                    continue
+                target.parent.mkdir(parents=True, exist_ok=True)
+                with zf.open(info) as src, open(target, "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                self.files += 1
+        self.close()
+
+    def close(self):
+        if self._entry is not None:
+            raise ValueError("архив оборван на середине файла")
+        if self._root:
+            # у всех записей был общий корень — поднимаем его содержимое на уровень выше
+            root = self.target / self._root
+            if root.is_dir():
+                tmp = root.rename(self.target / f".{self._root}.root")
+                for item in list(tmp.iterdir()):
+                    item.rename(self.target / item.name)
+                tmp.rmdir()
+
+    # --- разбор ---
+    def _step(self) -> bool:
+        if self._done:
+            self._buf = b""
+            return False
+        if self._entry is None:
+            return self._read_header()
+        return self._read_data()
+
+    def _read_header(self) -> bool:
+        if len(self._buf) < 4:
+            return False
+        if self._buf[:4] != self.LOCAL:
+            # центральный каталог или конец архива — файлы закончились
+            self._done = True
+            return False
+        if len(self._buf) < 30:
+            return False
+        (_, _, flags, method, _, _, crc, csize, usize, name_len, extra_len) = struct.unpack(
+            "<IHHHHHIIIHH", self._buf[:30])
+        if len(self._buf) < 30 + name_len + extra_len:
+            return False
+        if flags & 0x1:
+            raise UnsupportedZip("зашифрованные архивы не поддерживаются")
+        if 0xFFFFFFFF in (csize, usize):
+            raise UnsupportedZip("zip64 не поддерживается")
+        if method not in (0, 8):
+            raise UnsupportedZip(f"метод сжатия {method} не поддерживается")
+        if method == 0 and flags & 0x8:
+            raise UnsupportedZip("stored-запись с дескриптором данных не поддерживается")
+        name = self._buf[30:30 + name_len].decode("utf-8" if flags & 0x800 else "cp437")
+        self._buf = self._buf[30 + name_len + extra_len:]
+
+        path = self._safe_path(name)
+        if name.endswith("/"):
+            path.mkdir(parents=True, exist_ok=True)
+            out = None
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            out = open(path, "wb")
+        self._entry = {
+            "name": name, "out": out, "method": method, "crc": crc, "csize": csize,
+            "descriptor": bool(flags & 0x8), "left": csize, "got_crc": 0,
+            "inflate": zlib.decompressobj(-15) if method == 8 else None,
+        }
+        return True
+
+    def _read_data(self) -> bool:
+        e = self._entry
+        if e["inflate"] is not None and e["descriptor"]:
+            # длина неизвестна заранее — конец определяет сам deflate-поток
+            if not e["inflate"].eof:
+                if not self._buf:
+                    return False
+                data, self._buf = self._buf, b""
+                self._write(e["inflate"].decompress(data))
+                if e["inflate"].eof:
+                    self._buf = e["inflate"].unused_data + self._buf
+                return True
+            need = 16 if self._buf[:4] == self.DESCRIPTOR else 12
+            if len(self._buf) < need:
+                return False
+            e["crc"] = struct.unpack("<I", self._buf[need - 12:need - 8])[0]
+            self._buf = self._buf[need:]
+            return self._finish()
+
+        if e["left"]:
+            if not self._buf:
+                return False
+            data, self._buf = self._buf[:e["left"]], self._buf[e["left"]:]
+            e["left"] -= len(data)
+            self._write(e["inflate"].decompress(data) if e["inflate"] is not None else data)
+            if e["left"]:
+                return False
+        if e["inflate"] is not None:
+            self._write(e["inflate"].flush())
+        if e["descriptor"]:
+            need = 16 if self._buf[:4] == self.DESCRIPTOR else 12
+            if len(self._buf) < need:
+                return False
+            self._buf = self._buf[need:]
+        return self._finish()
+
+    def _write(self, data: bytes):
+        if data:
+            self._entry["got_crc"] = zlib.crc32(data, self._entry["got_crc"])
+            if self._entry["out"] is not None:
+                self._entry["out"].write(data)
+
+    def _finish(self) -> bool:
+        e, self._entry = self._entry, None
+        if e["out"] is not None:
+            e["out"].close()
+            self.files += 1
+        if e["got_crc"] != e["crc"]:
+            raise ChecksumError(f"CRC не совпал: {e['name']}")
+        return True
+
+    def _safe_path(self, name: str) -> Path:
+        parts = PurePosixPath(name).parts
+        if not parts or PurePosixPath(name).is_absolute() or ".." in parts:
+            raise ValueError(f"недопустимый путь в архиве: {name}")
+        root = parts[0] if len(parts) > 1 or name.endswith("/") else ""
+        if self._root is None:
+            self._root = root
+        elif self._root != root:
+            self._root = ""
+        return self.target.joinpath(*parts)
+
+
+class ModelFetcher:
+    def __init__(self, workers: int = 3, timeout: float = 30.0, chunk_size: int = 1 << 16,
+                 session: requests.Session = None, progress: bool = True):
+        self.workers = workers
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.session = session or requests.Session()
+        self.progress = progress and tqdm is not None
+        self.checksums = {}
+
+    @classmethod
+    def from_config(cls, config: dict):
+        models = (config or {}).get("models", {}) or {}
+        fetcher = cls(workers=models.get("download_workers", 3), timeout=models.get("timeout_s", 30))
+        fetcher.checksums = {name: value for name, value in (models.get("sha256", {}) or {}).items() if value}
+        return fetcher
+
+    def spec(self, url: str, dest, extract: bool = False) -> ModelSpec:
+        """ModelSpec с контрольной суммой из models.sha256 (ключ — имя файла в URL)."""
+        return ModelSpec(url, dest, sha256=self.checksums.get(url.rsplit("/", 1)[-1]), extract=extract)
+
+    def fetch_all(self, specs) -> dict:
+        """Параллельная загрузка. {dest: Path | Exception} — ошибка одной модели не мешает остальным."""
+        specs = list(specs)
+        results = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(specs) or 1))) as pool:
+            futures = {spec.dest: pool.submit(self.fetch, spec) for spec in specs}
+            for dest, future in futures.items():
+                try:
+                    results[dest] = future.result()
+                except Exception as e:
+                    logger.warning(f"⚠️ Не удалось скачать {dest.name}: {e}")
+                    results[dest] = e
+        return results
+
+    def fetch(self, spec: ModelSpec) -> Path:
+        """Скачивает (докачивает) модель и атомарно ставит её в spec.dest."""
+        if spec.dest.exists():
+            return spec.dest
+        spec.dest.parent.mkdir(parents=True, exist_ok=True)
+        part = spec.dest.with_name(f".{spec.dest.name}.part")
+        meta = part.with_name(f"{part.name}.json")
+        staging = spec.dest.with_name(f".{spec.dest.name}.extracting")
+
+        try:
+            digest, unzip = self._begin(spec, staging)
+            offset = self._replay(part, digest, unzip)
+            if not self._download(spec, part, offset, digest, unzip):
+                # сервер не умеет Range или файл на сервере уже другой — скачиваем заново
+                logger.info(f"↩️ {spec.dest.name}: докачка невозможна (нет Range или файл изменился), скачиваю заново")
+                part.unlink(missing_ok=True)
+                digest, unzip = self._begin(spec, staging)
+                self._download(spec, part, 0, digest, unzip)
+
+            actual = digest.hexdigest()
+            if spec.sha256 and actual != spec.sha256.lower():
+                raise ChecksumError(f"SHA-256 не совпал: ожидался {spec.sha256}, получен {actual}")
+            if not spec.sha256:
+                logger.info(f"🔐 {spec.dest.name}: sha256 {actual}")
+            if unzip is not None:
+                if unzip.unsupported:
+                    logger.info(f"🗜️ {spec.dest.name}: {unzip.unsupported} — распаковываю после скачивания")
+                    _, unzip = self._begin(spec, staging)
+                    unzip.extract_file(part)
+                else:
+                    unzip.close()
+                os.replace(staging, spec.dest)
+                part.unlink(missing_ok=True)
+            else:
+                os.replace(part, spec.dest)
+            meta.unlink(missing_ok=True)
+        except Exception as e:
+            # после сетевой ошибки .part остаётся для докачки; хэш, формат архива и прочее — повтор
+            # упал бы на тех же байтах, поэтому .part удаляется. Распакованное не остаётся никогда.
+            if not isinstance(e, OSError):
+                part.unlink(missing_ok=True)
+                meta.unlink(missing_ok=True)
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        logger.info(f"✅ Модель установлена: {spec.dest}")
+        return spec.dest
+
+    @staticmethod
+    def _begin(spec: ModelSpec, staging: Path):
+        unzip = None
+        if spec.extract:
+            shutil.rmtree(staging, ignore_errors=True)
+            staging.mkdir()
+            unzip = StreamingUnzip(staging)
+        return hashlib.sha256(), unzip
+
+    def _replay(self, part: Path, digest, unzip) -> int:
+        """Уже скачанная часть: досчитать хэш и (для zip) распаковать. Возвращает её длину."""
+        if not part.exists():
+            return 0
+        size = 0
+        with open(part, "rb") as f:
+            while chunk := f.read(self.chunk_size):
+                digest.update(chunk)
+                if unzip is not None:
+                    unzip.feed(chunk)
+                size += len(chunk)
+        return size
+
+    @staticmethod
+    def _validator(headers) -> Optional[str]:
+        """Значение для If-Range: сильный ETag или Last-Modified (слабый ETag для Range не годится)."""
+        etag = headers.get("ETag")
+        if etag and not etag.startswith("W/"):
+            return etag
+        return headers.get("Last-Modified")
+
+    def _download(self, spec: ModelSpec, part: Path, offset: int, digest, unzip) -> bool:
+        """
+        Качает с offset в part. False — докачка невозможна (сервер проигнорировал
+        Range, файл изменился, версия части неизвестна): нужно начать заново.
+        """
+        meta = part.with_name(f"{part.name}.json")
+        # без сжатия на транспорте: байты .part и Content-Length должны совпадать с файлом
+        headers = {"Accept-Encoding": "identity"}
+        if offset:
+            try:
+                validator = json.loads(meta.read_text(encoding="utf-8")).get("validator")
+            except (OSError, ValueError):
+                validator = None
+            if not validator:
+                # неизвестно, с какой версии файла скачана часть — не склеиваем
+                return False
+            headers["Range"] = f"bytes={offset}-"
+            headers["If-Range"] = validator
+        with self.session.get(spec.url, stream=True, timeout=self.timeout, headers=headers) as r:
+            if offset and r.status_code == 416:
+                # «всё скачано» — только если размер файла на сервере равен скачанному
+                total = r.headers.get("Content-Range", "").rpartition("/")[2]
+                return total.isdigit() and int(total) == offset
+            r.raise_for_status()
+            if offset and r.status_code != 206:
+                return False
+            if offset:
+                logger.info(f"⏯️ {spec.dest.name}: докачка с {offset / 2 ** 20:.1f} МБ")
+            else:
+                meta.write_text(json.dumps({"url": spec.url, "validator": self._validator(r.headers)}),
+                                encoding="utf-8")
+            length = r.headers.get("Content-Length")
+            expected = offset + int(length) if length is not None else None
+
+            bar = tqdm(total=expected, initial=offset, unit="B", unit_scale=True, desc=spec.dest.name,
+                       leave=False) if self.progress else None
+            size = offset
+            try:
+                with open(part, "ab" if offset else "wb") as f:
+                    for chunk in r.iter_content(chunk_size=self.chunk_size):
+                        if not chunk:
+                            continue
+                        f.write(chunk)
+                        digest.update(chunk)
+                        if unzip is not None:
+                            unzip.feed(chunk)
+                        size += len(chunk)
+                        if bar is not None:
+                            bar.update(len(chunk))
+                    f.flush()
+                    os.fsync(f.fileno())
+            finally:
+                if bar is not None:
+                    bar.close()
+            if expected is not None and size != expected:
+                raise IOError(f"загрузка оборвана: {size} из {expected} байт")
+        return True
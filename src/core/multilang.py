@@ -0,0 +1,120 @@
+"""
+Параллельное оффлайн-распознавание на нескольких языках с выбором по уверенности.
+
+Каждый язык декодируется в своём процессе (ProcessPoolExecutor на один
+процесс, модель Vosk загружается в initializer), поэтому языки работают
+действительно параллельно, а не по очереди под GIL. Сегмент речи от VAD
+отправляется всем языкам сразу; побеждает язык с наибольшей средней
+уверенностью слов (conf из SetWords). Текущий язык получает фору margin —
+другой язык должен быть увереннее хотя бы на эту величину.
+
+Метрика задержки: время параллельного декодирования (от отправки до ответа
+последнего процесса) против времени декодирования одним текущим языком —
+разница и есть цена автоопределения языка.
+"""
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from src.utils import logger
+
+# --- состояние процесса-декодера (своё в каждом процессе) ---
+_recognizer = None
+
+
+def _init_worker(model_path: str, sample_rate: int):
+    global _recognizer
+    from vosk import Model, KaldiRecognizer, SetLogLevel
+
+    SetLogLevel(-1)
+    _recognizer = KaldiRecognizer(Model(model_path), sample_rate)
+    _recognizer.SetWords(True)
+
+
+def _decode(pcm: bytes):
+    """(text, средняя уверенность слов, время декодирования в с)."""
+    t = time.perf_counter()
+    if pcm:
+        _recognizer.AcceptWaveform(pcm)
+    # FinalResult заодно сбрасывает распознаватель для следующей фразы
+    result = json.loads(_recognizer.FinalResult())
+    words = result.get("result", [])
+    conf = sum(w.get("conf", 0.0) for w in words) / len(words) if words else 0.0
+    return result.get("text", "").strip(), conf, time.perf_counter() - t
+
+
+class MultiLanguageDecoder:
+    def __init__(self, paths: dict, languages, sample_rate: int = 16000, margin: float = 0.05):
+        self.sample_rate = sample_rate
+        self.margin = margin
+        self._pools = {}
+        for lang in languages:
+            path = Path(paths.get(lang, ""))
+            if not path.exists():
+                logger.warning(f"⚠️ Автоопределение языка: нет модели Vosk для {lang.upper()}")
+                continue
+            self._pools[lang] = ProcessPoolExecutor(
+                max_workers=1, initializer=_init_worker, initargs=(str(path), sample_rate))
+        # прогрев: модели грузятся в процессах, пока ассистент стартует
+        for pool in self._pools.values():
+            pool.submit(_decode, b"")
+        self.utterances = 0
+        self.parallel_seconds = 0.0
+        self.single_seconds = 0.0
+        logger.info(f"🌍 Автоопределение языка: {', '.join(l.upper() for l in self._pools) or 'нет моделей'}")
+
+    @property
+    def languages(self) -> list:
+        return list(self._pools)
+
+    def decode(self, pcm: bytes, current: str):
+        """
+        Распознаёт сегмент на всех языках и возвращает (text, lang).
+        current — текущий язык ассистента (получает фору margin).
+        """
+        t = time.perf_counter()
+        futures = {lang: pool.submit(_decode, pcm) for lang, pool in self._pools.items()}
+        results = {}
+        for lang, future in futures.items():
+            try:
+                results[lang] = future.result()
+            except Exception as e:
+                logger.warning(f"⚠️ Декодер {lang.upper()} упал: {e}")
+        wall = time.perf_counter() - t
+
+        best, best_score = None, -1.0
+        for lang, (text, conf, _) in results.items():
+            if not text:
+                continue
+            score = conf + (self.margin if lang == current else 0.0)
+            if score > best_score:
+                best, best_score = lang, score
+
+        single = results[current][2] if current in results else wall
+        self.utterances += 1
+        self.parallel_seconds += wall
+        self.single_seconds += single
+        summary = " / ".join(f"{lang} {conf:.2f}" for lang, (_, conf, _) in results.items())
+        logger.debug(f"🌍 {summary} → {(best or '-').upper()}: {wall * 1000:.0f} мс "
+                     f"(один язык {single * 1000:.0f} мс, +{(wall - single) * 1000:.0f} мс)")
+
+        if best is None:
+            return "", current
+        return results[best][0], best
+
+    def stats(self) -> dict:
+        n = self.utterances or 1
+        return {
+            "utterances": self.utterances,
+            "parallel_ms": round(self.parallel_seconds / n * 1000, 1),
+            "single_ms": round(self.single_seconds / n * 1000, 1),
+            "added_ms": round((self.parallel_seconds - self.single_seconds) / n * 1000, 1),
+        }
+
+    def close(self):
+        for pool in self._pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        self._pools.clear()
+        if self.utterances:
+            logger.info(f"🌍 Автоопределение языка: {self.stats()}")
@@ -0,0 +1,142 @@
+import re
+
+
+# Стоп-слова на трёх языках (удаляются перед сопоставлением команд)
+DEFAULT_STOPWORDS = {
+    "ru": ["пожалуйста", "пжлст", "скажи", "скажи мне", "потом", "и", "ещё", "еще", "пожалуйстa", "но", "так", "вообще", "иногда", "хорошо", "давай", "да"],
+    "en": ["please", "and", "then", "say", "tell", "now", "hey", "ok", "please"],
+    "uz": ["iltimos", "keyin", "va", "ayt", "и", "yana"],
+}
+
+# Разделители нескольких команд в одной фразе (RU/EN/UZ)
+DEFAULT_SEPARATORS = ["и", "а потом", "затем", "потом", "потом же", "затем же", "then", "and", "keyin", "yana", "va"]
+
+
+def collect_wake_words(config: dict) -> set:
+    """Собирает wake-words из config.yaml: `wake_words` (dict/list) и старое поле `wake_word`."""
+    wake_words = set()
+    config = config or {}
+    ww = config.get("wake_words", {}) or {}
+    if isinstance(ww, dict):
+        for v in ww.values():
+            if isinstance(v, (list, tuple)):
+                wake_words.update(str(w).lower().strip() for w in v)
+            elif isinstance(v, str):
+                wake_words.add(v.lower().strip())
+    elif isinstance(ww, (list, tuple)):
+        wake_words.update(str(w).lower().strip() for w in ww)
+    # backward compat
+    single = config.get("wake_word")
+    if single:
+        wake_words.add(str(single).lower().strip())
+    wake_words.discard("")
+    return wake_words
+
+
+def _alternation(words) -> str:
+    # длинные варианты первыми, чтобы "hey jarvis" побеждал "jarvis"
+    return "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+
+
+class TextNormalizer:
+    """
+    Единая очистка текста для main, SmartMatcher и навыков.
+    Все регулярные выражения компилируются один раз при создании:
+    - одна альтернация всех wake-words
+    - замороженный набор стоп-слов
+    - разделитель составных команд
+    При перезагрузке конфигурации создаётся новый объект целиком (атомарная замена).
+    """
+
+    _punct_re = re.compile(r"[^\w\s']", flags=re.UNICODE)
+    _trim_chars = " \t\n,.!?:;-"
+
+    def __init__(self, wake_words=(), stopwords=None, separators=None):
+        self.wake_words = frozenset(w.lower() for w in wake_words if w)
+
+        if stopwords is None:
+            stopwords = DEFAULT_STOPWORDS
+        if isinstance(stopwords, dict):
+            sw = set()
+            for v in stopwords.values():
+                sw.update(v)
+            stopwords = sw
+        self.stopwords = frozenset(w.lower() for w in stopwords)
+
+        self.separators = tuple(separators if separators is not None else DEFAULT_SEPARATORS)
+
+        self._wake_re = re.compile(rf"\b(?:{_alternation(self.wake_words)})\b") if self.wake_words else None
+        # разделитель — отдельное слово, окружённое пробелами (или началом/концом строки)
+        self._split_re = re.compile(rf"(?<!\S)(?:{_alternation(self.separators)})(?!\S)") if self.separators else None
+        self._phrase_res = {}
+
+    @classmethod
+    def from_config(cls, config: dict):
+        config = config or {}
+        matcher_cfg = config.get("matcher", {}) or {}
+        return cls(
+            wake_words=collect_wake_words(config),
+            stopwords=matcher_cfg.get("stopwords"),
+            separators=matcher_cfg.get("separators"),
+        )
+
+    def signature(self) -> str:
+        """Стабильное описание настроек нормализации (входит в ключ скомпилированного индекса команд)."""
+        return "|".join([
+            self._punct_re.pattern,
+            ",".join(sorted(self.wake_words)),
+            ",".join(sorted(self.stopwords)),
+        ])
+
+    # --- wake-words ---
+    def find_wake_word(self, text: str):
+        """Возвращает первое найденное wake-word (как отдельное слово) или None."""
+        if not text or self._wake_re is None:
+            return None
+        m = self._wake_re.search(text.lower())
+        return m.group(0) if m else None
+
+    def strip_wake_words(self, text: str) -> str:
+        """Удаляет все wake-words и лишние пробелы, приводит к нижнему регистру."""
+        if not text:
+            return ""
+        text = text.lower()
+        if self._wake_re is not None:
+            text = self._wake_re.sub(" ", text)
+        return " ".join(text.split()).strip(self._trim_chars)
+
+    # --- matcher ---
+    def normalize(self, text: str) -> str:
+        """Нормализация для сопоставления: пунктуация, wake-words, стоп-слова."""
+        if not text:
+            return ""
+        text = self._punct_re.sub(" ", str(text)).lower()
+        if self._wake_re is not None:
+            text = self._wake_re.sub(" ", text)
+        sw = self.stopwords
+        return " ".join(t for t in text.split() if t not in sw)
+
+    def split_phrases(self, text: str):
+        """Разбивает фразу на отдельные команды по разделителям."""
+        if not text:
+            return []
+        t = text.lower()
+        parts = self._split_re.split(t) if self._split_re is not None else [t]
+        return [p.strip() for p in parts if p.strip()]
+
+    # --- навыки ---
+    def strip_phrases(self, text: str, phrases) -> str:
+        """
+        Удаляет из текста заданные фразы (например, паттерны команды поиска).
+        Скомпилированное выражение кэшируется по набору фраз.
+        """
+        if not text:
+            return ""
+        key = tuple(sorted({p.lower() for p in phrases if p}))
+        if not key:
+            return text.lower().strip()
+        rx = self._phrase_res.get(key)
+        if rx is None:
+            rx = re.compile(_alternation(key), flags=re.IGNORECASE)
+            self._phrase_res[key] = rx
+        return rx.sub("", text.lower()).strip()
@@ -1,19 +1,20 @@
 import pvporcupine
-import sounddevice as sd
 import numpy as np
 import logging
-import time
 import sys
 
+from .audio_capture import AudioCapture
+
 logger = logging.getLogger("Porcupine")
 
 class PorcupineListener:
-    def __init__(self, keyword="jarvis", sensitivity=0.6):
+    def __init__(self, keyword="jarvis", sensitivity=0.6, capture: AudioCapture = None):
         self.keyword = keyword.lower()
         self.sensitivity = sensitivity
         self.active = False
         self.handle = None
-        self.stream = None
+        self.capture = capture
+        self._owns_capture = False
 
         try:
             # Проверяем доступные ключевые слова
@@ -43,27 +44,36 @@ class PorcupineListener:
         logger.info("👂 Ожидание активационного слова...")
 
         try:
-            def audio_callback(indata, frames, time_info, status):
-                if status:
-                    logger.warning(f"[AUDIO] {status}")
-                pcm = (indata[:, 0] * 32768).astype(np.int16)
-                result = self.handle.process(pcm)
-                if result >= 0:
-                    self.active = False
-                    raise StopIteration  # завершить stream safely
+            if self.capture is None:
+                self.capture = AudioCapture(sample_rate=self.handle.sample_rate)
+                self._owns_capture = True
+            if self.capture.sample_rate != self.handle.sample_rate:
+                raise ValueError(f"частота захвата {self.capture.sample_rate} Гц, "
+                                 f"Porcupine ожидает {self.handle.sample_rate} Гц")
+            self.capture.start()
 
-            with sd.InputStream(
-                samplerate=self.handle.sample_rate,
-                channels=1,
-                dtype="float32",
-                callback=audio_callback
-            ):
+            # подписка с текущего момента: команда, сказанная до wake word, не нужна
+            audio = self.capture.subscribe("wake_word")
+            frame = self.handle.frame_length
+            rest = np.zeros(0, dtype=np.int16)
+            try:
                 while self.active:
-                    time.sleep(0.01)
-
-        except StopIteration:
-            logger.info(f"✅ Wake word '{self.keyword}' обнаружено!")
-            return True
+                    block = audio.read(timeout=0.1)
+                    if block is None:
+                        if audio.closed:
+                            return False
+                        continue
+                    pcm = np.concatenate((rest, np.frombuffer(block, dtype=np.int16)))
+                    n = len(pcm) // frame
+                    for k in range(n):
+                        if self.handle.process(pcm[k * frame:(k + 1) * frame]) >= 0:
+                            self.active = False
+                            logger.info(f"✅ Wake word '{self.keyword}' обнаружено!")
+                            return True
+                    rest = pcm[n * frame:]
+            finally:
+                audio.close()
+            return False
 
         except Exception as e:
             logger.error(f"Ошибка прослушивания: {e}")
@@ -72,6 +82,8 @@ class PorcupineListener:
     def stop(self):
         """Останавливает Porcupine и освобождает ресурсы"""
         self.active = False
+        if self._owns_capture and self.capture is not None:
+            self.capture.stop()
         if self.handle:
             self.handle.delete()
         logger.info("🛑 Porcupine остановлен.")
@@ -1,17 +1,19 @@
-import os
 import json
-import queue
-import requests
-import zipfile
-import sounddevice as sd
-import io
-import tempfile
+import time
+from collections import deque
 from pathlib import Path
-from tqdm import tqdm
-from vosk import Model, KaldiRecognizer, SetLogLevel
+from vosk import SetLogLevel
 import speech_recognition as sr
-from scipy.io.wavfile import write as wav_write
 from src.utils import logger
+from .audio_capture import AudioCapture
+from .connectivity import ConnectivityMonitor
+from .model_fetcher import ModelFetcher
+from .vad import Endpointer
+from .vosk_pool import VoskModelPool
+from .vosk_worker import VoskWorker
+from .multilang import MultiLanguageDecoder
+from .grammar import CommandGrammar, clean_phrase
+from .wake_spotter import WakeSpotter
 
 
 class Recognizer:
@@ -19,15 +21,33 @@ class Recognizer:
     Постоянно активный Recognizer:
     - Онлайн (Google Speech)
     - Оффлайн (Vosk)
-    - Микрофон не выключается между фразами
+    - Микрофон не выключается между фразами: аудио читается из общего
+      AudioCapture через подписку ("vosk" или "endpointer" по режиму)
+    - wake_gate: пока ассистент не активен, работает только WakeSpotter
+      (подписка "wake_spotter"); полное распознавание — после wake-word и до sleep()
+    - pause_listening() / resume_listening() вокруг озвучки: аудио во время
+      ответа не декодируется, после него накопленное отбрасывается, состояние
+      Kaldi сбрасывается — распознаватель сразу слушает живой микрофон
     """
 
-    def __init__(self, config):
+    def __init__(self, config, capture: AudioCapture = None, dataset: dict = None):
         self.logger = logger
         self.config = config
         self.default_lang = config.get("assistant", {}).get("default_language", "ru")
         self.language_map = {"ru": "ru-RU", "en": "en-US", "uz": "uz-UZ"}
 
+        # общий поток микрофона; если не передан — Recognizer владеет своим
+        self._owns_capture = capture is None
+        self.capture = capture or AudioCapture.from_config(config)
+        self.sample_rate = self.capture.sample_rate
+        self.block_size = self.capture.block_size
+        self._subscription = None
+        # онлайн-режим: фраза отправляется в Google, как только VAD закрыл сегмент речи
+        self.endpointer = Endpointer.from_config(config, self.sample_rate)
+        self.listen_timeout = (config.get("vad", {}) or {}).get("idle_timeout_s", 5)
+        self._segments = deque()
+        self._sr = sr.Recognizer()
+
         self.models_dir = Path("data/models")
         self.models_dir.mkdir(parents=True, exist_ok=True)
 
@@ -44,112 +64,370 @@ class Recognizer:
         }
 
         SetLogLevel(-1)
-        self.online_available = self._check_internet()
+        # сеть проверяется в фоне; до первого ответа работаем оффлайн (Vosk)
+        self.auto_switch = config.get("auto_switch_mode", True)
+        self.online_available = False
+        self.mode = "offline"
+        self.mode_switches = 0
+        self._pending_mode = None
+        self._mode_decided = False
+        self.connectivity = ConnectivityMonitor.from_config(config, on_change=self._on_connectivity)
         self._ensure_vosk_models()
-        self.vosk_recognizers = self._load_vosk_recognizers()
 
-        self.mode = "online" if self.online_available else "offline"
+        # модели Vosk: активный язык — сразу, остальные — при первом обращении или фоновом прогреве
+        vosk_cfg = config.get("vosk", {}) or {}
+        self.vosk = VoskModelPool(self.vosk_models, self.sample_rate, vosk_cfg.get("max_models", 1))
+        self.vosk_worker = None
+        self._worker_lang = None
+        self._worker_cfg = {"slots": vosk_cfg.get("worker_slots", 64),
+                            "max_restarts": vosk_cfg.get("worker_max_restarts", 3)}
+        # грамматика команд: до первой загрузки модели, чтобы не пересоздавать распознаватель
+        self.grammar = None
+        self._grammar_cfg = {"enabled": vosk_cfg.get("grammar", False),
+                             "free_text": vosk_cfg.get("grammar_free_text", []) or []}
+        if dataset is not None:
+            self.set_grammar(dataset)
+        # автоопределение языка: каждый язык декодируется в своём процессе, пул нужен только как запасной путь
+        self.multilang = None
+        if vosk_cfg.get("auto_language", False):
+            self.multilang = MultiLanguageDecoder(
+                self.vosk_models, vosk_cfg.get("languages", list(self.vosk_models)),
+                self.sample_rate, vosk_cfg.get("language_margin", 0.05))
+        # декодирование в отдельном процессе: модель грузится там, в этом процессе — только запасной путь
+        if self.multilang is None and vosk_cfg.get("out_of_process", False):
+            self._start_vosk_worker(self.default_lang)
+        if self.multilang is None and self.vosk_worker is None:
+            self.vosk.get(self.default_lang)
+        prewarm = [lang for lang in vosk_cfg.get("prewarm", []) or [] if lang != self.default_lang]
+        if prewarm:
+            self.vosk.prewarm(prewarm)
+
+        if self._pending_mode:
+            # сеть уже проверялась при скачивании моделей
+            self.mode, self._pending_mode = self._pending_mode, None
         self.logger.info(f"🌐 Режим: {self.mode.upper()}")
         self.logger.info(f"🗣️ Текущий язык: {self.default_lang.upper()}")
 
-        # Очередь аудио и постоянный поток
-        self.audio_queue = queue.Queue()
-        self.stream = None
-        self._start_microphone_stream()
+        # двухступенчатое слушание: пока ассистент не активен — только дешёвый поиск wake-word
+        self.wake_gate = (config.get("wake_gate", {}) or {}).get("enabled", False)
+        self.awake = not self.wake_gate
+        self._pending_sleep = False
+        self.spotter = None
+        self._spotter_lang = None
+        self.vosk.add_evict_listener(self._on_model_evicted)
+        self._stage_time = {"wake": [0.0, 0.0], "full": [0.0, 0.0]}   # [секунды, CPU-секунды потока]
+        # озвучка ответа: своё аудио не декодируется, после ответа — сразу к живому потоку
+        self._muted = False
+        self._discard_pending = False
+        self._resumed_at = 0.0
+        self.muted_blocks = 0
+        self._post_reply = {"resumes": 0, "stale_s": [], "catch_up_ms": []}
+
+        # подписка до старта захвата — первая фраза не теряется
+        self._audio(self._subscription_name())
+        self.capture.start()
+        self.connectivity.start()
 
     # === Интернет ===
-    def _check_internet(self):
-        try:
-            requests.get("https://www.google.com", timeout=3)
-            return True
-        except requests.RequestException:
-            return False
+    def _on_connectivity(self, online: bool):
+        """Вызывается из потока ConnectivityMonitor: режим сменится на границе фразы в потоке распознавания."""
+        self.online_available = online
+        if self._mode_decided and not self.auto_switch:
+            return
+        self._mode_decided = True
+        target = "online" if online else "offline"
+        self._pending_mode = target if target != self.mode else None
+
+    def _apply_pending_mode(self):
+        mode, self._pending_mode = self._pending_mode, None
+        if mode and mode != self.mode:
+            self.set_mode(mode)
+
+    def stats(self) -> dict:
+        stats = {"mode": self.mode, "mode_switches": self.mode_switches, "connectivity": self.connectivity.stats(),
+                 "decoder_lag_s": round(self.decoder_lag_ms() / 1000, 2), "post_reply": self.post_reply_stats()}
+        if self.wake_gate:
+            stats["stages"] = self.stage_stats()
+            stats["wake_spotter"] = self.spotter.stats() if self.spotter is not None else None
+        return stats
+
+    def stage_stats(self) -> dict:
+        """Время и CPU потока распознавания по ступеням: wake — поиск wake-word, full — полное распознавание."""
+        return {
+            stage: {"wall_s": round(wall, 1), "cpu_s": round(cpu, 2),
+                    "cpu_pct": round(100 * cpu / wall, 1) if wall else None}
+            for stage, (wall, cpu) in self._stage_time.items()
+        }
 
     # === Проверяем модели ===
     def _ensure_vosk_models(self):
-        for lang, path in self.vosk_models.items():
-            if not path.exists() and self.online_available:
-                self.logger.info(f"📦 Скачиваю модель для {lang.upper()}...")
-                self._download_model(self.vosk_urls[lang])
-
-    def _download_model(self, url):
-        tmp_file = Path(tempfile.gettempdir()) / "vosk_model.zip"
-        with requests.get(url, stream=True, timeout=30) as r:
-            r.raise_for_status()
-            total = int(r.headers.get("Content-Length", 0))
-            with open(tmp_file, "wb") as f, tqdm(total=total, unit="B", unit_scale=True) as bar:
-                for chunk in r.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-                        bar.update(len(chunk))
-
-        with zipfile.ZipFile(tmp_file, "r") as zf:
-            zf.extractall(self.models_dir)
-        os.remove(tmp_file)
-        self.logger.info("✅ Модель установлена!")
-
-    # === Загружаем модели Vosk ===
-    def _load_vosk_recognizers(self):
-        recs = {}
-        for lang, path in self.vosk_models.items():
-            if path.exists():
-                model = Model(str(path))
-                recs[lang] = KaldiRecognizer(model, 16000)
-        return recs
-
-    # === Постоянный аудиопоток ===
-    def _start_microphone_stream(self):
-        def callback(indata, frames, time_, status):
-            if status:
-                self.logger.info(f"[AUDIO WARNING] {status}")
-            self.audio_queue.put(bytes(indata))
-
-        self.logger.info("🎤 Микрофон активен (постоянный режим)")
-        self.stream = sd.RawInputStream(
-            samplerate=16000,
-            blocksize=8000,
-            dtype="int16",
-            channels=1,
-            callback=callback
-        )
-        self.stream.start()
+        missing = [lang for lang, path in self.vosk_models.items() if not path.exists()]
+        # синхронная проверка сети — только если действительно нужно что-то скачать
+        if not missing or not self.connectivity.probe():
+            return
+        self.logger.info(f"📦 Скачиваю модели Vosk: {', '.join(lang.upper() for lang in missing)}...")
+        fetcher = ModelFetcher.from_config(self.config)
+        fetcher.fetch_all(fetcher.spec(self.vosk_urls[lang], self.vosk_models[lang], extract=True)
+                          for lang in missing)
+
+    # === Процесс-декодер Vosk ===
+    def _start_vosk_worker(self, lang: str):
+        if not self.vosk.available(lang):
+            return
+        self.vosk_worker = VoskWorker(self.vosk_models[lang], self.sample_rate, self.block_size,
+                                      grammar=self._grammar_for(lang), **self._worker_cfg)
+        self._worker_lang = lang
+        self.logger.info(f"⚙️ Vosk декодирует в отдельном процессе ({lang.upper()})")
+
+    def decoder_lag_ms(self) -> float:
+        """Сколько захваченного аудио ещё не дошло до декодера (подписка + кольцо процесса-декодера)."""
+        lag = self._subscription.lag_ms if self._subscription is not None else 0.0
+        if self.vosk_worker is not None:
+            lag += self.vosk_worker.lag_ms()
+        return lag
+
+    # === Озвучка ответа ===
+    def pause_listening(self):
+        """Ассистент начал говорить: блоки читаются и выбрасываются, не попадая в декодер."""
+        self._muted = True
+
+    def resume_listening(self):
+        """Ответ озвучен: на следующем блоке поток распознавания отбросит накопленное и сбросит Kaldi."""
+        self._resumed_at = time.monotonic()
+        self._muted = False
+        self._discard_pending = True
+
+    def _read(self, audio, timeout: float):
+        """Чтение блока для декодера с учётом озвучки (pause_listening / resume_listening)."""
+        while True:
+            if self._discard_pending:
+                self._discard_stale(audio)
+            block = audio.read(timeout=timeout)
+            if block is None or not self._muted:
+                return block
+            self.muted_blocks += 1
+
+    def _discard_stale(self, audio):
+        """Выполняется в потоке распознавания: пропуск отставания, сброс начатой фразы."""
+        self._discard_pending = False
+        stale_ms = self.decoder_lag_ms()
+        audio.skip_to_live()
+        self.endpointer.reset()
+        self._segments.clear()
+        self.vosk.reset()
+        if self.vosk_worker is not None:
+            self.vosk_worker.reset()
+        if self.spotter is not None:
+            self.spotter.reset()
+        catch_up_ms = (time.monotonic() - self._resumed_at) * 1000
+        post = self._post_reply
+        post["resumes"] += 1
+        post["stale_s"].append(stale_ms / 1000)
+        post["catch_up_ms"].append(catch_up_ms)
+        self.logger.debug(f"🔇 После ответа: отброшено {stale_ms / 1000:.2f} с аудио, "
+                          f"живой поток через {catch_up_ms:.0f} мс")
+
+    def post_reply_stats(self) -> dict:
+        """
+        Отзывчивость после ответа: stale_s — сколько накопленного аудио отброшено,
+        catch_up_ms — от конца озвучки до момента, когда декодер снова слушает живой поток.
+        """
+        post = self._post_reply
+        stale, catch_up = post["stale_s"], post["catch_up_ms"]
+        return {
+            "resumes": post["resumes"],
+            "muted_blocks": self.muted_blocks,
+            "stale_s_avg": round(sum(stale) / len(stale), 2) if stale else None,
+            "stale_s_max": round(max(stale), 2) if stale else None,
+            "catch_up_ms_avg": round(sum(catch_up) / len(catch_up), 1) if catch_up else None,
+            "catch_up_ms_max": round(max(catch_up), 1) if catch_up else None,
+        }
+
+    # === Грамматика команд ===
+    def set_grammar(self, dataset: dict):
+        """Собирает грамматику Vosk из датасета (при старте и после перезагрузки commands.yaml)."""
+        if not self._grammar_cfg["enabled"]:
+            return
+        self.grammar = CommandGrammar.from_dataset(dataset, self.config, self._grammar_cfg["free_text"])
+        self.vosk.set_grammar(self.grammar)
+        if self.vosk_worker is not None:
+            self.vosk_worker.set_grammar(self._grammar_for(self._worker_lang))
+        sizes = ", ".join(f"{lang.upper()} {n}" for lang, n in self.grammar.stats().items())
+        self.logger.info(f"📜 Грамматика Vosk: {sizes} фраз")
+
+    def _grammar_for(self, lang: str):
+        return self.grammar.for_language(lang) if self.grammar is not None else None
+
+    # === Язык ===
+    def set_language(self, lang: str):
+        """Меняет язык распознавания; модель Vosk подгружается в фоне."""
+        if lang not in self.language_map:
+            self.logger.warning(f"⚠️ Язык {lang} не поддерживается.")
+            return
+        self.default_lang = lang
+        if self.vosk_worker is not None:
+            if self.vosk.available(lang):
+                self.vosk_worker.set_model(self.vosk_models[lang], self._grammar_for(lang))
+                self._worker_lang = lang
+        elif self.vosk.available(lang):
+            self.vosk.load_async(lang)
+        self.logger.info(f"🗣️ Текущий язык: {lang.upper()}")
+
+    # === Режим ===
+    def set_mode(self, mode: str):
+        """Переключает online / offline и сразу переподписывается на аудио нового режима."""
+        if mode not in ("online", "offline"):
+            raise ValueError(f"Неизвестный режим: {mode}")
+        if mode != self.mode:
+            self.mode_switches += 1
+        # явный выбор режима важнее отложенного решения монитора сети
+        self._pending_mode = None
+        self._mode_decided = True
+        self.mode = mode
+        self._audio(self._subscription_name())
+        self.logger.info(f"🌐 Режим: {mode.upper()}")
+
+    def _subscription_name(self) -> str:
+        if not self.awake:
+            return "wake_spotter"
+        # онлайн и автоопределение языка режут фразы VAD, обычный оффлайн кормит Vosk напрямую
+        if self.mode == "online" or (self.multilang is not None and self.multilang.languages):
+            return "endpointer"
+        return "vosk"
+
+    # === Подписка на общий аудиопоток ===
+    def _audio(self, name: str):
+        """
+        Подписка текущего режима. При смене режима старая закрывается, чтобы
+        неактивный потребитель не копил отставание.
+        """
+        sub = self._subscription
+        if sub is None or sub.name != name or sub.closed:
+            if sub is not None:
+                sub.close()
+            sub = self._subscription = self.capture.subscribe(name)
+        return sub
 
     # === Главный метод ===
     def listen_text(self):
         """
         Слушает микрофон постоянно и возвращает текст, когда распознана фраза.
         """
+        self._apply_pending_mode()
+        if self._pending_sleep:
+            self._fall_asleep()
+        if self.awake:
+            return self._timed("full", self._listen_full)
+
+        word = self._timed("wake", self._spot_wake_word)
+        if word is None:
+            return "", self.default_lang
+        text, lang = self._timed("full", self._listen_full)
+        # фраза перечитана с начала, но полный словарь мог услышать wake-word иначе
+        if f" {word} " not in f" {clean_phrase(text)} ":
+            text = f"{word} {text}".strip()
+        return text, lang
+
+    def _listen_full(self):
         if self.mode == "online":
             return self._listen_online()
-        else:
-            return self._listen_offline()
+        return self._listen_offline()
+
+    def _timed(self, stage: str, listen):
+        wall, cpu = time.monotonic(), time.thread_time()
+        try:
+            return listen()
+        finally:
+            acc = self._stage_time[stage]
+            acc[0] += time.monotonic() - wall
+            acc[1] += time.thread_time() - cpu
+
+    # === Первая ступень: wake-word ===
+    def wake(self, rewind_blocks: int = 0):
+        """
+        Включает полное распознавание. rewind_blocks — сколько уже прочитанных
+        блоков перечитать (фраза с wake-word целиком).
+        """
+        start = self._subscription.cursor - rewind_blocks if self._subscription is not None else None
+        self.awake = True
+        self._pending_sleep = False
+        sub = self._audio(self._subscription_name())
+        if rewind_blocks and start is not None:
+            sub.rewind(sub.cursor - start)
+
+    def sleep(self):
+        """Назад к поиску wake-word (истёк active_timeout). Применяется на границе фразы."""
+        if self.wake_gate and self.awake:
+            self._pending_sleep = True
+
+    def _fall_asleep(self):
+        self._pending_sleep = False
+        self.awake = False
+        self.endpointer.reset()
+        self._segments.clear()
+        if self.spotter is not None:
+            self.spotter.reset()
+        self._audio(self._subscription_name())
+        self.logger.info("💤 Жду wake-word")
+
+    def _boundary_pending(self) -> bool:
+        """На границе фразы нужно вернуться из цикла: сменить режим или уснуть."""
+        return bool(self._pending_mode) or self._pending_sleep
+
+    def _spot_wake_word(self):
+        """Слушает только wake-word. Возвращает его или None (тишина listen_timeout секунд)."""
+        spotter = self._wake_spotter(self.default_lang)
+        if spotter is None:
+            # онлайн-режим без локальных моделей: поиск wake-word невозможен, распознаётся всё
+            self.logger.warning(f"⚠️ wake_gate: нет модели Vosk ({self.default_lang.upper()}) для поиска wake-word — "
+                                f"первая ступень отключена, все фразы распознаются полностью")
+            self.wake_gate = False
+            self.wake()
+            return None
+        audio = self._audio("wake_spotter")
+        while True:
+            data = self._read(audio, self.listen_timeout)
+            if data is None:
+                return None
+            if self.spotter is not spotter:
+                # модель выгружена из пула — спотер пересоздастся при следующем вызове
+                return None
+            word = spotter.feed(data)
+            if word is not None:
+                self.logger.info(f"👂 Wake-word: {word}")
+                self.wake(rewind_blocks=spotter.utterance_blocks)
+                return word
+
+    def _on_model_evicted(self, lang: str):
+        # спотер держит модель через свой KaldiRecognizer — без этого лимит vosk.max_models не соблюдается
+        if self._spotter_lang == lang:
+            self.spotter = None
+            self._spotter_lang = None
+
+    def _wake_spotter(self, lang: str):
+        if self.spotter is None or self._spotter_lang != lang:
+            model = self.vosk.model(lang)
+            if model is None:
+                return None
+            self.spotter = WakeSpotter.from_config(self.config, model, lang, self.sample_rate, self.capture.block_ms,
+                                                   ring_blocks=self.capture.slots)
+            self._spotter_lang = lang
+        return self.spotter
 
     # === Онлайн (Google) ===
     def _listen_online(self):
         self.logger.info("🎙️ (Online) Говорите...")
 
-        samplerate = 16000
-        duration = 5
-
-        try:
-            with sd.InputStream(samplerate=samplerate, channels=1, dtype="int16") as stream:
-                audio_data = stream.read(int(samplerate * duration))[0]
-        except Exception as e:
-            self.logger.warning(f"⚠️ Ошибка аудио-потока: {e}")
+        segment = self._next_speech_segment(self.listen_timeout)
+        if segment is None:
             return "", self.default_lang
 
-        # Конвертация в wav и Google Speech
-        wav_bytes = io.BytesIO()
-        wav_write(wav_bytes, samplerate, audio_data)
-        wav_bytes.seek(0)
-
-        r = sr.Recognizer()
-        with sr.AudioFile(wav_bytes) as source:
-            audio = r.record(source)
+        # PCM прямо из буфера захвата — без кодирования в WAV и обратно
+        audio = sr.AudioData(segment.tobytes(), self.sample_rate, 2)
 
         lang_code = self.language_map.get(self.default_lang, "ru")
         try:
-            text = r.recognize_google(audio, language=lang_code)
+            text = self._sr.recognize_google(audio, language=lang_code)
             self.logger.info(f"🧠 Распознано ({self.default_lang.upper()}): {text}")
             return text, self.default_lang
         except sr.UnknownValueError:
@@ -157,53 +435,141 @@ class Recognizer:
             return "", self.default_lang
         except sr.RequestError:
             self.logger.warning("⚠️ Интернет пропал — офлайн режим.")
-            self.mode = "offline"
+            self.connectivity.report_failure()
+            self.set_mode("offline")
             return self._listen_offline()
 
+    def _next_speech_segment(self, timeout: float):
+        """
+        Читает живой поток микрофона через VAD и возвращает сегмент речи (np.int16),
+        как только он закрылся. None — если за timeout секунд речь не началась.
+        """
+        if self._segments:
+            return self._segments.popleft()
+        audio = self._audio("endpointer")
+        deadline = time.monotonic() + timeout
+        while True:
+            block = self._read(audio, 0.1)
+            if block is None and audio.closed:
+                return None
+            if block is not None:
+                self._segments.extend(self.endpointer.feed(block))
+                if self._segments:
+                    segment = self._segments.popleft()
+                    self.logger.debug(f"🎙️ Сегмент речи {len(segment) / self.sample_rate:.2f} с")
+                    return segment
+            if not self.endpointer.in_speech and time.monotonic() > deadline:
+                return None
+
     # === Офлайн (Vosk) ===
     def _listen_offline(self):
+        if self.multilang is not None and self.multilang.languages:
+            return self._listen_multilang()
+        if self.vosk_worker is not None:
+            return self._listen_worker()
         lang = self.default_lang
-        recognizer = self.vosk_recognizers.get(lang)
+        recognizer = self.vosk.get(lang)
         if not recognizer:
             self.logger.warning(f"⚠️ Нет модели для {lang.upper()}")
             return "", lang
 
+        audio = self._audio("vosk")
         while True:
-            data = self.audio_queue.get()
-            if recognizer.AcceptWaveform(data):
+            # живой микрофон шлёт блоки всегда; тишина в потоке — источник закончился или отключён
+            data = self._read(audio, self.listen_timeout)
+            if data is None:
+                return "", lang
+            # cffi-привязка Vosk принимает только bytes — единственная копия блока
+            if recognizer.AcceptWaveform(bytes(data)):
                 result = json.loads(recognizer.Result())
                 text = result.get("text", "").strip()
                 if text:
                     self.logger.info(f"🗣️ {text}")
                     return text, lang
+                if self._boundary_pending():
+                    # граница фразы без речи — можно сменить режим или уснуть
+                    return "", lang
+
+    def _listen_worker(self):
+        """Оффлайн через процесс-декодер: блоки уходят в общее кольцо, текст приходит по pipe."""
+        lang = self.default_lang
+        worker = self.vosk_worker
+        if self._worker_lang != lang and self.vosk.available(lang):
+            worker.set_model(self.vosk_models[lang], self._grammar_for(lang))
+            self._worker_lang = lang
+        audio = self._audio("vosk")
+        idle_deadline = time.monotonic() + self.listen_timeout
+        while True:
+            if not worker.ensure_alive():
+                self.logger.error("❌ Процесс Vosk не поднимается — декодирование в основном процессе")
+                worker.stop()
+                self.vosk_worker = None
+                return self._listen_offline()
+            text = worker.result(timeout=0.02)
+            if text:
+                self.logger.info(f"🗣️ {text}")
+                return text, lang
+            if text == "" and self._boundary_pending():
+                # граница фразы без речи — можно сменить режим или уснуть
+                return "", lang
+            data = self._read(audio, 0)
+            while data is not None:
+                worker.write(data)
+                idle_deadline = time.monotonic() + self.listen_timeout
+                data = self._read(audio, 0)
+            # тишина в потоке — источник закончился или отключён
+            if audio.closed or time.monotonic() > idle_deadline:
+                return "", lang
+
+    def _listen_multilang(self):
+        """Сегмент речи от VAD распознаётся на всех языках сразу, язык — по уверенности слов."""
+        segment = self._next_speech_segment(self.listen_timeout)
+        if segment is None:
+            return "", self.default_lang
+        text, lang = self.multilang.decode(segment.tobytes(), self.default_lang)
+        if text:
+            self.logger.info(f"🗣️ ({lang.upper()}) {text}")
+        return text, lang
 
     # === Сбор данных ===
     def _collect_audio(self, seconds=5):
         """Собирает аудио блоки за указанное время."""
         frames = []
-        start = sd.get_stream().time if self.stream else 0
-        duration = seconds
-        while True:
-            try:
-                frames.append(self.audio_queue.get(timeout=seconds))
-                if len(frames) * 0.5 > duration:  # приблизительно seconds
+        audio = self.capture.subscribe("collect")
+        try:
+            while len(frames) * self.block_size / self.sample_rate <= seconds:
+                block = audio.read(timeout=seconds)
+                if block is None:
                     break
-            except queue.Empty:
-                break
+                frames.append(block)
+        finally:
+            audio.close()
         if not frames:
             return None
         import numpy as np
         return np.frombuffer(b"".join(frames), dtype="int16")
 
     def stop(self):
-        """Останавливает микрофон и очищает очередь."""
+        """Отписывается от аудиопотока; микрофон останавливается, только если он свой."""
         try:
-            if self.stream:
-                self.stream.stop()
-                self.stream.close()
-                self.stream = None
-            with self.audio_queue.mutex:
-                self.audio_queue.queue.clear()
+            if self._subscription is not None:
+                self._subscription.close()
+                self._subscription = None
+            self.connectivity.stop()
+            self.logger.info(f"🌐 Распознавание: {self.stats()}")
+            if self.wake_gate:
+                stages = self.stage_stats()
+                self.logger.info(f"💤 CPU потока распознавания: ожидание wake-word {stages['wake']['cpu_pct']}% "
+                                 f"({stages['wake']['wall_s']} с), полное распознавание {stages['full']['cpu_pct']}% "
+                                 f"({stages['full']['wall_s']} с)")
+            if self.multilang is not None:
+                self.multilang.close()
+            if self.vosk_worker is not None:
+                self.logger.info(f"⚙️ Процесс Vosk: {self.vosk_worker.stats()}")
+                self.vosk_worker.stop()
+                self.vosk_worker = None
+            if self._owns_capture:
+                self.capture.stop()
             self.logger.warning("🛑 Распознавание остановлено.")
         except Exception as e:
             self.logger.warning(f"⚠️ Ошибка при остановке микрофона: {e}")
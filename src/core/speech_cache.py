@@ -0,0 +1,185 @@
+"""
+Кэш синтезированной речи для HybridTTS.
+
+Ключ — sha256 от (text, lang, speaker, engine, sample_rate): одна и та же
+фраза тем же голосом синтезируется один раз.
+
+- память: LRU из memory_items последних фраз (массивы или memmap файлов);
+- диск: <cache_dir>/<ключ[:2]>/<ключ>.npy, PCM int16, открывается через
+  np.load(mmap_mode="r") — проигрывание начинается без чтения файла целиком;
+  запись атомарная (временный файл + os.replace);
+- размер диска ограничен max_disk_mb: при превышении удаляются давно не
+  звучавшие фразы (время последнего проигрывания — mtime файла).
+
+stats(): попадания в память / на диск, промахи, занято на диске, вытеснения.
+"""
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from src.utils import logger
+from src.utils.cache import LRUCache
+from .config import BASE_DIR, CACHE_DIR
+
+
+class SpeechCache:
+    def __init__(self, cache_dir, memory_items: int = 64, max_disk_mb: float = 200.0):
+        self.dir = Path(cache_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.max_disk_bytes = int(max_disk_mb * 2 ** 20)
+        self._memory = LRUCache(memory_items)
+        self._lock = threading.Lock()
+        self._files = {}            # ключ -> [байты, время последнего использования]
+        self.disk_bytes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._scan()
+
+    @classmethod
+    def from_config(cls, config: dict):
+        config = config or {}
+        cache = config.get("tts_cache", {}) or {}
+        if not cache.get("enabled", True):
+            return None
+        cache_dir = Path((config.get("paths", {}) or {}).get("cache_dir", str(CACHE_DIR)))
+        if not cache_dir.is_absolute():
+            # как Settings.index_dir: путь из конфига — от корня проекта, а не от cwd
+            cache_dir = BASE_DIR / cache_dir
+        return cls(cache_dir / "tts", memory_items=cache.get("memory_items", 64), max_disk_mb=cache.get("max_disk_mb", 200))
+
+    @staticmethod
+    def key(text: str, lang: str, speaker: str, engine: str, sample_rate: int) -> str:
+        raw = json.dumps([text, lang, speaker, engine, int(sample_rate)], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.dir / key[:2] / f"{key}.npy"
+
+    def _scan(self):
+        for path in self.dir.glob("*/*.npy"):
+            st = path.stat()
+            self._files[path.stem] = [st.st_size, st.st_mtime]
+            self.disk_bytes += st.st_size
+        if self._files:
+            logger.debug(f"🗄️ Кэш речи: {len(self._files)} фраз, {self.disk_bytes / 2 ** 20:.1f} МБ")
+
+    # --- чтение / запись ---
+    def get(self, key: str):
+        """PCM int16 фразы (массив или memmap) или None."""
+        audio = self._memory.get(key)
+        if audio is not None:
+            self.memory_hits += 1
+            self._touch(key)
+            return audio
+        path = self._path(key)
+        with self._lock:
+            known = key in self._files
+        if not known:
+            self.misses += 1
+            return None
+        try:
+            audio = np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            # файл удалили или он битый — считаем промахом
+            self._forget(key)
+            self.misses += 1
+            return None
+        self.disk_hits += 1
+        self._memory.put(key, audio)
+        self._touch(key)
+        return audio
+
+    def put(self, key: str, audio) -> np.ndarray:
+        """Сохраняет фразу (float [-1, 1] или int16) в память и на диск. Возвращает PCM int16."""
+        pcm = to_pcm16(audio)
+        self._memory.put(key, pcm)
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp, "wb") as f:
+                np.save(f, pcm)
+            os.replace(tmp, path)
+        except OSError as e:
+            tmp.unlink(missing_ok=True)
+            logger.warning(f"⚠️ Кэш речи: не удалось записать {path.name}: {e}")
+            return pcm
+        size = path.stat().st_size
+        with self._lock:
+            old = self._files.get(key)
+            if old is not None:
+                self.disk_bytes -= old[0]
+            self._files[key] = [size, path.stat().st_mtime]
+            self.disk_bytes += size
+        self._evict()
+        return pcm
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._files or key in self._memory
+
+    # --- учёт и вытеснение ---
+    def _touch(self, key: str):
+        with self._lock:
+            entry = self._files.get(key)
+            if entry is None:
+                return
+            try:
+                os.utime(self._path(key))
+                entry[1] = self._path(key).stat().st_mtime
+            except OSError:
+                pass
+
+    def _forget(self, key: str):
+        self._memory.pop(key)
+        with self._lock:
+            entry = self._files.pop(key, None)
+            if entry is not None:
+                self.disk_bytes -= entry[0]
+
+    def _evict(self):
+        with self._lock:
+            if self.disk_bytes <= self.max_disk_bytes:
+                return
+            victims = []
+            for key, (size, _) in sorted(self._files.items(), key=lambda item: item[1][1]):
+                if self.disk_bytes <= self.max_disk_bytes:
+                    break
+                victims.append(key)
+                self.disk_bytes -= size
+            for key in victims:
+                del self._files[key]
+        for key in victims:
+            # memmap из памяти тоже убираем — файл больше не наш
+            self._memory.pop(key)
+            self._path(key).unlink(missing_ok=True)
+        self.evictions += len(victims)
+        logger.debug(f"🗄️ Кэш речи: вытеснено {len(victims)} фраз, на диске {self.disk_bytes / 2 ** 20:.1f} МБ")
+
+    def stats(self) -> dict:
+        total = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / total, 3) if total else 0.0,
+            "phrases": len(self._files),
+            "disk_mb": round(self.disk_bytes / 2 ** 20, 2),
+            "evictions": self.evictions,
+        }
+
+
+def to_pcm16(audio) -> np.ndarray:
+    """Тензор / массив float [-1, 1] или int16 -> непрерывный np.int16."""
+    if hasattr(audio, "detach"):
+        audio = audio.detach().cpu().numpy()
+    audio = np.asarray(audio)
+    if audio.dtype == np.int16:
+        return np.ascontiguousarray(audio)
+    return (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
@@ -0,0 +1,163 @@
+"""
+Потоковая озвучка длинных ответов (silero.streaming: true).
+
+HybridTTS.speak раньше синтезировал весь текст и только потом вызывал
+sd.play — время до первого звука росло с длиной ответа (read_notes,
+перевод, Gemini). Здесь:
+
+- split_chunks() режет текст на предложения, слишком длинные — по
+  запятым / точкам с запятой / тире, в крайнем случае по словам; первый
+  кусок короче остальных — он определяет время до первого звука; текст
+  не длиннее first_max_chars остаётся одним куском;
+- SpeechStream синтезирует кусок N+1 в отдельном потоке, пока кусок N
+  звучит, и отдаёт PCM в один непрерывный sd.OutputStream — устройство
+  не переоткрывается между кусками, пауз на стыках нет;
+- если синтез не успевает за воспроизведением, в поток идёт тишина и
+  это учитывается в stats как underrun.
+
+play() возвращает ttfa_ms (до первого звука), total_s, audio_s, chunks,
+underruns / underrun_ms.
+"""
+import queue
+import re
+import threading
+import time
+
+import numpy as np
+
+from src.utils import logger
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?…])\s+")
+_CLAUSE_RE = re.compile(r"(?<=[,;:])\s+|\s+(?=[—–]\s)")
+
+
+def split_chunks(text: str, max_chars: int = 250, first_max_chars: int = 80) -> list:
+    """Куски текста для поштучного синтеза: предложения, склеенные до max_chars."""
+    text = " ".join(str(text).split())
+    if not text:
+        return []
+    pieces = []
+    for sentence in _SENTENCE_RE.split(text):
+        limit = first_max_chars if not pieces else max_chars
+        pieces.extend(_split_long(sentence, limit) if len(sentence) > limit else [sentence])
+
+    # первый кусок — до first_max_chars (быстрый старт; короткий ответ — один кусок, как в
+    # кэше прогрева), остальные склеиваются до max_chars, чтобы не дробить синтез
+    chunks = pieces[:1]
+    for piece in pieces[1:]:
+        limit = first_max_chars if len(chunks) == 1 else max_chars
+        if len(chunks[-1]) + 1 + len(piece) <= limit:
+            chunks[-1] = f"{chunks[-1]} {piece}"
+        else:
+            chunks.append(piece)
+    return chunks
+
+
+def _split_long(sentence: str, limit: int) -> list:
+    parts = []
+    for clause in _CLAUSE_RE.split(sentence):
+        words = clause.split()
+        while words:
+            # клауза длиннее предела — режем по словам
+            part = words.pop(0)
+            while words and len(part) + 1 + len(words[0]) <= limit:
+                part = f"{part} {words.pop(0)}"
+            if parts and len(parts[-1]) + 1 + len(part) <= limit:
+                parts[-1] = f"{parts[-1]} {part}"
+            else:
+                parts.append(part)
+    return parts
+
+
+class SpeechStream:
+    def __init__(self, render, sample_rate: int, output, prefetch: int = 2, blocksize: int = 0):
+        """
+        render(text) -> PCM int16 куска (или None — кусок пропускается);
+        output — фабрика потока с интерфейсом sd.OutputStream.
+        """
+        self.render = render
+        self.sample_rate = sample_rate
+        self.output = output
+        self.prefetch = max(1, prefetch)
+        self.blocksize = blocksize
+
+    def play(self, chunks) -> dict:
+        """Синтезирует и проигрывает куски по очереди. Блокирует до конца воспроизведения."""
+        chunks = list(chunks)
+        ready = queue.Queue(maxsize=self.prefetch)
+        finished = threading.Event()
+        cancel = threading.Event()
+        started = time.perf_counter()
+        state = {"audio": None, "pos": 0, "done": False, "first": None, "frames": 0,
+                 "underruns": 0, "underrun_frames": 0, "error": None}
+
+        def produce():
+            try:
+                for chunk in chunks:
+                    if cancel.is_set():
+                        break
+                    audio = self.render(chunk)
+                    if audio is not None and len(audio):
+                        ready.put(np.asarray(audio, dtype=np.int16).reshape(-1))
+            except Exception as e:
+                state["error"] = e
+            finally:
+                ready.put(None)
+
+        def callback(outdata, frames, time_info, status):
+            filled = 0
+            while filled < frames and not state["done"]:
+                audio = state["audio"]
+                if audio is None or state["pos"] >= len(audio):
+                    try:
+                        audio = ready.get_nowait()
+                    except queue.Empty:
+                        break
+                    if audio is None:
+                        state["done"] = True
+                        break
+                    state["audio"], state["pos"] = audio, 0
+                n = min(frames - filled, len(audio) - state["pos"])
+                outdata[filled:filled + n, 0] = audio[state["pos"]:state["pos"] + n]
+                state["pos"] += n
+                filled += n
+            outdata[filled:] = 0
+            if filled and state["first"] is None:
+                state["first"] = time.perf_counter()
+            state["frames"] += filled
+            if filled < frames and state["first"] is not None and not state["done"]:
+                # синтез не успел за воспроизведением — на стыке тишина
+                state["underruns"] += 1
+                state["underrun_frames"] += frames - filled
+            if state["done"]:
+                finished.set()
+
+        producer = threading.Thread(target=produce, daemon=True, name="TTS-Stream")
+        producer.start()
+        stream = self.output(samplerate=self.sample_rate, channels=1, dtype="int16",
+                             blocksize=self.blocksize, callback=callback)
+        try:
+            with stream:
+                finished.wait()
+        finally:
+            # прервали (KeyboardInterrupt, ошибка устройства) — синтез тоже останавливаем
+            cancel.set()
+            while producer.is_alive():
+                try:
+                    ready.get_nowait()
+                except queue.Empty:
+                    producer.join(timeout=0.05)
+        if state["error"] is not None:
+            raise state["error"]
+
+        stats = {
+            "chunks": len(chunks),
+            "ttfa_ms": round((state["first"] - started) * 1000, 1) if state["first"] else None,
+            "total_s": round(time.perf_counter() - started, 3),
+            "audio_s": round(state["frames"] / self.sample_rate, 3),
+            "underruns": state["underruns"],
+            "underrun_ms": round(state["underrun_frames"] / self.sample_rate * 1000, 1),
+        }
+        if stats["underruns"]:
+            logger.debug(f"🔊 Поток речи: синтез не успевал {stats['underruns']} раз ({stats['underrun_ms']} мс тишины)")
+        return stats
@@ -0,0 +1,166 @@
+"""
+Прогрев кэша речи (tts_cache.warm_up): постоянные ответы синтезируются
+заранее, и даже первое «Слушаю вас.» звучит из кэша.
+
+- collect_phrases(): все статические response из commands.yaml (skills,
+  meta, smalltalk — по языкам) и встроенные фразы main.py / Executor;
+- SpeechWarmup крутит HybridTTS.render() в фоновом потоке с пониженным
+  приоритетом (nice потока в Linux, SetThreadPriority в Windows), уже
+  закэшированные фразы пропускает;
+- живая речь не ждёт: прогрев синтезирует своим экземпляром модели
+  (HybridTTS.load_private_model, освобождается в конце прогона) и не
+  держит общую блокировку синтеза; перед каждой фразой пережидает busy()
+  (main.py — идёт озвучка или в tts_queue есть ответ). Без своей модели
+  (warm_up_own_model: false или не загрузилась) ответ ждёт не дольше
+  одной короткой фразы прогрева;
+- Silero держит модель одного языка — прогреваются фразы текущего языка
+  TTS; при смене языка оставшиеся фразы другого языка пропускаются;
+- start() при перезагрузке датасета останавливает прошлый прогон и
+  начинает новый.
+
+stats(): фраз всего, синтезировано, уже было в кэше, время прогона.
+"""
+import ctypes
+import os
+import sys
+import threading
+import time
+
+from src.utils import logger
+from .command_index import iter_commands
+from .langid import LANGS, detect_language
+
+_THREAD_PRIORITY_LOWEST = -2
+
+
+def collect_phrases(dataset: dict, extra=()) -> list:
+    """
+    [(text, lang)] без повторов. Ответ — строка или {lang: строка}, как в
+    commands.yaml; lang None — фраза звучит на любом языке (встроенные подсказки).
+    """
+    phrases = []
+
+    def add(response, lang=None):
+        if isinstance(response, dict):
+            for key, value in response.items():
+                if key in LANGS:
+                    add(value, key)
+        elif isinstance(response, str) and response.strip():
+            phrases.append((response.strip(), lang))
+
+    for _, _, cmd in iter_commands(dataset or {}):
+        response = cmd.get("response")
+        add(response, detect_language(response) if isinstance(response, str) else None)
+    for response in extra:
+        add(response)
+    return list(dict.fromkeys(phrases))
+
+
+class SpeechWarmup:
+    def __init__(self, tts, busy=None, nice: int = 10, own_model: bool = True, idle_poll_s: float = 0.1):
+        self.tts = tts
+        self.busy = busy or (lambda: False)
+        self.nice = nice
+        self.own_model = own_model
+        self.idle_poll_s = idle_poll_s
+        self._thread = None
+        self._cancel = threading.Event()
+        self._stats = {}
+
+    @classmethod
+    def from_config(cls, config: dict, tts, busy=None):
+        cache = (config or {}).get("tts_cache", {}) or {}
+        if not cache.get("warm_up", True) or tts.cache is None:
+            return None
+        return cls(tts, busy=busy, nice=cache.get("warm_up_nice", 10),
+                   own_model=cache.get("warm_up_own_model", True))
+
+    def start(self, phrases):
+        """Запускает прогон в фоне (предыдущий, если ещё идёт, останавливается)."""
+        self.stop()
+        if not self.tts.silero_ready:
+            logger.debug("🔥 Прогрев речи пропущен: Silero недоступен")
+            return
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(list(phrases), self._cancel),
+                                        daemon=True, name="TTS-Warmup")
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._cancel.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def _run(self, phrases, cancel: threading.Event):
+        self._lower_priority()
+        lang = self.tts.current_lang
+        todo = [(text, lang) for text, phrase_lang in phrases if phrase_lang in (lang, None)]
+        todo = list(dict.fromkeys(todo))
+        started = time.perf_counter()
+        rendered = cached = skipped = 0
+        render_s = 0.0
+        step = max(1, len(todo) // 4)
+        logger.info(f"🔥 Прогрев речи: {len(todo)} фраз ({lang})")
+        # свой экземпляр модели: живая речь синтезирует параллельно, не дожидаясь фразы прогрева
+        model = None
+        if self.own_model and any(not self.tts.is_cached(text, phrase_lang) for text, phrase_lang in todo):
+            model = self.tts.load_private_model(lang)
+
+        for i, (text, phrase_lang) in enumerate(todo, 1):
+            if cancel.is_set():
+                break
+            if self.tts.current_lang != phrase_lang:
+                # язык TTS сменили — модель уже другая
+                skipped += 1
+                continue
+            if self.tts.is_cached(text, phrase_lang):
+                cached += 1
+                continue
+            while self.busy() and not cancel.is_set():
+                cancel.wait(self.idle_poll_s)
+            if cancel.is_set():
+                break
+            t = time.perf_counter()
+            try:
+                self.tts.render(text, phrase_lang, model=model)
+            except Exception as e:
+                logger.warning(f"⚠️ Прогрев речи: «{text}»: {e}")
+                skipped += 1
+                continue
+            render_s += time.perf_counter() - t
+            rendered += 1
+            if i % step == 0 and i < len(todo):
+                logger.info(f"🔥 Прогрев речи: {i}/{len(todo)}")
+
+        model = None  # отдельная модель больше не нужна — память освобождается
+        self._stats = {
+            "phrases": len(todo),
+            "rendered": rendered,
+            "cached": cached,
+            "skipped": skipped,
+            "render_s": round(render_s, 2),
+            "total_s": round(time.perf_counter() - started, 2),
+            "cancelled": cancel.is_set(),
+        }
+        if not cancel.is_set():
+            logger.info(f"✅ Прогрев речи: синтезировано {rendered}, уже в кэше {cached}, "
+                        f"синтез {render_s:.1f} с (всего {self._stats['total_s']:.1f} с)")
+
+    def _lower_priority(self):
+        # nice отдельного потока — Linux; в Windows — приоритет потока, в macOS — как есть
+        if not self.nice:
+            return
+        if sys.platform == "win32":
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetThreadPriority(kernel32.GetCurrentThread(), _THREAD_PRIORITY_LOWEST)
+            return
+        if not hasattr(os, "setpriority"):
+            return
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), self.nice)
+        except OSError:
+            pass
+
+    def stats(self) -> dict:
+        return dict(self._stats)
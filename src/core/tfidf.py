@@ -0,0 +1,119 @@
+"""
+TF-IDF по символьным триграммам для очень больших наборов паттернов.
+
+Матрица паттерны × триграммы не строится заново: это транспонированный
+индекс триграмм из CommandIndex (CSR-списки id паттернов = CSC-столбцы
+матрицы), поэтому backend «tfidf» включается без дополнительной компиляции
+и работает поверх memory-mapped массивов артефакта.
+
+Вес триграммы g — idf(g) = ln((1 + N) / (1 + df(g))) + 1, векторы паттернов и
+фразы бинарные по набору триграмм и нормированы по L2. Оценка фразы по всем
+паттернам — одно произведение разреженной матрицы (столбцы триграмм фразы)
+на вектор весов.
+"""
+import math
+
+import numpy as np
+from scipy import sparse
+
+from .command_index import Postings, trigrams
+
+
+class TfidfIndex:
+    """Косинусная близость фразы к паттернам по TF-IDF триграмм; top_k() — кандидаты для rapidfuzz."""
+
+    def __init__(self, trigram_index: Postings, base_size: int):
+        self.vocab = trigram_index.vocab
+        self.n_base = base_size
+        # столбцы — триграммы, строки — id паттернов (бинарные веса)
+        offsets = np.asarray(trigram_index.offsets)
+        self.matrix = sparse.csc_matrix(
+            (np.ones(len(trigram_index.ids), dtype=np.float32), np.asarray(trigram_index.ids), offsets),
+            shape=(base_size, len(self.vocab)))
+        self.base_df = np.diff(offsets).astype(np.float64)
+        self.reweight(base_size)
+
+    def reweight(self, n_patterns: int, dead=(), delta: dict = None, grams=None):
+        """
+        Пересчитывает idf и нормы после изменения набора паттернов.
+        dead — удалённые id, delta — триграмма -> id добавленных паттернов (PostingsDelta.added),
+        grams(id) — триграммы паттерна.
+        """
+        self.size = n_patterns
+        self.delta = delta or {}
+        df = self.base_df.copy()
+        self._extra_df = {}
+        for g, ids in self.delta.items():
+            col = self.vocab.get(g)
+            if col is None:
+                self._extra_df[g] = self._extra_df.get(g, 0) + len(ids)
+            else:
+                df[col] += len(ids)
+        for i in dead:
+            for g in grams(i):
+                col = self.vocab.get(g)
+                if col is None:
+                    self._extra_df[g] -= 1
+                else:
+                    df[col] -= 1
+        self._n_live = n_patterns - len(dead)
+        self.idf = np.where(df > 0, np.log((1 + self._n_live) / (1 + np.maximum(df, 0))) + 1, 0.0)
+
+        # нормы строк: sqrt(sum idf^2) по триграммам паттерна
+        norms = np.zeros(n_patterns, dtype=np.float64)
+        norms[:self.n_base] = self.matrix @ (self.idf ** 2)
+        for g, ids in self.delta.items():
+            w = self._weight(g) ** 2
+            for i in ids:
+                norms[i] += w
+        norms[norms == 0] = 1.0
+        self.norms = np.sqrt(norms)
+        self.dead_mask = np.zeros(n_patterns, dtype=bool)
+        self.dead_mask[list(dead)] = True
+
+    def _weight(self, g) -> float:
+        col = self.vocab.get(g)
+        if col is not None:
+            return float(self.idf[col])
+        df = self._extra_df.get(g, 0)
+        return math.log((1 + self._n_live) / (1 + df)) + 1 if df > 0 else 0.0
+
+    def scores(self, normalized: str) -> np.ndarray:
+        """Косинусная близость фразы ко всем паттернам (удалённые — -1)."""
+        grams = set()
+        for t in normalized.split():
+            grams.update(trigrams(t))
+        cols, weights, extra = [], [], []
+        for g in grams:
+            col = self.vocab.get(g)
+            if col is not None and self.idf[col] > 0:
+                cols.append(col)
+                weights.append(self.idf[col])
+            if g in self.delta:
+                extra.append(g)
+        out = np.zeros(self.size, dtype=np.float64)
+        if cols:
+            w = np.asarray(weights)
+            out[:self.n_base] = self.matrix[:, cols] @ (w * w)
+        qnorm = float(np.dot(weights, weights)) if cols else 0.0
+        for g in extra:
+            w = self._weight(g)
+            if self.vocab.get(g) is None:
+                qnorm += w * w
+            for i in self.delta[g]:
+                out[i] += w * w
+        if qnorm == 0:
+            return out
+        out /= self.norms * math.sqrt(qnorm)
+        out[self.dead_mask] = -1.0
+        return out
+
+    def top_k(self, normalized: str, k: int, pool_ids=None):
+        """id до k самых близких паттернов (внутри pool_ids, если задан) с ненулевой близостью."""
+        s = self.scores(normalized)
+        if pool_ids is not None:
+            s = s[pool_ids]
+        nz = np.flatnonzero(s > 0)
+        if len(nz) > k:
+            nz = nz[np.argpartition(-s[nz], k - 1)[:k]]
+        return nz.tolist() if pool_ids is None else pool_ids[nz].tolist()
@@ -1,9 +1,18 @@
-import requests
-import sounddevice as sd
+import contextlib
+import threading
+import time
 from pathlib import Path
 from src.utils import logger
+from .model_fetcher import ModelFetcher
+from .speech_cache import SpeechCache, to_pcm16
+from .speech_stream import SpeechStream, split_chunks
 
 # --- Опциональные импорты ---
+try:
+    import sounddevice as sd
+except (ImportError, OSError):  # нет PortAudio (headless CI) — воспроизведение недоступно
+    sd = None
+
 try:
     import soundfile as sf
 except ImportError:
@@ -44,6 +53,19 @@ class HybridTTS:
         self.models_dir = Path("data/models/tts")
         self.models_dir.mkdir(parents=True, exist_ok=True)
         self.media_dir = Path("data/media/audios")
+        # синтезированные фразы: постоянные ответы озвучиваются без повторного синтеза
+        self.cache = SpeechCache.from_config(self.config)
+        self.last_synthesis_ms = None
+        # модель Silero не потокобезопасна: синтез на self.model идёт по очереди
+        # (у прогрева — своя модель, см. load_private_model)
+        self._synth_lock = threading.Lock()
+        # длинные ответы: синтез следующего предложения, пока звучит текущее
+        silero = self.config.get("silero", {}) or {}
+        self.streaming = silero.get("streaming", True)
+        self.stream_first_chars = silero.get("stream_first_chars", 80)
+        self.stream_max_chars = silero.get("stream_max_chars", 250)
+        self.stream_prefetch = silero.get("stream_prefetch", 2)
+        self.last_stream_stats = None
 
         # Поддерживаемые языки
         self.supported_langs = {
@@ -95,38 +117,50 @@ class HybridTTS:
     def _ensure_models_exist(self):
         """Проверяет и скачивает Silero модели при необходимости"""
         base_url = "https://models.silero.ai/models/tts"
-        for lang, model_name in self.supported_langs.items():
-            model_path = self.models_dir / f"{model_name}.pt"
-            if not model_path.exists():
-                self.logger.info(f"Скачиваю Silero модель ({model_name}) для {lang.upper()}...")                
-                try:
-                    url = f"{base_url}/{lang}/{model_name}.pt"
-                    r = requests.get(url, stream=True, timeout=20)
-                    with open(model_path, "wb") as f:
-                        f.write(r.content)
-                    self.logger.info(f"Модель {model_name} установлена.")                
-                except Exception as e:
-                    self.logger.warning(f"Ошибка скачивания {model_name}: {e}")
+        fetcher = ModelFetcher.from_config(self.config)
+        specs = [fetcher.spec(f"{base_url}/{lang}/{model_name}.pt", self.models_dir / f"{model_name}.pt")
+                 for lang, model_name in self.supported_langs.items()
+                 if not (self.models_dir / f"{model_name}.pt").exists()]
+        if specs:
+            self.logger.info(f"Скачиваю Silero модели: {', '.join(spec.dest.stem for spec in specs)}...")
+            fetcher.fetch_all(specs)
+
+    def _hub_model(self, lang: str):
+        model_name = self.supported_langs.get(lang, "v3_1_ru")
+        model, _ = torch.hub.load(
+            repo_or_dir="snakers4/silero-models",
+            model="silero_tts",
+            language=lang,
+            speaker=model_name,
+        )
+        model.to(self.device)
+        return model
 
     def _load_model(self, lang: str):
         """Загружает модель Silero для нужного языка"""
         if torch is None:
             return
         try:
-            model_name = self.supported_langs.get(lang, "v3_1_ru")
-            self.model, _ = torch.hub.load(
-                repo_or_dir="snakers4/silero-models",
-                model="silero_tts",
-                language=lang,
-                speaker=model_name,
-            )
-            self.model.to(self.device)
+            self.model = self._hub_model(lang)
             self.logger.info(f"Silero TTS загружен для языка {lang.upper()}.")        
         except Exception as e:
             self.logger.warning(f"Ошибка загрузки Silero ({lang}): {e}")            
             self.model = None
             self.current_engine = "pyttsx3"
 
+    def load_private_model(self, lang: str = None):
+        """
+        Отдельный экземпляр модели Silero (для прогрева): render(model=...) с ним
+        не берёт _synth_lock, и живая речь не ждёт фонового синтеза. None — не загрузилась.
+        """
+        if not self.silero_ready:
+            return None
+        try:
+            return self._hub_model(lang or self.current_lang)
+        except Exception as e:
+            self.logger.warning(f"Отдельная модель Silero не загрузилась ({e})")
+            return None
+
     # ----------------------------- #
     # 🔹 Speech & Playback
     # ----------------------------- #
@@ -142,19 +176,18 @@ class HybridTTS:
         engine = engine or self.current_engine
 
         # Silero
-        if engine == "silero" and self.model and torch is not None:
+        if engine == "silero" and self.silero_ready:
             try:
-                if speaker not in self.silero_speakers.get(lang, []):
-                    speaker = self.silero_speakers[lang][0]
+                speaker = self._silero_speaker(lang, speaker)
                 self.logger.info(f"[SILERO] [{lang}:{speaker}] {text}")
-                audio = self.model.apply_tts(
-                    text=text,
-                    speaker=speaker,
-                    sample_rate=self.config.get("silero", {}).get("sample_rate", 48000),
-                    put_accent=True,
-                    put_yo=True,
-                )
-                sd.play(audio, self.config.get("silero", {}).get("sample_rate", 48000))
+                # фраза целиком в кэше (прогрев, постоянные ответы) — звучит сразу, без потока
+                if self.streaming and sd is not None and not self.is_cached(text, lang, speaker):
+                    chunks = self.stream_chunks(text)
+                    if len(chunks) > 1:
+                        self.last_stream_stats = self.play_chunks(chunks, lang, speaker)
+                        return
+                audio = self.render(text, lang, speaker)
+                sd.play(audio, self.sample_rate)
                 sd.wait()
                 return
             except Exception as e:
@@ -174,6 +207,83 @@ class HybridTTS:
         elif not self.engine:
             print(f"💭 {text}")
 
+    @property
+    def sample_rate(self) -> int:
+        return self.config.get("silero", {}).get("sample_rate", 48000)
+
+    def _silero_speaker(self, lang: str, speaker: str) -> str:
+        if speaker not in self.silero_speakers.get(lang, []):
+            speaker = self.silero_speakers[lang][0]
+        return speaker
+
+    @property
+    def silero_ready(self) -> bool:
+        return bool(self.model) and torch is not None
+
+    def _cache_key(self, text: str, lang: str, speaker: str):
+        if self.cache is None:
+            return None
+        return self.cache.key(text, lang, speaker, "silero", self.sample_rate)
+
+    def is_cached(self, text: str, lang: str = None, speaker: str = None) -> bool:
+        lang = lang or self.current_lang
+        key = self._cache_key(text, lang, self._silero_speaker(lang, speaker or self.current_speaker))
+        return key is not None and key in self.cache
+
+    def render(self, text: str, lang: str = None, speaker: str = None, model=None):
+        """
+        PCM int16 фразы голосом Silero: из кэша (memmap с диска или память) или
+        синтезом с записью в кэш. None — Silero недоступен.
+        model — свой экземпляр модели (load_private_model): синтез без общей блокировки.
+        """
+        if not self.silero_ready:
+            return None
+        lang = lang or self.current_lang
+        speaker = self._silero_speaker(lang, speaker or self.current_speaker)
+        t = time.perf_counter()
+        key = self._cache_key(text, lang, speaker)
+        audio = self.cache.get(key) if key is not None else None
+        cached = audio is not None
+        if not cached:
+            with self._synth_lock if model is None else contextlib.nullcontext():
+                # пока ждали блокировку, фразу мог синтезировать прогрев
+                if key is not None and key in self.cache:
+                    audio = self.cache.get(key)
+                if audio is None:
+                    audio = (model or self.model).apply_tts(
+                        text=text,
+                        speaker=speaker,
+                        sample_rate=self.sample_rate,
+                        put_accent=True,
+                        put_yo=True,
+                    )
+                    audio = self.cache.put(key, audio) if key is not None else to_pcm16(audio)
+                else:
+                    cached = True
+        self.last_synthesis_ms = (time.perf_counter() - t) * 1000
+        self.logger.debug(f"[SILERO] {'кэш' if cached else 'синтез'}: {self.last_synthesis_ms:.1f} мс")
+        return audio
+
+    def stream_chunks(self, text: str) -> list:
+        return split_chunks(text, max_chars=self.stream_max_chars, first_max_chars=self.stream_first_chars)
+
+    def play_chunks(self, chunks, lang: str = None, speaker: str = None, output=None) -> dict:
+        """
+        Проигрывает куски текста одним непрерывным OutputStream, синтезируя
+        следующий, пока звучит текущий. output — фабрика потока (по умолчанию
+        sd.OutputStream). Возвращает SpeechStream.play() stats.
+        """
+        output = output or (sd.OutputStream if sd is not None else None)
+        if output is None:
+            raise RuntimeError("sounddevice недоступен")
+        lang = lang or self.current_lang
+        speaker = self._silero_speaker(lang, speaker or self.current_speaker)
+        stream = SpeechStream(lambda chunk: self.render(chunk, lang, speaker), self.sample_rate, output,
+                              prefetch=self.stream_prefetch)
+        stats = stream.play(chunks)
+        self.logger.debug(f"[SILERO] поток: {stats['chunks']} кусков, первый звук через {stats['ttfa_ms']} мс")
+        return stats
+
     def play_audio_file(self, file_path: Path):
         """Проигрывает WAV-файл."""
         if not file_path.exists():
@@ -0,0 +1,193 @@
+"""
+Детектор конца фразы (VAD-endpointer) по энергии и частоте переходов через ноль.
+
+Работает на живом потоке PCM int16: feed() принимает блоки любой длины и
+возвращает закрытые сегменты речи (np.int16), как только после речи прошло
+hangover_ms тишины или сегмент достиг max_utterance_ms.
+
+- кадр — речь, если его RMS выше max(min_rms, шум * energy_ratio), а ZCR
+  ниже zcr_max (шипение/щелчки с высоким ZCR речью не считаются);
+- уровень шума (NoiseFloor) — скользящее среднее RMS тихих кадров вне
+  фразы; начальный уровень — min_rms / energy_ratio, а не первый кадр:
+  поток может начаться посреди фразы. Чтобы постоянный фон громче min_rms
+  (гул, вентилятор) не считался речью вечно, уровень поднимается до
+  минимума RMS за noise_window_ms: в речи всегда есть паузы, у гула — нет;
+- при закрытии фраза проверяется по уже уточнённому порогу: «фраза» из
+  одного гула (до того, как уровень шума его догнал) отбрасывается;
+- внутри сегмента действует гистерезис: речь продолжается, пока энергия выше
+  половины порога (тихие окончания слов, глухие согласные);
+- pre_roll_ms аудио до срабатывания добавляется в начало сегмента,
+  хвост тишины обрезается до tail_ms.
+"""
+from collections import deque
+
+import numpy as np
+
+
+class NoiseFloor:
+    """
+    Уровень фонового шума по RMS кадров: EMA тихих кадров (может только
+    снижаться к фону) и минимум за скользящее окно window кадров (поднимает
+    уровень, если фон постоянно громче).
+    """
+
+    def __init__(self, initial: float, window: int, alpha: float = 0.05):
+        self.level = float(initial)
+        self.window = max(1, int(window))
+        self.alpha = alpha
+        self._mins = deque()       # (номер кадра, rms) с возрастающим rms — минимум окна слева
+        self._count = 0
+
+    def update(self, rms: float, quiet: bool):
+        """rms кадра; quiet — кадр точно не речь (ниже порога и вне фразы)."""
+        self._count += 1
+        while self._mins and self._mins[-1][1] >= rms:
+            self._mins.pop()
+        self._mins.append((self._count, rms))
+        if self._mins[0][0] <= self._count - self.window:
+            self._mins.popleft()
+        if quiet:
+            self.level += self.alpha * (rms - self.level)
+        if self._count >= self.window and self._mins[0][1] > self.level:
+            # весь последний window фон не опускался ниже — это и есть шум
+            self.level = self._mins[0][1]
+
+
+class Endpointer:
+    def __init__(self, sample_rate: int = 16000, frame_ms: int = 30, start_ms: int = 90, hangover_ms: int = 500,
+                 max_utterance_ms: int = 10000, pre_roll_ms: int = 300, tail_ms: int = 150, min_speech_ms: int = 200,
+                 energy_ratio: float = 3.0, min_rms: float = 150.0, zcr_max: float = 0.35,
+                 noise_window_ms: int = 3000):
+        self.sample_rate = sample_rate
+        self.frame = max(1, sample_rate * frame_ms // 1000)
+        self.frame_ms = frame_ms
+        self.start_frames = max(1, start_ms // frame_ms)
+        self.hangover_frames = max(1, hangover_ms // frame_ms)
+        self.max_frames = max(1, max_utterance_ms // frame_ms)
+        self.tail_frames = tail_ms // frame_ms
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.energy_ratio = energy_ratio
+        self.min_rms = min_rms
+        self.zcr_max = zcr_max
+
+        self.floor = NoiseFloor(min_rms / energy_ratio if energy_ratio else 0.0, noise_window_ms // frame_ms)
+        self._pre_roll = deque(maxlen=max(1, pre_roll_ms // frame_ms))
+        self._rest = np.zeros(0, dtype=np.int16)
+        self.reset()
+
+    @classmethod
+    def from_config(cls, config: dict, sample_rate: int = 16000):
+        vad = (config or {}).get("vad", {}) or {}
+        return cls(
+            sample_rate=sample_rate,
+            frame_ms=vad.get("frame_ms", 30),
+            start_ms=vad.get("start_ms", 90),
+            hangover_ms=vad.get("hangover_ms", 500),
+            max_utterance_ms=int(vad.get("max_utterance_s", 10) * 1000),
+            pre_roll_ms=vad.get("pre_roll_ms", 300),
+            tail_ms=vad.get("tail_ms", 150),
+            min_speech_ms=vad.get("min_speech_ms", 200),
+            energy_ratio=vad.get("energy_ratio", 3.0),
+            min_rms=vad.get("min_rms", 150.0),
+            zcr_max=vad.get("zcr_max", 0.35),
+            noise_window_ms=vad.get("noise_window_ms", 3000),
+        )
+
+    def reset(self):
+        """Сбрасывает текущий сегмент (уровень шума сохраняется)."""
+        self.in_speech = False
+        self._segment = []
+        self._energy = []
+        self._run = 0
+        self._silence = 0
+        self._voiced = 0
+        self._pre_roll.clear()
+        self._rest = np.zeros(0, dtype=np.int16)
+
+    @property
+    def noise(self) -> float:
+        return self.floor.level
+
+    @property
+    def threshold(self) -> float:
+        return max(self.min_rms, self.floor.level * self.energy_ratio)
+
+    @property
+    def segment_ms(self) -> int:
+        """Длина текущего (ещё не закрытого) сегмента."""
+        return len(self._segment) * self.frame_ms
+
+    def _features(self, frames: np.ndarray):
+        x = frames.astype(np.float32)
+        rms = np.sqrt(np.mean(x * x, axis=1))
+        signs = np.signbit(frames)
+        zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+        return rms, zcr
+
+    def feed(self, pcm) -> list:
+        """Добавляет PCM (bytes, memoryview или np.int16) и возвращает список закрытых сегментов."""
+        data = np.frombuffer(pcm, dtype=np.int16) if isinstance(pcm, (bytes, bytearray, memoryview)) else pcm
+        # всегда копия: блоки AudioCapture — представления кольца, а кадры живут в сегменте дольше
+        data = np.concatenate((self._rest, data))
+        n = len(data) // self.frame
+        self._rest = data[n * self.frame:].copy()
+        if not n:
+            return []
+        frames = data[:n * self.frame].reshape(n, self.frame)
+        rms, zcr = self._features(frames)
+
+        segments = []
+        for frame, e, z in zip(frames, rms, zcr):
+            e = float(e)
+            threshold = self.threshold
+            speech = e > threshold and z < self.zcr_max
+            # EMA — только по тихим кадрам вне фразы (громкий кадр с высоким ZCR — не фон);
+            # минимум окна считается по всем кадрам, и внутри фразы тоже
+            self.floor.update(e, quiet=not self.in_speech and e <= threshold)
+
+            if not self.in_speech:
+                self._run = self._run + 1 if speech else 0
+                self._pre_roll.append((frame, e))
+                if self._run >= self.start_frames:
+                    self.in_speech = True
+                    self._segment = [f for f, _ in self._pre_roll]
+                    self._energy = [fe for _, fe in self._pre_roll]
+                    self._pre_roll.clear()
+                    self._voiced = self._run
+                    self._silence = 0
+                continue
+
+            self._segment.append(frame)
+            self._energy.append(e)
+            if speech or e > threshold * 0.5:
+                self._silence = 0
+                self._voiced += 1
+            else:
+                self._silence += 1
+            if self._silence >= self.hangover_frames or len(self._segment) >= self.max_frames:
+                segment = self._close()
+                if segment is not None:
+                    segments.append(segment)
+        return segments
+
+    def flush(self):
+        """Закрывает текущий сегмент (например, по таймауту). None — если речи не было."""
+        return self._close() if self.in_speech else None
+
+    def _close(self):
+        frames = self._segment
+        if self._silence > self.tail_frames:
+            frames = frames[:len(frames) - (self._silence - self.tail_frames)]
+        voiced = self._voiced
+        # по порогу на момент закрытия: пока фраза шла, уровень шума мог подняться до гула
+        threshold = self.threshold
+        loud = sum(e > threshold for e in self._energy)
+        self.in_speech = False
+        self._segment = []
+        self._energy = []
+        self._run = 0
+        self._silence = 0
+        self._voiced = 0
+        if voiced < self.min_speech_frames or loud < self.min_speech_frames or not frames:
+            return None
+        return np.concatenate(frames)
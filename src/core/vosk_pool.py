@@ -0,0 +1,148 @@
+"""
+Ленивый пул моделей Vosk по языкам.
+
+Модель языка загружается при первом обращении (get) и держится в памяти,
+пока не будет вытеснена: резидентных моделей не больше max_models, при
+превышении выгружается давно не использованная (LRU). prewarm() подгружает
+языки в фоне, но только в свободные места — уже загруженные не вытесняет.
+Время загрузки пишется в лог. Кто взял саму модель (model(), например
+поиск wake-word), подписывается на выгрузку (add_evict_listener) и
+отпускает её — иначе модель остаётся в памяти сверх max_models.
+
+С грамматикой команд (set_grammar) get() отдаёт GrammarRecognizer той же
+модели; при смене грамматики распознаватели загруженных моделей
+пересоздаются, сами модели не перезагружаются.
+"""
+import threading
+import time
+from pathlib import Path
+
+from vosk import Model, KaldiRecognizer
+
+from src.utils import logger
+from src.utils.cache import LRUCache
+from .grammar import GrammarRecognizer
+
+
+class VoskModelPool:
+    def __init__(self, paths: dict, sample_rate: int = 16000, max_models: int = 1):
+        self.paths = {lang: Path(p) for lang, p in paths.items()}
+        self.sample_rate = sample_rate
+        self._models = LRUCache(max(1, int(max_models)), on_evict=self._on_evict)
+        self._load_lock = threading.Lock()
+        self.grammar = None
+        self._evict_listeners = []
+        self.loads = 0
+        self.load_seconds = 0.0
+
+    @property
+    def max_models(self) -> int:
+        return self._models.maxsize
+
+    def available(self, lang: str) -> bool:
+        path = self.paths.get(lang)
+        return path is not None and path.exists()
+
+    def loaded(self) -> list:
+        """Загруженные языки, от давно использованного к последнему."""
+        return self._models.keys()
+
+    def get(self, lang: str):
+        """KaldiRecognizer языка (загружает модель при первом обращении). None — если модели нет на диске."""
+        entry = self._models.get(lang)
+        if entry is not None:
+            return entry["recognizer"]
+        if not self.available(lang):
+            return None
+        with self._load_lock:
+            # модель могла загрузиться в другом потоке, пока ждали блокировку
+            entry = self._models.peek(lang)
+            if entry is None:
+                entry = self._load(lang)
+            self._models.put(lang, entry)
+        return entry["recognizer"]
+
+    def model(self, lang: str):
+        """
+        Модель Vosk языка (для своих распознавателей, например wake-word). None — если модели нет.
+        Ссылку нужно отпустить при выгрузке языка (add_evict_listener).
+        """
+        if self.get(lang) is None:
+            return None
+        entry = self._models.peek(lang)
+        return entry["model"] if entry else None
+
+    def _load(self, lang: str) -> dict:
+        t = time.perf_counter()
+        model = Model(str(self.paths[lang]))
+        recognizer = self._recognizer(lang, model)
+        elapsed = time.perf_counter() - t
+        self.loads += 1
+        self.load_seconds += elapsed
+        logger.info(f"📦 Модель Vosk {lang.upper()} загружена за {elapsed:.2f} с")
+        return {"model": model, "recognizer": recognizer, "loaded_at": time.monotonic()}
+
+    def _recognizer(self, lang: str, model):
+        grammar = self.grammar.for_language(lang) if self.grammar is not None else None
+        if grammar is None:
+            return KaldiRecognizer(model, self.sample_rate)
+        return GrammarRecognizer(model, self.sample_rate, *grammar)
+
+    def set_grammar(self, grammar):
+        """Новая грамматика команд (None — открытый словарь) для загруженных и будущих моделей."""
+        with self._load_lock:
+            self.grammar = grammar
+            for lang in self._models.keys():
+                entry = self._models.peek(lang)
+                if entry:
+                    entry["recognizer"] = self._recognizer(lang, entry["model"])
+
+    def reset(self):
+        """Сбрасывает начатую фразу у распознавателей загруженных моделей."""
+        for lang in self._models.keys():
+            entry = self._models.peek(lang)
+            if entry:
+                entry["recognizer"].Reset()
+
+    def add_evict_listener(self, callback):
+        """callback(lang) после выгрузки модели языка."""
+        self._evict_listeners.append(callback)
+
+    def _on_evict(self, lang: str, entry: dict):
+        resident = time.monotonic() - entry["loaded_at"]
+        # освобождаем нативные ресурсы сразу, не дожидаясь сборщика
+        entry.clear()
+        for callback in self._evict_listeners:
+            callback(lang)
+        logger.info(f"♻️ Модель Vosk {lang.upper()} выгружена (была в памяти {resident:.0f} с, лимит {self.max_models})")
+
+    def prewarm(self, langs) -> threading.Thread:
+        """Фоновая загрузка языков в свободные места пула."""
+        def run():
+            for lang in langs:
+                if lang in self._models or not self.available(lang):
+                    continue
+                if len(self._models) >= self.max_models:
+                    logger.debug(f"📦 Прогрев Vosk {lang.upper()} пропущен: пул заполнен ({self.max_models})")
+                    break
+                self.get(lang)
+
+        thread = threading.Thread(target=run, daemon=True, name="Vosk-Prewarm")
+        thread.start()
+        return thread
+
+    def load_async(self, lang: str) -> threading.Thread:
+        """Фоновая загрузка языка, даже если для этого придётся вытеснить другой."""
+        thread = threading.Thread(target=self.get, args=(lang,), daemon=True, name=f"Vosk-Load-{lang}")
+        thread.start()
+        return thread
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self.loaded(),
+            "max_models": self.max_models,
+            "loads": self.loads,
+            "load_seconds": round(self.load_seconds, 2),
+            "evictions": self._models.evictions,
+            "grammar": self.grammar.stats() if self.grammar is not None else None,
+        }
@@ -0,0 +1,260 @@
+"""
+Декодирование Vosk в отдельном процессе (vosk.out_of_process: true).
+
+AcceptWaveform в основном процессе делит GIL с TTS, матчером и навыками —
+под нагрузкой распознавание начинает отставать. VoskWorker выносит его в
+процесс-декодер:
+
+- PCM передаётся через кольцо в multiprocessing.shared_memory: заголовок
+  [write_seq, read_seq], длины слотов и слоты int16 по блоку захвата.
+  Основной процесс пишет слот и увеличивает write_seq, декодер читает и
+  сдвигает read_seq; о новых данных сообщает multiprocessing.Event;
+- результаты (текст на каждой границе фразы, в том числе пустой) приходят
+  обратно по Pipe;
+- грамматика команд (set_grammar) передаётся по Pipe, декодер строит
+  GrammarRecognizer у себя — откат на открытый словарь тоже в его процессе;
+- reset() (после озвучки ответа) — декодер пропускает непрочитанное кольцо
+  и сбрасывает распознаватель; результаты, пришедшие до сброса, отбрасываются
+  по номеру эпохи;
+- если процесс упал, ensure_alive() перезапускает его (не больше
+  max_restarts раз подряд — дальше вызывающий переходит на декодирование
+  в своём процессе).
+
+Отставание декодера — write_seq - read_seq блоков (lag_ms()).
+"""
+import json
+import multiprocessing as mp
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from src.utils import logger
+
+_HEADER = 2          # write_seq, read_seq (int64)
+
+
+def _ring_views(buf, slots: int, width: int):
+    header = np.ndarray((_HEADER,), dtype=np.int64, buffer=buf)
+    lengths = np.ndarray((slots,), dtype=np.int64, buffer=buf, offset=_HEADER * 8)
+    data = np.ndarray((slots, width), dtype=np.int16, buffer=buf, offset=(_HEADER + slots) * 8)
+    return header, lengths, data
+
+
+def _ring_size(slots: int, width: int) -> int:
+    return (_HEADER + slots) * 8 + slots * width * 2
+
+
+def _worker_main(shm_name: str, slots: int, width: int, ready, conn, model_path: str, sample_rate: int,
+                 grammar=None, epoch: int = 0):
+    """Процесс-декодер: читает кольцо, отдаёт тексты по conn."""
+    from vosk import Model, KaldiRecognizer, SetLogLevel
+    from src.core.grammar import GrammarRecognizer
+
+    SetLogLevel(-1)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    header, lengths, data = _ring_views(shm.buf, slots, width)
+
+    def make(model, grammar):
+        if grammar is None:
+            return KaldiRecognizer(model, sample_rate)
+        return GrammarRecognizer(model, sample_rate, *grammar)
+
+    def load(path, grammar):
+        t = time.perf_counter()
+        model = Model(path)
+        rec = make(model, grammar)
+        conn.send(("ready", path, time.perf_counter() - t))
+        return model, rec
+
+    model, recognizer = load(model_path, grammar)
+    # аудио, записанное пока грузилась модель (или до перезапуска), устарело — начинаем с текущего блока
+    cursor = int(header[0])
+    header[1] = cursor
+    try:
+        while True:
+            while conn.poll():
+                cmd = conn.recv()
+                if cmd[0] == "stop":
+                    return
+                if cmd[0] == "model":
+                    model, recognizer = load(cmd[1], cmd[2])
+                if cmd[0] == "grammar":
+                    recognizer = make(model, cmd[1])
+                if cmd[0] == "reset":
+                    epoch = cmd[1]
+                    cursor = int(header[0])
+                    header[1] = cursor
+                    recognizer.Reset()
+            if not ready.wait(0.1):
+                continue
+            ready.clear()
+            # после clear() читаем write_seq заново — блок, записанный между wait и clear, не потеряется
+            while cursor < int(header[0]):
+                head = int(header[0])
+                if head - cursor > slots:
+                    cursor = head - slots
+                slot = cursor % slots
+                pcm = data[slot, :lengths[slot]].tobytes()
+                cursor += 1
+                header[1] = cursor
+                if recognizer.AcceptWaveform(pcm):
+                    text = json.loads(recognizer.Result()).get("text", "").strip()
+                    conn.send(("result", text, epoch))
+    finally:
+        del header, lengths, data
+        shm.close()
+
+
+class VoskWorker:
+    def __init__(self, model_path, sample_rate: int = 16000, block_size: int = 1600, slots: int = 64,
+                 max_restarts: int = 3, grammar=None):
+        self.model_path = str(model_path)
+        self.grammar = grammar
+        self.sample_rate = sample_rate
+        self.width = block_size
+        self.slots = slots
+        self.max_restarts = max_restarts
+        self.block_ms = block_size * 1000 / sample_rate
+
+        self._shm = shared_memory.SharedMemory(create=True, size=_ring_size(slots, block_size))
+        self._header, self._lengths, self._data = _ring_views(self._shm.buf, slots, block_size)
+        self._header[:] = 0
+        self._ready = mp.Event()
+        self._conn = None
+        self._proc = None
+        self.loaded = False
+        self.restarts = 0
+        self._failed_in_row = 0
+        self.overruns = 0
+        self.results = 0
+        self.epoch = 0
+        self.stale_results = 0
+        self._start()
+
+    # --- процесс ---
+    def _start(self):
+        parent, child = mp.Pipe()
+        self._conn = parent
+        self.loaded = False
+        self._proc = mp.Process(
+            target=_worker_main, name="Vosk-Worker", daemon=True,
+            args=(self._shm.name, self.slots, self.width, self._ready, child, self.model_path, self.sample_rate,
+                  self.grammar, self.epoch),
+        )
+        self._proc.start()
+        child.close()
+
+    @property
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.is_alive()
+
+    def ensure_alive(self) -> bool:
+        """Перезапускает упавший декодер. False — лимит перезапусков исчерпан."""
+        if self.alive:
+            return True
+        if self._proc is None or self._failed_in_row >= self.max_restarts:
+            return False
+        code = self._proc.exitcode
+        self.restarts += 1
+        self._failed_in_row += 1
+        logger.warning(f"⚠️ Процесс Vosk завершился (код {code}) — перезапуск {self._failed_in_row}/{self.max_restarts}")
+        self._conn.close()
+        self._start()
+        return True
+
+    def set_model(self, model_path, grammar=None):
+        """Другой язык: декодер загружает модель у себя. grammar — (фразы, свободный текст) для этого языка."""
+        self.model_path = str(model_path)
+        self.grammar = grammar
+        if self.alive:
+            self.loaded = False
+            self._conn.send(("model", self.model_path, grammar))
+
+    def set_grammar(self, grammar):
+        """Новая грамматика для текущей модели (None — открытый словарь)."""
+        self.grammar = grammar
+        if self.alive:
+            self._conn.send(("grammar", grammar))
+
+    def reset(self):
+        """Забыть непрочитанное аудио и начатую фразу (например, собственный голос после озвучки)."""
+        self.epoch += 1
+        if self.alive:
+            self._conn.send(("reset", self.epoch))
+
+    def wait_ready(self, timeout: float = 60.0) -> bool:
+        """Ждёт загрузки модели в процессе-декодере (результаты, пришедшие за это время, отбрасываются)."""
+        deadline = time.monotonic() + timeout
+        while not self.loaded and self.alive and time.monotonic() < deadline:
+            self.result(timeout=0.1)
+        return self.loaded
+
+    # --- данные ---
+    def write(self, block):
+        """Кладёт блок PCM int16 (bytes / memoryview) в кольцо и будит декодер."""
+        pcm = np.frombuffer(block, dtype=np.int16)[:self.width]
+        head = int(self._header[0])
+        if head - int(self._header[1]) >= self.slots:
+            # декодер не успевает — самый старый блок перезаписывается
+            self.overruns += 1
+        slot = head % self.slots
+        self._data[slot, :len(pcm)] = pcm
+        self._lengths[slot] = len(pcm)
+        self._header[0] = head + 1
+        self._ready.set()
+
+    def result(self, timeout: float = 0.0):
+        """Текст очередной фразы ("" — граница без речи) или None, если за timeout ничего не пришло."""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                if not self._conn.poll(max(0.0, deadline - time.monotonic())):
+                    return None
+                msg = self._conn.recv()
+            except (EOFError, OSError):
+                return None
+            if msg[0] == "ready":
+                self.loaded = True
+                self._failed_in_row = 0
+                logger.info(f"📦 Процесс Vosk: модель {msg[1]} загружена за {msg[2]:.2f} с")
+                continue
+            if msg[2] != self.epoch:
+                # распознано до reset() — устаревший текст
+                self.stale_results += 1
+                continue
+            self.results += 1
+            return msg[1]
+
+    def lag_blocks(self) -> int:
+        return min(self.slots, int(self._header[0]) - int(self._header[1]))
+
+    def lag_ms(self) -> float:
+        return self.lag_blocks() * self.block_ms
+
+    def stats(self) -> dict:
+        return {
+            "alive": self.alive,
+            "restarts": self.restarts,
+            "lag_blocks": self.lag_blocks(),
+            "lag_ms": round(self.lag_ms(), 1),
+            "overruns": self.overruns,
+            "results": self.results,
+            "stale_results": self.stale_results,
+        }
+
+    def stop(self):
+        if self.alive:
+            try:
+                self._conn.send(("stop",))
+            except (BrokenPipeError, OSError):
+                pass
+            self._proc.join(timeout=2)
+            if self._proc.is_alive():
+                self._proc.terminate()
+        self._proc = None
+        if self._conn is not None:
+            self._conn.close()
+        del self._header, self._lengths, self._data
+        self._shm.close()
+        self._shm.unlink()
@@ -0,0 +1,160 @@
+"""
+Дешёвая первая ступень распознавания: пока ассистент не активен, ищется
+только wake-word (wake_gate.enabled: true).
+
+- энергетический шлюз: блоки тише max(min_rms, шум * energy_ratio) или с
+  высоким ZCR (шипение) в Vosk не попадают вовсе — в тихой комнате декодер
+  почти не работает; уровень шума — NoiseFloor, как у Endpointer: постоянный
+  фон (гул, вентилятор) через noise_window_ms сам становится «тишиной»;
+- Vosk с грамматикой только из wake-words текущего языка и "[unk]":
+  граф крошечный, декодирование в разы дешевле открытого словаря;
+- слово ищется уже в частичном результате — не ждём конца фразы;
+- utterance_blocks — сколько блоков назад началась фраза (с pre-roll):
+  полное распознавание перечитывает её из кольца AudioCapture целиком,
+  «джарвис, включи музыку» не теряет команду после wake-word; фраза длиннее
+  max_utterance_blocks (не больше кольца) закрывается принудительно.
+
+stats(): блоки, сколько из них декодировано, срабатывания.
+"""
+import json
+from collections import deque
+
+import numpy as np
+
+from .grammar import UNK, clean_phrase
+from .langid import detect_language
+from .vad import NoiseFloor
+
+
+def wake_words_for(config: dict, lang: str) -> list:
+    """Wake-words языка из config.yaml (wake_words.<lang> и старое wake_word); если их нет — все."""
+    config = config or {}
+    by_lang = config.get("wake_words", {}) or {}
+    all_words, words = [], []
+    if isinstance(by_lang, dict):
+        for key, value in by_lang.items():
+            value = value if isinstance(value, (list, tuple)) else [value]
+            all_words.extend(value)
+            if key == lang:
+                words.extend(value)
+    else:
+        all_words.extend(by_lang)
+    single = config.get("wake_word")
+    if single:
+        all_words.append(single)
+        if detect_language(str(single)) in (lang, None):
+            words.append(single)
+    words = words or all_words
+    return sorted({clean_phrase(w) for w in words} - {""}, key=len, reverse=True)
+
+
+class WakeSpotter:
+    def __init__(self, model, words, sample_rate: int = 16000, block_ms: int = 100, hangover_ms: int = 400,
+                 pre_roll_ms: int = 300, energy_ratio: float = 3.0, min_rms: float = 150.0, zcr_max: float = 0.35,
+                 noise_window_ms: int = 3000, max_utterance_blocks: int = 100):
+        from vosk import KaldiRecognizer
+
+        self.words = list(words)
+        self.recognizer = KaldiRecognizer(model, sample_rate, json.dumps(self.words + [UNK], ensure_ascii=False))
+        self.energy_ratio = energy_ratio
+        self.min_rms = min_rms
+        self.zcr_max = zcr_max
+        self.max_utterance_blocks = max(1, int(max_utterance_blocks))
+        self.hangover_blocks = max(1, hangover_ms // block_ms)
+        self._pre_roll = deque(maxlen=max(0, min(pre_roll_ms // block_ms, self.max_utterance_blocks - 1)))
+        # не первый блок: поток может начаться посреди фразы (как у Endpointer)
+        self.floor = NoiseFloor(min_rms / energy_ratio if energy_ratio else 0.0, noise_window_ms // block_ms)
+        self._open = False
+        self._quiet = 0
+        self.utterance_blocks = 0
+        self.blocks = 0
+        self.decoded = 0
+        self.hits = 0
+
+    @classmethod
+    def from_config(cls, config: dict, model, lang: str, sample_rate: int = 16000, block_ms: int = 100,
+                    ring_blocks: int = None):
+        """ring_blocks — ёмкость кольца AudioCapture: дальше него фразу уже не перечитать."""
+        config = config or {}
+        gate = config.get("wake_gate", {}) or {}
+        vad = config.get("vad", {}) or {}
+        max_blocks = int(vad.get("max_utterance_s", 10) * 1000 // block_ms)
+        if ring_blocks:
+            max_blocks = min(max_blocks, ring_blocks - 1)
+        return cls(
+            model, wake_words_for(config, lang), sample_rate=sample_rate, block_ms=block_ms,
+            hangover_ms=gate.get("hangover_ms", 400),
+            pre_roll_ms=gate.get("pre_roll_ms", vad.get("pre_roll_ms", 300)),
+            energy_ratio=gate.get("energy_ratio", vad.get("energy_ratio", 3.0)),
+            min_rms=gate.get("min_rms", vad.get("min_rms", 150.0)),
+            zcr_max=gate.get("zcr_max", vad.get("zcr_max", 0.35)),
+            noise_window_ms=gate.get("noise_window_ms", vad.get("noise_window_ms", 3000)),
+            max_utterance_blocks=max_blocks,
+        )
+
+    def feed(self, block):
+        """Блок PCM int16. Возвращает найденное wake-word или None."""
+        self.blocks += 1
+        samples = np.frombuffer(block, dtype=np.int16)
+        pcm = samples.astype(np.float32)
+        rms = float(np.sqrt(np.mean(pcm * pcm))) if len(pcm) else 0.0
+        signs = np.signbit(samples)
+        zcr = float(np.mean(signs[1:] != signs[:-1])) if len(samples) > 1 else 0.0
+        threshold = max(self.min_rms, self.floor.level * self.energy_ratio)
+        loud = rms > threshold and zcr < self.zcr_max
+        # EMA — по тихим блокам вне фразы, минимум окна — по всем (гул поднимает уровень и при открытом шлюзе)
+        self.floor.update(rms, quiet=not self._open and rms <= threshold)
+
+        if not self._open:
+            if not loud:
+                self._pre_roll.append(bytes(block))
+                return None
+            self._open = True
+            self.utterance_blocks = len(self._pre_roll)
+            for data in self._pre_roll:
+                self.recognizer.AcceptWaveform(data)
+                self.decoded += 1
+            self._pre_roll.clear()
+
+        self._quiet = 0 if loud else self._quiet + 1
+        self.utterance_blocks += 1
+        self.decoded += 1
+        if self.recognizer.AcceptWaveform(bytes(block)):
+            text = json.loads(self.recognizer.Result()).get("text", "")
+        else:
+            text = json.loads(self.recognizer.PartialResult()).get("partial", "")
+        word = self._find(text)
+        if word is not None:
+            self.hits += 1
+            self._close()
+            return word
+        if self._quiet >= self.hangover_blocks or self.utterance_blocks >= self.max_utterance_blocks:
+            # длиннее кольца фразу не перечитать — закрываем, без wake-word это не команда
+            self._close()
+        return None
+
+    def _find(self, text: str):
+        padded = f" {text} "
+        return next((w for w in self.words if f" {w} " in padded), None)
+
+    def _close(self):
+        self.recognizer.Reset()
+        self._open = False
+        self._quiet = 0
+
+    def reset(self):
+        self._close()
+        self._pre_roll.clear()
+        self.utterance_blocks = 0
+
+    @property
+    def noise(self) -> float:
+        return self.floor.level
+
+    def stats(self) -> dict:
+        return {
+            "blocks": self.blocks,
+            "decoded": self.decoded,
+            "decoded_ratio": round(self.decoded / self.blocks, 3) if self.blocks else 0.0,
+            "hits": self.hits,
+        }
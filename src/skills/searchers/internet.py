@@ -1,6 +1,11 @@
-import re
 import webbrowser
 
+from src.core.normalizer import TextNormalizer
+
+
+# запасной нормализатор, если навык вызван без контекста ассистента
+_DEFAULT_NORMALIZER = TextNormalizer(wake_words=("джарвис", "jarvis"))
+
 
 def search_internet(*args, **kwargs):
     """
@@ -9,10 +14,12 @@ def search_internet(*args, **kwargs):
     В kwargs можно передавать:
       - dataset: словарь команд (из commands.yaml)
       - query: текст команды пользователя
+      - normalizer: общий TextNormalizer ассистента
     """
 
     dataset = kwargs.get("dataset", {})
     query = kwargs.get("text")
+    normalizer = kwargs.get("normalizer") or _DEFAULT_NORMALIZER
 
     # 🧠 Если query не задан — пытаемся взять из args
     if not query and args:
@@ -25,7 +32,7 @@ def search_internet(*args, **kwargs):
     patterns = []
     for skill_data in dataset.get("skills", {}).values():
         for command in skill_data.get("commands", []):
-            if command.get("action") == "search_web.search_internet":
+            if command.get("action") in ("search_web.search_internet", "searchers.internet.search_internet"):
                 patterns.extend(command.get("patterns", []))
 
     # 🔁 Резервные паттерны
@@ -35,13 +42,9 @@ def search_internet(*args, **kwargs):
             "internetda qidir", "internetda izla"
         ]
 
-    # 🧹 Очищаем команду от паттернов и служебных слов
-    clean_query = query.lower()
-    for pattern in patterns:
-        clean_query = re.sub(re.escape(pattern.lower()), "", clean_query, flags=re.IGNORECASE)
-
-    clean_query = re.sub(r"\b(джарвис|jarvis)[,]*", "", clean_query, flags=re.IGNORECASE)
-    clean_query = clean_query.strip()
+    # 🧹 Очищаем команду от паттернов и служебных слов (регулярки компилируются один раз)
+    clean_query = normalizer.strip_phrases(query, patterns)
+    clean_query = normalizer.strip_wake_words(clean_query)
 
     if not clean_query:
         return "⚠️ Не понял, что искать."
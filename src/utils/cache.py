@@ -0,0 +1,77 @@
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Ограниченный LRU-кэш со статистикой (hits / misses / evictions / size).
+    Потокобезопасен. on_evict(key, value) вызывается для каждого вытесненного элемента.
+    """
+
+    def __init__(self, maxsize: int = 1024, on_evict=None):
+        self.maxsize = max(0, int(maxsize))
+        self.on_evict = on_evict
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def peek(self, key, default=None):
+        """Значение без учёта в статистике и без изменения порядка вытеснения."""
+        with self._lock:
+            return self._data.get(key, default)
+
+    def put(self, key, value):
+        if self.maxsize == 0:
+            return
+        evicted = []
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                evicted.append(self._data.popitem(last=False))
+                self.evictions += 1
+        if self.on_evict:
+            for k, v in evicted:
+                self.on_evict(k, v)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def keys(self):
+        with self._lock:
+            return list(self._data.keys())
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
@@ -0,0 +1,33 @@
+import numpy as np
+
+from src.core.audio_capture import AudioCapture
+
+
+def block(value: int, capture: AudioCapture) -> np.ndarray:
+    return np.full(capture.block_size, value, dtype=np.int16)
+
+
+def test_stale_close_keeps_new_subscription():
+    capture = AudioCapture(block_ms=100, history_s=1.0)
+    old = capture.subscribe("vosk")
+    new = capture.subscribe("vosk")          # переподписка заменяет старую
+    old.close()
+    old.close()                              # повторный close — без эффекта
+
+    capture.publish(block(7, capture))
+    assert old.closed and old.read(timeout=0) is None
+    assert not new.closed
+    assert np.frombuffer(new.read(timeout=0), dtype=np.int16)[0] == 7
+    assert "vosk" in capture.stats()["subscribers"]
+
+    new.close()
+    assert new.closed
+    assert capture.stats()["subscribers"] == {}
+
+
+def test_unsubscribe_by_name_closes_current():
+    capture = AudioCapture(block_ms=100, history_s=1.0)
+    sub = capture.subscribe("wake")
+    capture.unsubscribe("wake")
+    assert sub.closed and sub.read(timeout=0) is None
+    capture.unsubscribe("wake")              # имени уже нет — без ошибки
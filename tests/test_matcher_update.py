@@ -0,0 +1,84 @@
+"""Инкрементальное SmartMatcher.update_dataset против матчера, собранного с нуля."""
+import copy
+import random
+
+import pytest
+import yaml
+
+from benchmarks.synthetic import make_dataset, make_utterances
+from src.core.config import DEFAULT_CONFIG_PATH
+from src.core.matcher import SmartMatcher
+
+CONFIGS = {
+    "default": {},
+    "batch": {"batch": True},
+    "tfidf": {"backend": "tfidf"},
+    "no_fast_path": {"fast_path": False},
+}
+
+
+def base_config(**matcher) -> dict:
+    config = yaml.safe_load(DEFAULT_CONFIG_PATH.read_text(encoding="utf-8"))
+    config["matcher"] = dict(config.get("matcher", {}) or {}, index_cache=False, **matcher)
+    return config
+
+
+def command_lists(dataset: dict):
+    """Списки команд датасета, которые можно править: категории skills и smalltalk."""
+    lists = [data["commands"] for data in dataset["skills"].values()]
+    lists.append(dataset["smalltalk"]["commands"])
+    return lists
+
+
+def mutate(dataset: dict, rnd: random.Random, step: int, edits: int = 12) -> dict:
+    """Случайные вставки / удаления / замены команд (и ключей meta)."""
+    dataset = copy.deepcopy(dataset)
+    for n in range(edits):
+        op = rnd.choice(("insert", "delete", "replace", "meta"))
+        commands = rnd.choice(command_lists(dataset))
+        tag = f"upd{step}x{n}"
+        if op == "insert":
+            commands.insert(rnd.randint(0, len(commands)), {
+                "patterns": [f"открой {tag} приложение", f"open {tag} app", f"och {tag} ilovani"],
+                "action": f"bench.{tag}.run",
+            })
+        elif op == "delete" and len(commands) > 1:
+            commands.pop(rnd.randrange(len(commands)))
+        elif op == "replace" and commands:
+            i = rnd.randrange(len(commands))
+            cmd = dict(commands[i])
+            # та же команда с другими паттернами: часть старых фраз должна перестать находиться
+            cmd["patterns"] = [f"{p.split()[0]} {tag}" for p in cmd["patterns"]] + cmd["patterns"][1:]
+            commands[i] = cmd
+        elif op == "meta":
+            meta = dataset["meta"]
+            if meta and rnd.random() < 0.5:
+                meta.pop(rnd.choice(sorted(meta)))
+            else:
+                meta[f"meta_{tag}"] = {"patterns": [f"обнови {tag}", f"reload {tag}", f"yangila {tag}"]}
+    return dataset
+
+
+@pytest.mark.parametrize("name", sorted(CONFIGS))
+def test_incremental_update_matches_full_rebuild(name):
+    config = base_config(**CONFIGS[name])
+    rnd = random.Random(8)
+    dataset = make_dataset(600, seed=3)
+    matcher = SmartMatcher(dataset, config=config)
+    queries = [text for text, _ in make_utterances(dataset, 150, seed=5)]
+
+    for step in range(6):
+        for text in queries:
+            # прогреваем кэш старыми результатами — обновление должно их сбросить
+            matcher.find_matches(text)
+        dataset = mutate(dataset, rnd, step)
+        matcher.update_dataset(dataset)
+        fresh = SmartMatcher(dataset, config=config)
+        queries = queries[:100] + [text for text, _ in make_utterances(dataset, 100, parts=2, seed=step)]
+        for n in range(12):
+            # новые паттерны целиком и внутри длинной фразы (дельта-автомат быстрого пути)
+            queries += [f"открой upd{step}x{n} приложение", f"reload upd{step}x{n}",
+                        f"ну открой upd{step}x{n} приложение сейчас"]
+        for text in queries:
+            for lang in (None, "ru", "uz"):
+                assert matcher.find_matches(text, lang=lang) == fresh.find_matches(text, lang=lang), (step, text, lang)
@@ -0,0 +1,181 @@
+import hashlib
+import io
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+requests = pytest.importorskip("requests")
+
+from src.core.model_fetcher import ChecksumError, ModelFetcher, ModelSpec  # noqa: E402
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Отдаёт server.files[path]; умеет Range / If-Range и обрыв после server.cut байт."""
+
+    def do_GET(self):
+        server = self.server
+        server.log.append({"path": self.path, "range": self.headers.get("Range"),
+                           "if_range": self.headers.get("If-Range")})
+        data, etag = server.files[self.path]
+        start = 0
+        rng = self.headers.get("Range")
+        if rng and server.ranges and self.headers.get("If-Range") in (None, etag):
+            start = int(rng.split("=")[1].split("-")[0])
+            if start >= len(data):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(data)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+        else:
+            self.send_response(200)
+        body = data[start:]
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        if server.cut is not None:
+            # обрыв соединения на середине
+            body, server.cut = body[:server.cut], None
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.files, httpd.log, httpd.ranges, httpd.cut = {}, [], True, None
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def url(server, path):
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+
+def fetcher():
+    return ModelFetcher(workers=2, timeout=5, chunk_size=4096, progress=False)
+
+
+def sha(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+PAYLOAD = bytes(range(256)) * 400
+
+
+def test_resume_with_range(server, tmp_path):
+    server.files["/m.pt"] = (PAYLOAD, '"v1"')
+    server.cut = len(PAYLOAD) // 3
+    spec = ModelSpec(url(server, "/m.pt"), tmp_path / "m.pt", sha256=sha(PAYLOAD))
+    with pytest.raises(OSError):
+        fetcher().fetch(spec)
+    assert not spec.dest.exists()
+    # хвост, оборванный посреди блока, не пишется — докачка с последнего целого блока
+    offset = (tmp_path / ".m.pt.part").stat().st_size
+    assert 0 < offset <= len(PAYLOAD) // 3
+
+    fetcher().fetch(spec)
+    assert spec.dest.read_bytes() == PAYLOAD
+    assert server.log[-1]["range"] == f"bytes={offset}-"
+    assert server.log[-1]["if_range"] == '"v1"'
+    assert not (tmp_path / ".m.pt.part").exists()
+    assert not (tmp_path / ".m.pt.part.json").exists()
+
+
+def test_server_ignoring_range_restarts(server, tmp_path):
+    server.files["/m.pt"] = (PAYLOAD, '"v1"')
+    server.cut = 1000
+    spec = ModelSpec(url(server, "/m.pt"), tmp_path / "m.pt", sha256=sha(PAYLOAD))
+    with pytest.raises(OSError):
+        fetcher().fetch(spec)
+    server.ranges = False
+    fetcher().fetch(spec)
+    assert spec.dest.read_bytes() == PAYLOAD
+
+
+def test_changed_upstream_file_is_not_spliced(server, tmp_path):
+    server.files["/m.pt"] = (PAYLOAD, '"v1"')
+    server.cut = 1000
+    spec = ModelSpec(url(server, "/m.pt"), tmp_path / "m.pt")
+    with pytest.raises(OSError):
+        fetcher().fetch(spec)
+    new = PAYLOAD[::-1] + b"tail"
+    server.files["/m.pt"] = (new, '"v2"')
+    fetcher().fetch(spec)
+    assert spec.dest.read_bytes() == new
+
+
+def test_416_with_other_size_restarts(server, tmp_path):
+    server.files["/m.pt"] = (PAYLOAD[:500], '"v1"')
+    part = tmp_path / ".m.pt.part"
+    part.write_bytes(PAYLOAD[:800])           # больше, чем файл на сервере
+    (tmp_path / ".m.pt.part.json").write_text('{"validator": "\\"v1\\""}')
+    spec = ModelSpec(url(server, "/m.pt"), tmp_path / "m.pt")
+    fetcher().fetch(spec)
+    assert spec.dest.read_bytes() == PAYLOAD[:500]
+
+
+def test_checksum_mismatch_removes_part(server, tmp_path):
+    server.files["/m.pt"] = (PAYLOAD, '"v1"')
+    spec = ModelSpec(url(server, "/m.pt"), tmp_path / "m.pt", sha256="0" * 64)
+    with pytest.raises(ChecksumError):
+        fetcher().fetch(spec)
+    assert not spec.dest.exists()
+    assert list(tmp_path.iterdir()) == []
+
+
+def make_zip(stream: bool, compression=zipfile.ZIP_DEFLATED) -> bytes:
+    buf = io.BytesIO()
+    # в неперематываемый поток zipfile пишет дескрипторы данных после записей
+    target = type("Unseekable", (), {"write": buf.write, "flush": buf.flush, "tell": buf.tell})() if stream else buf
+    with zipfile.ZipFile(target, "w", compression=compression) as zf:
+        zf.writestr("vosk-model-test/am/final.mdl", PAYLOAD)
+        zf.writestr("vosk-model-test/conf/model.conf", b"--sample-frequency=16000\n")
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize("stream, compression", [
+    (False, zipfile.ZIP_DEFLATED),
+    (True, zipfile.ZIP_DEFLATED),
+    (True, zipfile.ZIP_STORED),              # stored + дескриптор — распаковка zipfile после скачивания
+])
+def test_zip_extraction(server, tmp_path, stream, compression):
+    archive = make_zip(stream, compression)
+    server.files["/model.zip"] = (archive, '"z1"')
+    server.cut = len(archive) // 2
+    spec = ModelSpec(url(server, "/model.zip"), tmp_path / "model", sha256=sha(archive), extract=True)
+    with pytest.raises(OSError):
+        fetcher().fetch(spec)
+    assert not spec.dest.exists()
+
+    fetcher().fetch(spec)
+    assert (spec.dest / "am" / "final.mdl").read_bytes() == PAYLOAD
+    assert (spec.dest / "conf" / "model.conf").exists()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["model"]
+
+
+def test_bad_archive_removes_part(server, tmp_path):
+    server.files["/model.zip"] = (b"PK\x03\x04" + b"\0" * 200, '"z1"')
+    spec = ModelSpec(url(server, "/model.zip"), tmp_path / "model", extract=True)
+    with pytest.raises(Exception) as err:
+        fetcher().fetch(spec)
+    assert not isinstance(err.value, OSError)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_fetch_all_reports_errors_per_model(server, tmp_path):
+    server.files["/a.pt"] = (PAYLOAD, '"a"')
+    specs = [ModelSpec(url(server, "/a.pt"), tmp_path / "a.pt"),
+             ModelSpec(url(server, "/a.pt"), tmp_path / "b.pt", sha256="0" * 64)]
+    results = fetcher().fetch_all(specs)
+    assert results[tmp_path / "a.pt"] == tmp_path / "a.pt"
+    assert isinstance(results[tmp_path / "b.pt"], ChecksumError)
@@ -0,0 +1,26 @@
+import yaml
+
+from src.core.config import BASE_DIR
+from src.core.speech_stream import split_chunks
+from src.core.speech_warmup import collect_phrases
+
+
+def test_short_reply_is_one_chunk():
+    assert split_chunks("Спасибо, сэр. Вы тоже на высоте!") == ["Спасибо, сэр. Вы тоже на высоте!"]
+
+
+def test_first_chunk_is_short_rest_merged():
+    text = ("Напоминаю: завтра в десять утра встреча с командой. Возьмите ноутбук и отчёт за квартал. "
+            "После встречи нужно позвонить в банк, уточнить статус перевода и записаться к врачу на пятницу.")
+    chunks = split_chunks(text, max_chars=250, first_max_chars=80)
+    assert len(chunks) == 2
+    assert len(chunks[0]) <= 80
+    assert " ".join(chunks) == text
+
+
+def test_warm_phrases_match_stream_chunks():
+    # прогрев кэширует фразу целиком — поток не должен дробить короткие постоянные ответы
+    dataset = yaml.safe_load((BASE_DIR / "data" / "commands.yaml").read_text(encoding="utf-8"))
+    for text, _ in collect_phrases(dataset):
+        if len(text) <= 80:
+            assert split_chunks(text) == [text]
@@ -0,0 +1,57 @@
+import numpy as np
+
+from src.core.vad import Endpointer
+
+SR = 16000
+BLOCK = SR // 10
+
+
+def tone(seconds: float, hz: float, rms: float):
+    t = np.arange(int(SR * seconds)) / SR
+    return rms * np.sqrt(2) * np.sin(2 * np.pi * hz * t)
+
+
+def speech(seconds: float, rms: float = 3000.0):
+    # «слоги» по 4 Гц: энергия модулирована, как у речи
+    t = np.arange(int(SR * seconds)) / SR
+    return tone(seconds, 220, rms) * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t))
+
+
+def silence(seconds: float, rms: float = 40.0, seed: int = 0):
+    return np.random.default_rng(seed).normal(0, rms, int(SR * seconds))
+
+
+def pcm(*parts):
+    return np.clip(np.concatenate(parts), -32768, 32767).astype(np.int16)
+
+
+def run(ep: Endpointer, audio):
+    segments = []
+    for i in range(0, len(audio), BLOCK):
+        segments += ep.feed(audio[i:i + BLOCK])
+    return [len(s) / SR for s in segments]
+
+
+def test_utterance_at_stream_start_is_detected():
+    audio = pcm(speech(1.5), silence(1.0), speech(1.0), silence(1.0, seed=1))
+    assert len(run(Endpointer(SR), audio)) == 2
+
+
+def test_steady_hum_is_not_speech():
+    assert run(Endpointer(SR), pcm(tone(30, 100, 300))) == []
+
+
+def test_hum_then_speech_then_silence_gives_one_segment():
+    hum = tone(4, 100, 300)
+    audio = pcm(hum, speech(1.5) + tone(1.5, 100, 300), silence(1.5))
+    segments = run(Endpointer(SR), audio)
+    assert len(segments) == 1
+    assert 1.4 <= segments[0] <= 2.5
+
+
+def test_noise_floor_follows_hum_up_and_back_down():
+    ep = Endpointer(SR)
+    run(ep, pcm(tone(5, 100, 300)))
+    assert 250 <= ep.noise <= 310
+    run(ep, pcm(silence(10)))
+    assert ep.noise < 100